@@ -1,3 +1,17 @@
 # Make global + local similarity class visible to next module
 from .global_similarity import global_similarity
-from .local_similarity import local_similarity
\ No newline at end of file
+from .local_similarity import local_similarity
+from .local_similarity import query_profile
+from .helpers.substitution import substitution_matrix, BLOSUM62
+from .helpers.encoding import vocabulary
+from .helpers.equivalence import match_table, IUPAC_DNA
+from .pairwise import all_vs_all
+from .batch import batch_score, batch_pairs
+from .pipeline import run_pipeline
+from .cache import result_cache
+from .incremental import incremental_similarity
+from .dictionary import trie
+from .seed_index import seed_index
+from .metric_index import bk_tree
+from .filters import filter_pairs, threshold_pairs
+from .helpers.instrumentation import collector
@@ -0,0 +1,51 @@
+import argparse
+import json
+
+from .pipeline import run_pipeline
+from .pipeline.main import CHUNK_SIZE
+from .helpers.substitution import BLOSUM62
+
+# Substitution matrices available from the command line
+MATRICES = {'BLOSUM62':BLOSUM62}
+
+
+def main(argv=None):
+    """Score every pair of a csv file, see run_pipeline
+
+    python -m seq_alignment pairs.csv scores.csv --mode local --workers 4
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m seq_alignment'
+                                    ,description='Score every (str1, str2) pair of a csv file.')
+    parser.add_argument('input', help='csv file of pairs, e.g. seq_alignment.csv')
+    parser.add_argument('output', help='csv file of scores, or a folder of npy files')
+    parser.add_argument('--mode', choices=['global','local'], default='global')
+    parser.add_argument('--op-costs', type=json.loads, default=None
+                       ,help='costs of operations as json, e.g. \'{"Insert":-1,"Delete":-1,"Substitute":-1,"Exact":0}\'')
+    parser.add_argument('--substitution-matrix', choices=sorted(MATRICES), default=None)
+    parser.add_argument('--columns', type=int, nargs=2, default=[0,1], help='columns holding str1 and str2')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per CPU')
+    parser.add_argument('--max-in-flight', type=int, default=None)
+    parser.add_argument('--resume', action='store_true', help='skip chunks already written to output')
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.substitution_matrix is not None:
+        options['substitution_matrix'] = MATRICES[args.substitution_matrix]
+
+    pairs_done = run_pipeline(args.input
+                             ,args.output
+                             ,mode=args.mode
+                             ,op_costs=args.op_costs
+                             ,chunk_size=args.chunk_size
+                             ,workers=args.workers
+                             ,max_in_flight=args.max_in_flight
+                             ,resume=args.resume
+                             ,columns=tuple(args.columns)
+                             ,**options)
+    print('Scored {} pairs into {}'.format(pairs_done,args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# Make batch scoring visible to next module
+from .main import batch_score, batch_pairs
@@ -0,0 +1,325 @@
+import numpy as np
+import operator
+
+from ..helpers.encoding import encode_sequences, encode_padded, make_score_table, row_scores
+from ..global_similarity.affine import is_affine
+from ..helpers.instrumentation import make_timer, make_record
+
+# Default costs of operations for each mode, same as the classes
+DEFAULT_COSTS = {'global':{'Delete':-1
+                          ,'Insert':-1
+                          ,'Substitute':-1
+                          ,'Exact':0}
+                ,'local':{'Delete':-1
+                         ,'Insert':-1
+                         ,'Substitute':-1
+                         ,'Exact':2}}
+
+# Targets advanced together by one numpy operation
+BUCKET_SIZE = 256
+
+# Value of cells past the end of a pair, never a best local cell
+UNREACHABLE = np.iinfo(np.int64).min // 4
+
+
+def length_buckets(lengths, bucket_size=BUCKET_SIZE):
+    """Split sequences (or pairs of sequences) into buckets of similar 
+    lengths
+
+    Inputs
+    ------
+    lengths : numpy.array or tuple
+        length of each sequence, or a tuple (lengths1, lengths2) of
+        the lengths of both sequences of each pair
+    bucket_size : int
+        most sequences in a bucket
+
+    Outputs
+    -------
+    buckets : list
+        index arrays of the sequences in each bucket, shortest first
+    """
+
+    if isinstance(lengths, tuple):
+        order = np.lexsort(lengths[::-1])
+    else:
+        order = np.argsort(lengths, kind='stable')
+    return [order[start:start+bucket_size] for start in range(0,len(order),bucket_size)]
+
+
+def bucket_scores(codes1, lengths1, codes2, lengths2, op_costs, score_table=None, mode='global'):
+    """Similarity of a bucket of padded pairs, all filled in lockstep
+
+    Rows of the edit arrays of every pair are stacked into one 2d
+      array and filled together, as in global_rows and local_best_cell,
+      so each row costs a handful of numpy operations for the whole 
+      bucket. Cells past the end of a pair are filled with values that
+      are never read, as no cell depends on the cells below or to its
+      right : global scores are read off when a pair reaches its last
+      row, and local maxima are only taken over the cells of the pair.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        (pairs, longest length) integer codes of each str1
+    lengths1 : numpy.array
+        length of each str1
+    codes2 : numpy.array
+        (pairs, longest length) integer codes of each str2
+    lengths2 : numpy.array
+        length of each str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+    mode : str
+        'global' or 'local' similarity
+
+    Outputs
+    -------
+    match_distance : numpy.array
+        similarity of each pair
+    match_end : numpy.array
+        (pairs, 2) array of the (row, col) cell where the best local 
+        match of each pair ends, -1 if either string is empty. Only
+        filled for local similarity
+    """
+
+    ## Get operation costs into a dict
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+
+    n_pairs, len1 = codes1.shape[0], codes1.shape[1] + 1 # Count empty string
+    len2 = codes2.shape[1] + 1 # Count empty string
+    lanes = np.arange(n_pairs)
+    local = mode=='local'
+
+    ## Cost of inserting every prefix of str2
+    insert_chain = np.arange(0,len2,dtype=np.int64)*INSERT
+
+    ## Initialize first row of arrays for the empty string value
+    past_rows = np.zeros((n_pairs,len2), dtype=np.int64)
+    curr_rows = np.empty((n_pairs,len2), dtype=np.int64)
+    match_end = np.full((n_pairs,2), -1, dtype=np.int64)
+    if local:
+        # Local scores start at the value of the classes, which is 
+        #  kept when either string is empty
+        match_distance = (lengths1+1)*DELETE + (lengths2+1)*INSERT
+        in_str2 = np.arange(len2) <= lengths2[:,None]
+        in_str2[:,0] = False
+    else:
+        past_rows[:] = insert_chain
+        match_distance = insert_chain[lengths2]
+
+    ## Go row by row, keeping track of past rows + current rows only
+    for row_num in range(1,len1):
+        t_rows = row_scores(codes1[:,row_num-1,None], codes2, op_costs, score_table)
+
+        # Deletion + substitute/exact match
+        curr_rows[:,0] = 0 if local else DELETE*row_num
+        np.maximum(past_rows[:,1:]+DELETE, past_rows[:,:-1]+t_rows, out=curr_rows[:,1:])
+        if local:
+            np.maximum(curr_rows, 0, out=curr_rows)
+
+        # Insertions along the rows
+        curr_rows -= insert_chain
+        np.maximum.accumulate(curr_rows, axis=1, out=curr_rows)
+        curr_rows += insert_chain
+
+        if local:
+            # Keep track of global maximum of each pair, over its own cells
+            in_pair = in_str2 & (row_num <= lengths1)[:,None]
+            masked = np.where(in_pair, curr_rows, UNREACHABLE)
+            col_num = np.argmax(masked, axis=1)
+            best = masked[lanes,col_num]
+            better = best > match_distance
+            match_distance[better] = best[better]
+            match_end[better] = np.stack([np.full(n_pairs,row_num),col_num],axis=1)[better]
+        else:
+            # Pairs whose str1 ends on this row
+            done = lengths1==row_num
+            match_distance[done] = curr_rows[done,lengths2[done]]
+
+        past_rows, curr_rows = curr_rows, past_rows
+
+    return match_distance, match_end
+
+
+def batch_score(query
+               ,targets
+               ,mode='global'
+               ,op_costs=None
+               ,test=operator.eq
+               ,substitution_matrix=None
+               ,bucket_size=BUCKET_SIZE
+               ,instrument=None
+               ,vocabulary=None):
+    """Similarity of one query against many targets
+
+    Targets are integer encoded, sorted into buckets of similar length
+      and padded into one 2d array per bucket. Each bucket is then
+      scored with one numpy operation per row, see bucket_scores,
+      instead of one class instance per target. Scores are the same
+      match_distance as global_similarity/local_similarity.
+
+    Inputs
+    ------
+    query : str or list of strings
+        sequence compared against every target, plays the role of str1
+    targets : list
+        strings or lists of strings, each plays the role of str2
+    mode : str
+        'global' or 'local' similarity
+    op_costs : dict or None
+        costs of operations, None for the defaults of the class.
+        Affine gaps are not supported
+    test : function
+        returns True if two symbols match
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, replaces test
+    bucket_size : int
+        most targets scored by one numpy operation
+    instrument : function or None
+        called with a record of time spent encoding + filling, cells
+        filled (padding included) and bytes of the padded codes
+    vocabulary : vocabulary
+        integer ids of tokens shared across calls, so test is only
+        called once per pair of distinct tokens over every call
+
+    Outputs
+    -------
+    match_distance : numpy.array
+        similarity of the query with each target, in order of targets
+    """
+
+    if mode not in DEFAULT_COSTS:
+        raise ValueError("mode must be one of {}, got {!r}".format(tuple(DEFAULT_COSTS),mode))
+    if op_costs is None:
+        op_costs = DEFAULT_COSTS[mode]
+    if is_affine(op_costs):
+        raise ValueError("batch_score does not support affine gaps, got {!r}".format(op_costs))
+
+    timer = make_timer(instrument)
+
+    with timer.phase('encode'):
+        targets = list(targets)
+        lengths = np.array([len(target) for target in targets], dtype=np.int64)
+        buckets = length_buckets(lengths, bucket_size)
+
+        ## Encode everything before building the score table, so
+        ##  it covers the symbols of every target
+        if vocabulary is None:
+            alphabet, codes1, _ = encode_sequences(query,[])
+        else:
+            alphabet, codes1 = vocabulary.index, vocabulary.encode(query)
+        encoded = [encode_padded([targets[ii] for ii in bucket],alphabet) for bucket in buckets]
+        if vocabulary is None:
+            score_table = make_score_table(alphabet,op_costs,test,substitution_matrix)
+        else:
+            score_table = vocabulary.score_table(op_costs,test,substitution_matrix)
+
+    ## Every lane of a bucket shares the query
+    with timer.phase('fill'):
+        match_distance = np.empty(len(targets), dtype=np.int64)
+        for bucket, (codes2, lengths2) in zip(buckets,encoded):
+            query_codes = np.broadcast_to(codes1,(len(bucket),len(codes1)))
+            query_lengths = np.full(len(bucket),len(codes1))
+            match_distance[bucket] = bucket_scores(query_codes,query_lengths,codes2,lengths2
+                                                  ,op_costs,score_table,mode)[0]
+
+    if instrument is not None:
+        cells = sum((len(codes1)+1)*(codes2.shape[1]+1)*len(codes2) for codes2, _ in encoded)
+        codes = sum(codes2.nbytes for codes2, _ in encoded)
+        instrument(make_record('batch_score',timer,cells,{'codes':codes}))
+
+    return match_distance
+
+
+def batch_pairs(pairs
+               ,mode='global'
+               ,op_costs=None
+               ,test=operator.eq
+               ,substitution_matrix=None
+               ,bucket_size=BUCKET_SIZE
+               ,instrument=None
+               ,vocabulary=None):
+    """Similarity of many independent pairs, aligned in lockstep
+
+    Pairs are sorted into buckets of similar (len1, len2) and padded
+      into 2d arrays, one lane per pair. Each bucket is then filled
+      with one numpy operation per row, see bucket_scores, with masks
+      for pairs of different shapes. Scores are the same match_distance
+      as global_similarity/local_similarity.
+
+    Inputs
+    ------
+    pairs : list
+        (str1, str2) pairs of strings or lists of strings
+    mode : str
+        'global' or 'local' similarity
+    op_costs : dict or None
+        costs of operations, None for the defaults of the class.
+        Affine gaps are not supported
+    test : function
+        returns True if two symbols match
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, replaces test
+    bucket_size : int
+        most pairs filled by one numpy operation
+    instrument : function or None
+        called with a record of time spent encoding + filling, cells
+        filled (padding included) and bytes of the padded codes
+    vocabulary : vocabulary
+        integer ids of tokens shared across calls, so test is only
+        called once per pair of distinct tokens over every call
+
+    Outputs
+    -------
+    match_distance : numpy.array
+        similarity of each pair, in order of pairs
+    match_end : numpy.array
+        only for local similarity, (pairs, 2) array of the (row, col) 
+        cell where the best match of each pair ends, same as 
+        local_similarity.match_end, -1 if either string is empty
+    """
+
+    if mode not in DEFAULT_COSTS:
+        raise ValueError("mode must be one of {}, got {!r}".format(tuple(DEFAULT_COSTS),mode))
+    if op_costs is None:
+        op_costs = DEFAULT_COSTS[mode]
+    if is_affine(op_costs):
+        raise ValueError("batch_pairs does not support affine gaps, got {!r}".format(op_costs))
+
+    timer = make_timer(instrument)
+
+    with timer.phase('encode'):
+        pairs = list(pairs)
+        lengths1 = np.array([len(str1) for str1, _ in pairs], dtype=np.int64)
+        lengths2 = np.array([len(str2) for _, str2 in pairs], dtype=np.int64)
+        buckets = length_buckets((lengths1,lengths2), bucket_size)
+
+        ## Encode everything before building the score table, so
+        ##  it covers the symbols of every pair
+        alphabet = {} if vocabulary is None else vocabulary.index
+        encoded = [(encode_padded([pairs[ii][0] for ii in bucket],alphabet)
+                   ,encode_padded([pairs[ii][1] for ii in bucket],alphabet)) for bucket in buckets]
+        if vocabulary is None:
+            score_table = make_score_table(alphabet,op_costs,test,substitution_matrix)
+        else:
+            score_table = vocabulary.score_table(op_costs,test,substitution_matrix)
+
+    with timer.phase('fill'):
+        match_distance = np.empty(len(pairs), dtype=np.int64)
+        match_end = np.full((len(pairs),2), -1, dtype=np.int64)
+        for bucket, ((codes1, lengths1), (codes2, lengths2)) in zip(buckets,encoded):
+            match_distance[bucket], match_end[bucket] = bucket_scores(codes1,lengths1,codes2,lengths2
+                                                                     ,op_costs,score_table,mode)
+
+    if instrument is not None:
+        cells = sum((codes1.shape[1]+1)*(codes2.shape[1]+1)*len(codes1) for (codes1, _), (codes2, _) in encoded)
+        codes = sum(codes1.nbytes + codes2.nbytes for (codes1, _), (codes2, _) in encoded)
+        instrument(make_record('batch_pairs',timer,cells,{'codes':codes}))
+
+    if mode=='local':
+        return match_distance, match_end
+    return match_distance
@@ -0,0 +1,2 @@
+# Make result cache visible to next module
+from .main import result_cache, cache_key
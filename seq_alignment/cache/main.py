@@ -0,0 +1,259 @@
+import collections
+import functools
+import operator
+import hashlib
+import sqlite3
+import json
+
+from ..global_similarity import global_similarity
+from ..local_similarity import local_similarity
+from ..helpers.instrumentation import make_timer, make_record
+from ..helpers.equivalence import match_table
+from ..batch.main import DEFAULT_COSTS
+
+# Similarity class run for each mode
+MODES = {'global':global_similarity
+        ,'local':local_similarity}
+
+# Results kept in memory by default
+MAX_SIZE = 4096
+
+
+def _normalize(value):
+    '''
+    json friendly stand-in for an argument, equal for equal arguments
+    '''
+    if isinstance(value, dict):
+        return {str(key):_normalize(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, match_table):
+        # Compiled test, keyed by its table + fallback
+        return {'alphabet':list(value.alphabet), 'matches':value.table.tolist(), 'test':_normalize(value.test)}
+    if hasattr(value, 'table') and hasattr(value, 'alphabet'):
+        # Substitution matrix, keyed by its scores
+        return {'alphabet':list(value.alphabet), 'table':value.table.tolist(), 'default':value.default}
+    if isinstance(value, functools.partial):
+        # Partial test, keyed by its function + bound arguments
+        return {'func':_normalize(value.func), 'args':_normalize(value.args), 'keywords':_normalize(value.keywords)}
+    if callable(value):
+        # Tests are keyed by name, so anonymous ones (lambdas, callable
+        #  instances) can't be told apart
+        if not hasattr(value, '__qualname__'):
+            raise ValueError("result_cache needs named test functions, got {!r}".format(value))
+        name = '{}.{}'.format(getattr(value,'__module__',''), value.__qualname__)
+        if '<' in name:
+            raise ValueError("result_cache needs named test functions, got {!r}".format(value))
+        return name
+    if hasattr(value, 'item'):
+        # numpy scalar
+        return value.item()
+    raise ValueError("result_cache can't key on {!r}".format(value))
+
+
+def is_symmetric(op_costs, options):
+    """True if scores stay the same with str1 and str2 swapped
+
+    Swapping the strings swaps insertions and deletions, so their costs
+      must be equal. Custom tests may not be symmetric, substitution
+      matrices are assumed to be.
+    """
+    if op_costs is not None and op_costs['Insert']!=op_costs['Delete']:
+        return False
+    return options.get('test',operator.eq) is operator.eq
+
+
+def cache_key(str1, str2, mode='global', op_costs=None, **options):
+    """Stable hash of everything that decides a score
+
+    The same inputs give the same key in every process, so keys can be
+      stored on disk. When is_symmetric, (str1, str2) and (str2, str1)
+      share a key.
+
+    Outputs
+    -------
+    key : str
+        sha256 hex digest
+    """
+
+    # Default costs key the same as passing them
+    if op_costs is None:
+        op_costs = DEFAULT_COSTS.get(mode)
+
+    # Engine, instrument + vocabulary don't change the score
+    options = {key:value for key, value in options.items() if key not in ('engine','instrument','vocabulary')}
+    strings = [_normalize(str1 if isinstance(str1, str) else list(str1))
+              ,_normalize(str2 if isinstance(str2, str) else list(str2))]
+    if is_symmetric(op_costs, options):
+        strings.sort(key=json.dumps)
+
+    normalized = json.dumps({'mode':mode
+                            ,'strings':strings
+                            ,'op_costs':_normalize(op_costs)
+                            ,'options':_normalize(options)}, sort_keys=True)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class result_cache:
+    """
+    Cache of match_distance for repeated pairs
+
+    Results are kept in a bounded in-memory LRU, in front of an
+    optional sqlite file that keeps them across processes.
+
+    Attributes
+    ----------
+    max_size : int
+        most results kept in memory
+    path : str or None
+        sqlite file of the disk tier, None for memory only
+    stats : dict
+        hits (memory), disk_hits, misses + evictions
+
+    Methods
+    -------
+    score(str1, str2, mode, op_costs, **options)
+        match_distance of a pair, running it on a miss
+    hit_rate()
+        fraction of lookups found in either tier
+    """
+
+    def __init__(self, max_size=MAX_SIZE, path=None):
+        """
+        Inputs
+        ------
+        max_size : int
+           most results kept in memory
+        path : str or None
+           sqlite file keeping results across processes
+        """
+
+        self.max_size = max_size
+        self.path = path
+        self.stats = {'hits':0,'disk_hits':0,'misses':0,'evictions':0}
+        self._memory = collections.OrderedDict()
+
+        self._disk = None
+        if path is not None:
+            self._disk = sqlite3.connect(path)
+            self._disk.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, match_distance REAL)')
+            self._disk.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key, match_distance):
+        '''
+        Keep a result in memory, evicting the least recently used
+        '''
+        self._memory[key] = match_distance
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def score(self, str1, str2, mode='global', op_costs=None, **options):
+        """match_distance of a pair, from the cache or from a run
+
+        Inputs
+        ------
+        str1 : str or list of strings
+        str2 : str or list of strings
+        mode : str
+            'global' or 'local' similarity
+        op_costs : dict or None
+            costs of operations, None for the defaults of the class
+        options :
+            other arguments of the similarity class, e.g. test or
+            substitution_matrix. An instrument gets a 'result_cache'
+            record of each lookup, and the record of the run on a miss
+
+        Outputs
+        -------
+        match_distance : int, float or None
+            same as running the similarity class without backtrace
+        """
+
+        if mode not in MODES:
+            raise ValueError("mode must be one of {}, got {!r}".format(tuple(MODES),mode))
+        if op_costs is None:
+            op_costs = DEFAULT_COSTS[mode]
+        instrument = options.pop('instrument',None)
+        timer = make_timer(instrument)
+        with timer.phase('lookup'):
+            key = cache_key(str1, str2, mode, op_costs, **options)
+            found, match_distance = self._lookup(key)
+
+        if not found:
+            self.stats['misses'] += 1
+            match_distance = self._run(str1, str2, mode, op_costs, instrument, options)
+            with timer.phase('store'):
+                self._remember(key, match_distance)
+                if self._disk is not None:
+                    self._disk.execute('INSERT OR REPLACE INTO results VALUES (?, ?)', (key, match_distance))
+                    self._disk.commit()
+
+        if instrument is not None:
+            instrument(make_record('result_cache',timer,0,cache={'hits':int(found),'misses':int(not found)}))
+        return match_distance
+
+    def _lookup(self, key):
+        '''
+        (found, match_distance) of a key, from memory then disk
+        '''
+        if key in self._memory:
+            self.stats['hits'] += 1
+            self._memory.move_to_end(key)
+            return True, self._memory[key]
+
+        if self._disk is not None:
+            row = self._disk.execute('SELECT match_distance FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.stats['disk_hits'] += 1
+                match_distance = _from_disk(row[0])
+                self._remember(key, match_distance)
+                return True, match_distance
+
+        return False, None
+
+    def _run(self, str1, str2, mode, op_costs, instrument, options):
+        '''
+        match_distance of a pair from the similarity class
+        '''
+        if op_costs is not None:
+            options['op_costs'] = op_costs
+        if instrument is not None:
+            options['instrument'] = instrument
+        sim_init = MODES[mode](str1,str2,False,**options)
+        sim_init.run()
+        match_distance = sim_init.match_distance
+        if match_distance is not None and hasattr(match_distance,'item'):
+            match_distance = match_distance.item()
+        return match_distance
+
+    def hit_rate(self):
+        """Fraction of lookups found in memory or on disk"""
+        hits = self.stats['hits'] + self.stats['disk_hits']
+        lookups = hits + self.stats['misses']
+        return hits/lookups if lookups else 0.0
+
+    def clear(self):
+        """Drop every result held in memory, the disk tier is kept"""
+        self._memory.clear()
+
+    def close(self):
+        """Close the disk tier"""
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+def _from_disk(value):
+    '''
+    sqlite REAL back to the int scores of the classes
+    '''
+    if value is None:
+        return None
+    return int(value) if float(value).is_integer() else value
@@ -0,0 +1,2 @@
+# Make dictionary search visible to next module
+from .main import trie
@@ -0,0 +1,192 @@
+import numpy as np
+import operator
+
+from ..global_similarity.affine import is_affine
+
+# Default costs, same as global_similarity
+DEFAULT_COSTS = {'Delete':-1
+                ,'Insert':-1
+                ,'Substitute':-1
+                ,'Exact':0}
+
+
+class _node:
+    '''
+    One prefix of the words, with the indices of words ending here
+    '''
+    __slots__ = ('children','words')
+
+    def __init__(self):
+        self.children = {}
+        self.words = []
+
+
+class trie:
+    """
+    Word list for fuzzy search, sharing edit array rows across
+    words with a common prefix
+
+    Searching walks the trie depth first. Each node fills one row of
+    the edit array of query vs word from the row of its parent, so
+    a prefix shared by many words is only filled once. A subtree is
+    skipped as soon as a whole row is below -k, as every path to the
+    words under it crosses that row.
+
+    Attributes
+    ----------
+    words : list
+        words in the order they were added
+    nodes : int
+        number of nodes, i.e. distinct prefixes, rows filled by a
+        search that prunes nothing
+    rows_filled : int
+        rows filled by the last search
+
+    Methods
+    -------
+    add(word)
+        add one word
+    search(query, k, op_costs, test, substitution_matrix)
+        words within distance k of query, best first
+    """
+
+    def __init__(self, words=()):
+        """
+        Inputs
+        ------
+        words : list
+           strings or lists of strings to search
+        """
+
+        self.root = _node()
+        self.words = []
+        self.nodes = 1
+        self.rows_filled = 0
+        self.alphabet = {}
+        for word in words:
+            self.add(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word):
+        """Add one word, returning its index in words"""
+        node = self.root
+        for symbol in word:
+            self.alphabet.setdefault(symbol,len(self.alphabet))
+            child = node.children.get(symbol)
+            if child is None:
+                child = node.children[symbol] = _node()
+                self.nodes += 1
+            node = child
+        node.words.append(len(self.words))
+        self.words.append(word)
+        return len(self.words) - 1
+
+    def _profile(self, query, op_costs, test, substitution_matrix):
+        '''
+        Substitute/exact values of every symbol of the trie against
+          every symbol of query, (alphabet, len(query)) array
+        '''
+        symbols = list(self.alphabet)
+        if substitution_matrix is not None:
+            index = substitution_matrix.codes(symbols)
+            query_index = substitution_matrix.codes(query)
+            return substitution_matrix.table[np.ix_(query_index,index)].T.copy()
+
+        ## test is called once per pair of distinct symbols
+        profile = np.empty((len(symbols),len(query)), dtype=np.int64)
+        columns = {}
+        for col, sub1 in enumerate(query):
+            if sub1 not in columns:
+                columns[sub1] = [op_costs['Exact'] if test(sub1,sub2) else op_costs['Substitute'] for sub2 in symbols]
+            profile[:,col] = columns[sub1]
+        return profile
+
+    def search(self
+              ,query
+              ,k
+              ,op_costs=None
+              ,test=operator.eq
+              ,substitution_matrix=None):
+        """Every word within distance k of query, best first
+
+        Inputs
+        ------
+        query : str or list of strings
+        k : int
+            largest distance kept, words need a match_distance >= -k
+        op_costs : dict or None
+            costs of operations, None for the defaults of
+            global_similarity. All must be <= 0 for pruning to be exact
+        test : function
+            returns True if two symbols match
+        substitution_matrix : substitution_matrix
+            scores of aligning every pair of symbols, all <= 0
+
+        Outputs
+        -------
+        matches : list
+            (word, match_distance) of each word within k, by
+            descending match_distance and then order of words. Each
+            match_distance is that of global_similarity(query, word)
+        """
+
+        if op_costs is None:
+            op_costs = DEFAULT_COSTS
+        if k < 0:
+            raise ValueError("k must be >= 0, got {!r}".format(k))
+        if is_affine(op_costs):
+            raise ValueError("trie search does not support affine gaps, got {!r}".format(op_costs))
+        if max(op_costs.values()) > 0:
+            raise ValueError("trie search requires op_costs <= 0, got {!r}".format(op_costs))
+        if substitution_matrix is not None and substitution_matrix.table.max() > 0:
+            raise ValueError("trie search requires substitution_matrix scores <= 0")
+
+        ## Query is str1, so moving along a row (a query symbol) is a
+        ##  deletion and moving down to a child (a word symbol) an insertion
+        INSERT = op_costs['Insert']
+        DELETE = op_costs['Delete']
+        min_score = -k
+
+        len1 = len(query) + 1 # Count empty string
+        delete_chain = np.arange(0,len1,dtype=np.int64)*DELETE
+        profile = self._profile(query,op_costs,test,substitution_matrix)
+        alphabet = self.alphabet
+
+        matches = []
+        self.rows_filled = 1
+        root_row = delete_chain.copy()
+        for index in self.root.words:
+            if root_row[-1] >= min_score:
+                matches.append((index,int(root_row[-1])))
+
+        ## Depth first, each node filled from its parent's row
+        stack = [(child,symbol,root_row,1) for symbol, child in self.root.children.items()]
+        while stack:
+            node, symbol, past_row, depth = stack.pop()
+            t_row = profile[alphabet[symbol]]
+            self.rows_filled += 1
+
+            # Insertion + substitute/exact match
+            curr_row = np.empty(len1, dtype=np.int64)
+            curr_row[0] = depth*INSERT
+            np.maximum(past_row[1:]+INSERT, past_row[:-1]+t_row, out=curr_row[1:])
+
+            # Deletions along the row
+            curr_row -= delete_chain
+            np.maximum.accumulate(curr_row, out=curr_row)
+            curr_row += delete_chain
+
+            # Every word below this node crosses this row
+            if curr_row.max() < min_score:
+                continue
+
+            if curr_row[-1] >= min_score:
+                for index in node.words:
+                    matches.append((index,int(curr_row[-1])))
+            for child_symbol, child in node.children.items():
+                stack.append((child,child_symbol,curr_row,depth+1))
+
+        matches.sort(key=lambda match: (-match[1],match[0]))
+        return [(self.words[index],score) for index, score in matches]
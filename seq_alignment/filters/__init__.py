@@ -0,0 +1,2 @@
+# Make filter cascade visible to next module
+from .main import filter_pairs, threshold_pairs
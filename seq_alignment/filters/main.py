@@ -0,0 +1,370 @@
+import numpy as np
+import operator
+
+from ..helpers.encoding import encode_padded, make_score_table, row_scores
+from ..global_similarity.affine import is_affine
+from ..helpers.instrumentation import make_timer, make_record
+from ..batch.main import DEFAULT_COSTS, BUCKET_SIZE, UNREACHABLE, length_buckets, batch_pairs
+
+# Stages of the cascade, cheapest first
+STAGES = ('length','qgram','probe')
+
+
+def length_bound(lengths1, lengths2, op_costs):
+    """Lowest distance of each pair from its lengths alone
+
+    Turning str1 into str2 takes at least len1 - len2 deletions, or
+      len2 - len1 insertions.
+
+    Inputs
+    ------
+    lengths1 : numpy.array
+        length of each str1
+    lengths2 : numpy.array
+        length of each str2
+    op_costs : dict
+        costs of operations, all <= 0
+
+    Outputs
+    -------
+    bound : numpy.array
+        lower bound of the distance (minus match_distance) of each pair
+    """
+
+    diff = lengths1 - lengths2
+    return np.where(diff > 0, diff*-op_costs['Delete'], -diff*-op_costs['Insert'])
+
+
+def qgram_profile_distance(codes1, lengths1, codes2, lengths2, alphabet_size, q=1):
+    """L1 distance between the q-gram counts of both sequences of
+    every pair, at once for all pairs
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of every str1, one after the other
+    lengths1 : numpy.array
+        length of each str1
+    codes2 : numpy.array
+        integer codes of every str2, one after the other
+    lengths2 : numpy.array
+        length of each str2
+    alphabet_size : int
+        number of distinct codes
+    q : int
+        length of the q-grams, 1 compares histograms of symbols
+
+    Outputs
+    -------
+    l1 : numpy.array
+        sum over q-grams of |count in str1 - count in str2|, per pair
+    """
+
+    n = len(lengths1)
+    rows = []
+    values = []
+    for codes, lengths in [(codes1,lengths1),(codes2,lengths2)]:
+        ## q-gram starting at every position, kept if it ends in
+        ##  the same sequence
+        grams = np.maximum(lengths-q+1, 0)
+        starts = np.cumsum(lengths) - lengths
+        row = np.repeat(np.arange(n), grams)
+        position = np.repeat(starts, grams) + np.arange(grams.sum()) - np.repeat(np.cumsum(grams)-grams, grams)
+        value = np.zeros(len(position), dtype=np.int64)
+        for offset in range(q):
+            value = value*alphabet_size + codes[position+offset]
+        rows.append(row)
+        values.append(value)
+
+    ## +1 for each q-gram of str1, -1 for each of str2
+    keys = np.stack([np.concatenate(rows),np.concatenate(values)], axis=1)
+    signs = np.concatenate([np.ones(len(rows[0]),dtype=np.int64),-np.ones(len(rows[1]),dtype=np.int64)])
+    if len(keys)==0:
+        return np.zeros(n, dtype=np.int64)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    diff = np.bincount(inverse.ravel(), weights=signs, minlength=len(unique))
+
+    return np.bincount(unique[:,0], weights=np.abs(diff), minlength=n).astype(np.int64)
+
+
+def qgram_bound(l1, lengths1, lengths2, op_costs, q=1):
+    """Lowest distance of each pair from the L1 distance of its q-gram
+    counts, see qgram_profile_distance
+
+    With q = 1 each symbol of str1 left over once the symbols of str2
+      are matched must be deleted or substituted, and each one of
+      str2 inserted or substituted. Each edit changes at most q
+      q-grams of either string, so for q > 1 there are at least
+      l1 / 2q edits.
+
+    Inputs
+    ------
+    l1 : numpy.array
+        output of qgram_profile_distance
+    lengths1 : numpy.array
+        length of each str1
+    lengths2 : numpy.array
+        length of each str2
+    op_costs : dict
+        costs of operations, all <= 0
+    q : int
+        length of the q-grams
+
+    Outputs
+    -------
+    bound : numpy.array
+        lower bound of the distance (minus match_distance) of each pair
+    """
+
+    INSERT = -op_costs['Insert']
+    DELETE = -op_costs['Delete']
+    SUBSTITUTE = -op_costs['Substitute']
+
+    if q==1:
+        extra1 = (l1 + lengths1 - lengths2) // 2
+        extra2 = (l1 - lengths1 + lengths2) // 2
+        paired = np.minimum(extra1, extra2)
+        return paired*min(SUBSTITUTE,INSERT+DELETE) + (extra1-paired)*DELETE + (extra2-paired)*INSERT
+
+    edits = -(-l1 // (2*q))
+    return edits*min(INSERT,DELETE,SUBSTITUTE)
+
+
+def banded_probe(codes1, lengths1, codes2, lengths2, op_costs, score_table=None, band=0):
+    """Global similarity of a bucket of padded pairs, only filling
+    cells with |row - col| <= band, all pairs in lockstep
+
+    Each row keeps the 2*band + 1 cells of its band, cell b of row i
+      being column i - band + b. Paths leaving the band are never
+      found, so scores are exact when the best path stays inside it.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        (pairs, longest length) integer codes of each str1
+    lengths1 : numpy.array
+        length of each str1
+    codes2 : numpy.array
+        (pairs, longest length) integer codes of each str2
+    lengths2 : numpy.array
+        length of each str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+    band : int
+        cells kept on each side of the diagonal
+
+    Outputs
+    -------
+    match_distance : numpy.array
+        similarity of each pair, UNREACHABLE when the last cell is
+        outside of the band
+    """
+
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+
+    n = len(lengths1)
+    width = 2*band + 1
+    offsets = np.arange(width, dtype=np.int64) - band
+    insert_chain = np.arange(width, dtype=np.int64)*INSERT
+    end = lengths2 - lengths1 + band
+    in_band = (end >= 0) & (end < width)
+    end = np.clip(end, 0, width-1)
+    match_distance = np.full(n, UNREACHABLE, dtype=np.int64)
+
+    ## First row, insertions only
+    cols = offsets
+    past_row = np.where((cols >= 0) & (cols <= lengths2[:,None]), cols*INSERT, UNREACHABLE)
+    done = lengths1==0
+    match_distance[done] = past_row[done,end[done]]
+
+    curr_row = np.empty_like(past_row)
+    for row_num in range(1,codes1.shape[1]+1):
+        cols = row_num + offsets
+
+        # Substitute/exact match, from the same cell of the past row
+        if codes2.shape[1]:
+            sub2 = codes2[:,np.clip(cols-1,0,codes2.shape[1]-1)]
+            t_row = row_scores(codes1[:,row_num-1,None], sub2, op_costs, score_table)
+        else:
+            t_row = np.zeros((n,width), dtype=np.int64)
+        np.add(past_row, t_row, out=curr_row)
+
+        # Deletion, from the next cell of the past row
+        np.maximum(curr_row[:,:-1], past_row[:,1:]+DELETE, out=curr_row[:,:-1])
+        curr_row[:,cols==0] = row_num*DELETE
+        curr_row[(cols[None,:] < 0) | (cols[None,:] > lengths2[:,None])] = UNREACHABLE
+
+        # Insertions along the band
+        curr_row -= insert_chain
+        np.maximum.accumulate(curr_row, axis=1, out=curr_row)
+        curr_row += insert_chain
+        np.maximum(curr_row, UNREACHABLE, out=curr_row)
+
+        done = lengths1==row_num
+        match_distance[done] = curr_row[done,end[done]]
+        past_row, curr_row = curr_row, past_row
+
+    match_distance[~in_band] = UNREACHABLE
+    return match_distance
+
+
+def filter_pairs(pairs
+                ,max_distance
+                ,op_costs=None
+                ,q=1
+                ,probe=False
+                ,test=operator.eq
+                ,substitution_matrix=None
+                ,bucket_size=BUCKET_SIZE
+                ,instrument=None):
+    """Pairs that may have a global match_distance >= -max_distance
+
+    Pairs go through a cascade of lower bounds of their distance, each
+      vectorized across every pair still left, and are rejected by the
+      first stage whose bound is past max_distance :
+
+        length : the difference of their lengths, see length_bound
+        qgram  : counts of their q-grams, see qgram_bound. Only with
+                 test = operator.eq and no substitution_matrix
+        probe  : banded_probe, with the band max_distance can pay
+                 insertions/deletions for, which is exact
+
+    Inputs
+    ------
+    pairs : list
+        (str1, str2) pairs of strings or lists of strings
+    max_distance : int
+        largest distance kept, as in global_similarity
+    op_costs : dict or None
+        costs of operations, None for the defaults of
+        global_similarity. All must be <= 0
+    q : int
+        length of q-grams of the qgram stage
+    probe : bool
+        run the banded probe on pairs left after the bounds
+    test : function
+        returns True if two symbols match
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, all <= 0
+    bucket_size : int
+        most pairs probed by one numpy operation
+    instrument : function or None
+        called with a record of time spent in each stage and cells
+        filled by the probe
+
+    Outputs
+    -------
+    keep : numpy.array
+        boolean mask of the pairs left after every stage
+    stats : dict
+        pairs, rejected pairs by stage, and pairs passed
+    """
+
+    if op_costs is None:
+        op_costs = DEFAULT_COSTS['global']
+    if is_affine(op_costs):
+        raise ValueError("filter_pairs does not support affine gaps, got {!r}".format(op_costs))
+    if max(op_costs.values()) > 0:
+        raise ValueError("filter_pairs requires op_costs <= 0, got {!r}".format(op_costs))
+    if substitution_matrix is not None and substitution_matrix.table.max() > 0:
+        raise ValueError("filter_pairs requires substitution_matrix scores <= 0")
+    gap_cost = min(-op_costs['Insert'],-op_costs['Delete'])
+    if probe and gap_cost==0:
+        raise ValueError("probe requires 'Insert' and 'Delete' costs < 0, got {!r}".format(op_costs))
+
+    timer = make_timer(instrument)
+    pairs = list(pairs)
+    lengths1 = np.array([len(str1) for str1, _ in pairs], dtype=np.int64)
+    lengths2 = np.array([len(str2) for _, str2 in pairs], dtype=np.int64)
+    keep = np.ones(len(pairs), dtype=bool)
+    rejected = {stage:0 for stage in STAGES}
+    cells = 0
+
+    with timer.phase('length'):
+        keep &= length_bound(lengths1,lengths2,op_costs) <= max_distance
+        rejected['length'] = int(len(pairs) - keep.sum())
+
+    if test is operator.eq and substitution_matrix is None:
+        with timer.phase('qgram'):
+            left = np.flatnonzero(keep)
+            alphabet = {}
+            codes1 = np.array([alphabet.setdefault(s,len(alphabet)) for ii in left for s in pairs[ii][0]], dtype=np.int64)
+            codes2 = np.array([alphabet.setdefault(s,len(alphabet)) for ii in left for s in pairs[ii][1]], dtype=np.int64)
+            l1 = qgram_profile_distance(codes1,lengths1[left],codes2,lengths2[left],max(len(alphabet),1),q)
+            passed = qgram_bound(l1,lengths1[left],lengths2[left],op_costs,q) <= max_distance
+            keep[left[~passed]] = False
+            rejected['qgram'] = int((~passed).sum())
+
+    if probe:
+        with timer.phase('probe'):
+            left = np.flatnonzero(keep)
+            band = int(max_distance // gap_cost)
+            alphabet = {}
+            buckets = length_buckets((lengths1[left],lengths2[left]), bucket_size)
+            encoded = [(encode_padded([pairs[ii][0] for ii in left[bucket]],alphabet)
+                       ,encode_padded([pairs[ii][1] for ii in left[bucket]],alphabet)) for bucket in buckets]
+            score_table = make_score_table(alphabet,op_costs,test,substitution_matrix)
+            for bucket, ((codes1, bucket_lengths1), (codes2, bucket_lengths2)) in zip(buckets,encoded):
+                scores = banded_probe(codes1,bucket_lengths1,codes2,bucket_lengths2,op_costs,score_table,band)
+                keep[left[bucket]] = scores >= -max_distance
+                cells += len(bucket)*(codes1.shape[1]+1)*(2*band+1)
+            rejected['probe'] = int(len(left) - keep.sum())
+
+    stats = {'pairs':len(pairs),'rejected':rejected,'passed':int(keep.sum())}
+    if instrument is not None:
+        instrument(make_record('filter_pairs',timer,cells))
+    return keep, stats
+
+
+def threshold_pairs(pairs, max_distance, op_costs=None, test=operator.eq, substitution_matrix=None
+                   ,bucket_size=BUCKET_SIZE, instrument=None, **filters):
+    """Global match_distance of the pairs within max_distance, running
+    batch_pairs only on the pairs left by filter_pairs
+
+    Inputs
+    ------
+    pairs : list
+        (str1, str2) pairs of strings or lists of strings
+    max_distance : int
+        largest distance kept
+    op_costs : dict or None
+        costs of operations, all <= 0
+    test : function
+        returns True if two symbols match
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, all <= 0
+    bucket_size : int
+        most pairs filled by one numpy operation
+    instrument : function or None
+        called with the records of filter_pairs and batch_pairs
+    filters :
+        q and probe, see filter_pairs
+
+    Outputs
+    -------
+    match_distance : numpy.array
+        float similarity of each pair, nan past max_distance
+    stats : dict
+        stats of filter_pairs, with pairs rejected by the exact
+        scores under rejected['exact']
+    """
+
+    pairs = list(pairs)
+    keep, stats = filter_pairs(pairs,max_distance,op_costs,test=test,substitution_matrix=substitution_matrix
+                              ,bucket_size=bucket_size,instrument=instrument,**filters)
+
+    match_distance = np.full(len(pairs), np.nan)
+    left = np.flatnonzero(keep)
+    if len(left):
+        scores = batch_pairs([pairs[ii] for ii in left],'global',op_costs,test,substitution_matrix
+                            ,bucket_size,instrument)
+        within = scores >= -max_distance
+        match_distance[left[within]] = scores[within]
+        stats['rejected']['exact'] = int((~within).sum())
+    else:
+        stats['rejected']['exact'] = 0
+    stats['passed'] -= stats['rejected']['exact']
+    return match_distance, stats
@@ -0,0 +1,280 @@
+import numpy as np
+
+from ..helpers.encoding import row_scores
+from ..helpers.backtrace import INSERT_EXTEND, DELETE_EXTEND
+
+# Value of cells no alignment can reach, far enough from the int64
+#  minimum that adding costs to it never wraps around
+UNREACHABLE = np.iinfo(np.int64).min // 4
+
+
+def gap_open(op_costs):
+    """Cost of opening a gap, 0 when op_costs only has linear gaps"""
+    return op_costs.get('Open',0)
+
+
+def is_affine(op_costs):
+    """True if op_costs charge extra for opening a gap"""
+    return gap_open(op_costs) != 0
+
+
+def affine_rows(codes1, codes2, op_costs, score_table=None, local=False):
+    """Sweep the three edit arrays of Gotoh's algorithm row by row
+
+    A gap of k insertions costs 'Open' + k*'Insert', and likewise for
+      deletions. Three values are kept per cell :
+
+        H : best alignment of the prefixes
+        E : best alignment ending in an insertion
+        F : best alignment ending in a deletion
+
+    F only depends on the past row. E depends on the current row, but
+      as 'Open' <= 0 a gap never opens right after another insertion,
+      so E only needs G = max(substitute/exact match, F) and is the
+      same prefix maximum as global_rows :
+
+        E[j] = max_{k<j} (G[k] - k*INSERT) + j*INSERT + OPEN
+
+    Only two rows are kept, so rows are yielded in reused buffers
+      and must be copied to be kept past the next row.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations, 'Open' is the extra cost of opening a gap
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+    local : bool
+        floor every cell of H at zero, for local similarity
+
+    Outputs
+    -------
+    H, E, F : numpy.array
+        each row of the three edit arrays, starting with the empty
+        string row
+    diag : numpy.array
+        value of reaching each cell by substitute/exact match, the
+        first column is unreachable
+    """
+
+    ## Get operation costs into a dict
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+    OPEN = gap_open(op_costs)
+
+    len1 = len(codes1) + 1 # Count empty string
+    len2 = len(codes2) + 1 # Count empty string
+
+    ## Cost of inserting every prefix of str2
+    insert_chain = np.arange(0,len2,dtype=np.int64)*INSERT
+
+    ## Initialize first row of arrays for the empty string value,
+    ##  global alignments open one gap along it
+    past_h = np.zeros(len2, dtype=np.int64)
+    past_e = np.full(len2, UNREACHABLE, dtype=np.int64)
+    past_f = np.full(len2, UNREACHABLE, dtype=np.int64)
+    diag = np.full(len2, UNREACHABLE, dtype=np.int64)
+    if not local:
+        past_h[1:] = insert_chain[1:] + OPEN
+        past_e[1:] = past_h[1:]
+    yield past_h, past_e, past_f, diag
+
+    curr_h = np.empty(len2, dtype=np.int64)
+    curr_e = np.full(len2, UNREACHABLE, dtype=np.int64)
+    curr_f = np.empty(len2, dtype=np.int64)
+
+    ## Go row by row, keeping track of past row + current row only
+    for row_num in range(1,len1):
+        t_row = row_scores(codes1[row_num-1], codes2, op_costs, score_table)
+
+        # Deletions, opened from H or extended from F
+        np.maximum(past_f, past_h+OPEN, out=curr_f)
+        curr_f += DELETE
+
+        # Substitute/exact match
+        np.add(past_h[:-1], t_row, out=diag[1:])
+
+        # Best of substitute/exact match + deletion, global alignments
+        #  reach the first column by deleting
+        np.maximum(diag, curr_f, out=curr_h)
+        if local:
+            curr_h[0] = 0
+            np.maximum(curr_h, 0, out=curr_h)
+
+        # Insertions along the row, opened from any earlier cell
+        curr_h -= insert_chain
+        np.maximum.accumulate(curr_h[:-1], out=curr_e[1:])
+        curr_h += insert_chain
+        curr_e[1:] += insert_chain[1:] + OPEN
+        np.maximum(curr_h, curr_e, out=curr_h)
+
+        past_h, curr_h = curr_h, past_h
+        past_e, curr_e = curr_e, past_e
+        past_f, curr_f = curr_f, past_f
+        yield past_h, past_e, past_f, diag
+
+
+def affine_score(codes1, codes2, op_costs, score_table=None):
+    """Global similarity with affine gaps, see affine_rows
+
+    Outputs
+    -------
+    match_distance : int
+        value of the last cell of the edit array
+    """
+
+    for h_row, _, _, _ in affine_rows(codes1, codes2, op_costs, score_table):
+        pass
+    return int(h_row[-1])
+
+
+def affine_best_cell(codes1, codes2, op_costs, score_table=None):
+    """Local similarity with affine gaps, see affine_rows
+
+    Outputs
+    -------
+    match_distance : int or None
+        maximum value of the edit array, None if either string is empty
+    match_end : tuple or None
+        (row, col) of the first cell holding the maximum value
+    """
+
+    match_distance = None
+    match_end = None
+    if len(codes1)==0 or len(codes2)==0:
+        return match_distance, match_end
+
+    rows = affine_rows(codes1, codes2, op_costs, score_table, local=True)
+    next(rows)
+    for row_num, (h_row, _, _, _) in enumerate(rows, 1):
+        # Keep track of global maximum
+        col_num = int(np.argmax(h_row[1:])) + 1
+        if match_distance is None or h_row[col_num] > match_distance:
+            match_distance = int(h_row[col_num])
+            match_end = (row_num,col_num)
+
+    return match_distance, match_end
+
+
+def affine_arrays(codes1, codes2, op_costs, actions, dtype, score_table=None, local=False):
+    """Edit array H and packed backtrace flags with affine gaps
+
+    Flags of H use the bits of actions, as for linear gaps. Two more
+      bits say whether the insertion (INSERT_EXTEND) or deletion
+      (DELETE_EXTEND) ending in a cell extends a gap, rather than
+      opening one.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations, 'Open' is the extra cost of opening a gap
+    actions : tuple
+        action of each bit, GLOBAL_ACTIONS or LOCAL_ACTIONS
+    dtype : numpy.dtype
+        integer type of the edit array, see score_dtype
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+    local : bool
+        floor every cell at zero, for local similarity
+
+    Outputs
+    -------
+    edit_array : numpy.array
+        values of H
+    backtrace_array : numpy.array
+        2d uint8 array of flags
+    """
+
+    ## Get operation costs into a dict
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+
+    len1 = len(codes1) + 1 # Count empty string
+    len2 = len(codes2) + 1 # Count empty string
+
+    edit_array = np.empty((len1,len2), dtype=dtype)
+    backtrace_array = np.zeros((len1,len2), dtype=np.uint8)
+    bits = {action:np.uint8(1 << bit) for bit, action in enumerate(actions)}
+
+    past_f = None
+    for row_num, (h_row, e_row, f_row, diag) in enumerate(affine_rows(codes1, codes2, op_costs, score_table, local)):
+        edit_array[row_num] = h_row
+        flags = backtrace_array[row_num]
+
+        # Actions reaching the value of H, the first row/column of
+        #  local alignments are the empty string
+        if local:
+            flags[h_row==0] |= bits['Zero']
+            if row_num==0:
+                past_f = f_row.copy()
+                continue
+            flags[0] = bits['Zero']
+        flags[h_row==e_row] |= bits['Insert']
+        flags[h_row==f_row] |= bits['Delete']
+        flags[h_row==diag] |= bits['Substitute']
+
+        # Gaps extended into the cell
+        flags[2:][e_row[2:]==e_row[1:-1]+INSERT] |= INSERT_EXTEND
+        if past_f is not None:
+            flags[f_row==past_f+DELETE] |= DELETE_EXTEND
+        past_f = f_row.copy()
+
+    return edit_array, backtrace_array
+
+
+def affine_path(backtrace_array, end, actions, preference, local=False):
+    """Backtrace path through the flags of affine_arrays
+
+    Gaps are followed to the cell where they open, so the path walks
+      between H and the insertion/deletion arrays as it steps back.
+
+    Inputs
+    ------
+    backtrace_array : numpy.array
+        flags from affine_arrays
+    end : tuple
+        (row, col) of the cell the path starts at
+    actions : tuple
+        action of each bit, GLOBAL_ACTIONS or LOCAL_ACTIONS
+    preference : tuple
+        order actions are tried in when several reach a cell's value
+    local : bool
+        stop at the first/zero cell, for local similarity
+
+    Outputs
+    -------
+    backtrace_path : list
+        list of indices of the path, from end back to its first cell
+    """
+
+    i, j = end
+    backtrace_path = [(i,j)]
+    state = 'H'
+    while (i > 0 and j > 0) if local else (i,j) != (0,0):
+        flags = int(backtrace_array[i,j])
+        if state=='Insert':
+            state = 'Insert' if flags & INSERT_EXTEND else 'H'
+            j -= 1
+        elif state=='Delete':
+            state = 'Delete' if flags & DELETE_EXTEND else 'H'
+            i -= 1
+        else:
+            action = next(action for action in preference if flags & (1 << actions.index(action)))
+            if action=='Zero':
+                break
+            if action=='Substitute':
+                i, j = i-1, j-1
+            else:
+                state = action
+                continue
+        backtrace_path.append((i,j))
+
+    return backtrace_path
@@ -0,0 +1,98 @@
+import operator
+
+# Operation costs of plain Levenshtein distance
+UNIT_COSTS = {'Delete':-1
+             ,'Insert':-1
+             ,'Substitute':-1
+             ,'Exact':0}
+
+# Bits of a machine word, Python integers chain words past it
+WORD_BITS = 64
+
+
+def is_unit_costs(op_costs):
+    """True if op_costs are the unit costs of Levenshtein distance"""
+    return all(op_costs.get(op)==cost for op, cost in UNIT_COSTS.items())
+
+
+def bit_parallel_words(str1, str2, test=operator.eq, word_bits=WORD_BITS):
+    """Number of machine words levenshtein_bit_parallel updates
+
+    Each symbol of the string looped over updates every word of the
+      bit vectors of the other string, one word per word_bits symbols.
+    """
+    if test is operator.eq and len(str2) > len(str1):
+        str1, str2 = str2, str1
+    return len(str2) * -(-len(str1)//word_bits)
+
+
+def levenshtein_bit_parallel(str1, str2, test=operator.eq):
+    """Levenshtein distance using Myers/Hyyro bit-vector algorithm
+
+    One column of the edit array is held as two bit vectors of 
+      vertical differences (+1 and -1) between neighbouring cells, 
+      one bit per symbol of str1. Each symbol of str2 updates the 
+      whole column with a handful of integer operations. Python 
+      integers have unbounded width, so str1 longer than a machine 
+      word is handled as a chain of words without extra work.
+
+    Inputs
+    ------
+    str1 : str or list of strings
+    str2 : str or list of strings
+    test : function
+        returns True if two symbols match
+
+    Outputs
+    -------
+    distance : int
+        minimum number of edits to transform str1 into str2
+    """
+
+    ## Distance is symmetric, so loop over the shorter string
+    ##  and keep the longer one in the bit vectors
+    if test is operator.eq and len(str2) > len(str1):
+        str1, str2 = str2, str1
+
+    len1 = len(str1)
+    if len1==0:
+        return len(str2)
+
+    ## Bit masks of the positions in str1 matching each symbol of str2
+    peq = {}
+    if test is operator.eq:
+        for ii, sub1 in enumerate(str1):
+            peq[sub1] = peq.get(sub1,0) | (1 << ii)
+    else:
+        for sub2 in str2:
+            if sub2 not in peq:
+                peq[sub2] = sum(1 << ii for ii, sub1 in enumerate(str1) if test(sub1,sub2))
+
+    mask = (1 << len1) - 1
+    high_bit = 1 << (len1-1)
+
+    ## Column for the empty prefix of str2 goes 0, 1, ..., len1
+    pos_v = mask
+    neg_v = 0
+    distance = len1
+
+    for sub2 in str2:
+        eq = peq.get(sub2,0)
+        x_v = eq | neg_v
+        x_h = (((eq & pos_v) + pos_v) ^ pos_v) | eq
+        pos_h = neg_v | (~(x_h | pos_v) & mask)
+        neg_h = pos_v & x_h
+
+        # Horizontal difference in the last row
+        if pos_h & high_bit:
+            distance += 1
+        elif neg_h & high_bit:
+            distance -= 1
+
+        # First row grows by one insertion per symbol of str2
+        pos_h = ((pos_h << 1) | 1) & mask
+        neg_h = (neg_h << 1) & mask
+        pos_v = neg_h | (~(x_v | pos_h) & mask)
+        neg_v = pos_h & x_v
+
+    return distance
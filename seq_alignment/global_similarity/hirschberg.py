@@ -0,0 +1,136 @@
+import numpy as np
+
+from ..helpers.encoding import row_scores
+from .vectorized import global_rows, global_last_row
+
+# Sub-problems with at most this many cells are solved with a full 
+#  edit array, which is a constant amount of memory
+BASE_CELLS = 4096
+
+# Order moves are tried in when backtracing, global_similarity prefers
+#  substitute/exact match, then deletion, then insertion
+GLOBAL_PREFERENCE = ('Substitute','Delete','Insert')
+
+
+def hirschberg_path(codes1, codes2, op_costs, score_table=None, preference=GLOBAL_PREFERENCE, return_cells=False):
+    """Optimal global alignment path in linear space (Hirschberg)
+
+    The middle row of str1 is swept forward from the start and 
+      backward from the end, using two rows of memory each. The 
+      column where the forward and backward scores add up to the 
+      optimum is on an optimal path, which splits the problem into 
+      two halves that are solved the same way.
+
+    Ties between equally good paths are broken towards the rightmost
+      split column, so the path can differ from the full backtrace 
+      when several optimal alignments exist. Both have the same score.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+    preference : tuple
+        order moves are tried in when backtracing small sub-problems
+    return_cells : bool
+        also return the number of cells filled, about twice the size
+        of the edit array as every split sweeps its rows twice
+
+    Outputs
+    -------
+    match_distance : int
+        optimal value of similarity problem
+    backtrace_path : list
+        list of indices showing the optimal path, from the last cell
+        of the edit array back to (0,0)
+    cells : int
+        cells filled by every sweep, only if return_cells
+    """
+
+    path = [(0,0)]
+    cells = _hirschberg(codes1, codes2, 0, len(codes1), 0, len(codes2), op_costs, score_table, preference, path)
+    path.reverse()
+
+    match_distance = path_score(path, codes1, codes2, op_costs, score_table)
+
+    if return_cells:
+        return match_distance, path, cells
+    return match_distance, path
+
+
+def path_score(path, codes1, codes2, op_costs, score_table=None):
+    """Add up the costs of the operations along a path"""
+
+    match_distance = 0
+    for (i_1, j_1), (i_0, j_0) in zip(path[:-1],path[1:]):
+        # Replacement/Substitution
+        if i_1 > i_0 and j_1 > j_0:
+            match_distance += int(row_scores(codes1[i_1-1], codes2[j_1-1:j_1], op_costs, score_table)[0])
+        # Insertion
+        elif i_1==i_0:
+            match_distance += op_costs['Insert']
+        # Deletion
+        else:
+            match_distance += op_costs['Delete']
+
+    return match_distance
+
+
+def _hirschberg(codes1, codes2, i0, i1, j0, j1, op_costs, score_table, preference, path):
+    """Append cells of an optimal path from (i0,j0) to (i1,j1) onto path,
+    returning the number of cells filled"""
+
+    if i1-i0 <= 1 or (i1-i0+1)*(j1-j0+1) <= BASE_CELLS:
+        _block_path(codes1, codes2, i0, i1, j0, j1, op_costs, score_table, preference, path)
+        return (i1-i0+1)*(j1-j0+1)
+
+    ## Score of every split column of the middle row, from the start
+    ##  and from the end
+    mid = (i0+i1)//2
+    forward = global_last_row(codes1[i0:mid], codes2[j0:j1], op_costs, score_table)
+    backward = global_last_row(codes1[mid:i1][::-1], codes2[j0:j1][::-1], op_costs, score_table)
+    total = forward + backward[::-1]
+
+    # Rightmost column with the best total
+    split = j0 + len(total) - 1 - int(np.argmax(total[::-1]))
+
+    cells = (i1-i0+2)*(j1-j0+1)
+    cells += _hirschberg(codes1, codes2, i0, mid, j0, split, op_costs, score_table, preference, path)
+    cells += _hirschberg(codes1, codes2, mid, i1, split, j1, op_costs, score_table, preference, path)
+    return cells
+
+
+def _block_path(codes1, codes2, i0, i1, j0, j1, op_costs, score_table, preference, path):
+    """Backtrace through a full edit array of a small sub-problem"""
+
+    sub1 = codes1[i0:i1]
+    sub2 = codes2[j0:j1]
+    edit_array = np.array([row.copy() for row in global_rows(sub1, sub2, op_costs, score_table)])
+
+    i, j = i1-i0, j1-j0
+    block_path = []
+    while (i,j) != (0,0):
+        block_path.append((i0+i,j0+j))
+
+        # Value of every move that leads into cell (i,j)
+        moves = {}
+        if i > 0 and j > 0:
+            moves['Substitute'] = (i-1,j-1,row_scores(sub1[i-1], sub2[j-1:j], op_costs, score_table)[0])
+        if i > 0:
+            moves['Delete'] = (i-1,j,op_costs['Delete'])
+        if j > 0:
+            moves['Insert'] = (i,j-1,op_costs['Insert'])
+
+        for move in preference:
+            if move in moves:
+                i_0, j_0, cost = moves[move]
+                if edit_array[i_0,j_0]+cost==edit_array[i,j]:
+                    i, j = i_0, j_0
+                    break
+
+    path.extend(reversed(block_path))
@@ -1,6 +1,23 @@
 import numpy as np
 from itertools import product
 import operator
+import time
+
+from ..helpers.encoding import encode_sequences, make_score_table, make_row_scorer
+from ..helpers.dtypes import score_dtype
+from ..helpers.instrumentation import NULL_TIMER, make_timer, make_record, array_bytes
+from ..helpers.backtrace import GLOBAL_ACTIONS, ACTION_BITS, pack_flags, make_step_table, make_arrow_table, align_path
+from .vectorized import global_last_row, global_banded_distance
+from .bit_parallel import is_unit_costs, levenshtein_bit_parallel, bit_parallel_words
+from .affine import is_affine, gap_open, affine_score, affine_arrays, affine_path
+from .hirschberg import hirschberg_path, GLOBAL_PREFERENCE
+
+# Step back from each value of packed backtrace flags, see _get_shortest_path
+STEP_TABLE = make_step_table(GLOBAL_ACTIONS,GLOBAL_PREFERENCE)
+ARROW_TABLE = make_arrow_table(GLOBAL_ACTIONS)
+
+# Engines available for computing the edit distance without backtrace
+ENGINES = ('auto','python','numpy','bitparallel')
 
 class global_similarity:
     """
@@ -16,13 +33,29 @@ class global_similarity:
         second string to compare
     backtrace : bool
         flag for whether to perform backtrace
+    linear_space : bool
+        flag for whether backtrace uses linear memory (Hirschberg)
+    engine : str
+        engine used when backtrace = False, one of 'auto', 'python',
+        'numpy' or 'bitparallel'
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, e.g. BLOSUM62
+    instrument : function or None
+        called with a record of timings, cells + bytes of each run
     edit_array : numpy.array
         array of edit distances
     match_distance : int
-        optimal value of similarity problem
+        optimal value of similarity problem, None if it exceeds 
+        max_distance or falls outside of the band
+    band : int
+        half width of diagonal band of edit array that is filled
+    max_distance : int
+        largest distance of interest, runs stop early beyond it
+    exceeds_threshold : bool
+        True if no alignment within band and max_distance exists
     backtrace_array : numpy.array
-        3d binary array of backtrace operations. In 3rd dimension, 1st is 
-        empty string, 2nd is insertion, 3rd is deletion, 4th is match
+        2d uint8 array of backtrace operations packed as bit flags. 
+        Bit 0 is insertion, bit 1 is deletion, bit 2 is match
     backtrace_path : list
         list of indices showing the optimal backtrace path
     backtrace_table : numpy.array
@@ -46,7 +79,14 @@ class global_similarity:
                           ,'Insert':-1
                           ,'Substitute':-1
                           ,'Exact':0}
-                ,test=operator.eq):
+                ,test=operator.eq
+                ,engine='auto'
+                ,band=None
+                ,max_distance=None
+                ,linear_space=False
+                ,substitution_matrix=None
+                ,vocabulary=None
+                ,instrument=None):
         """
         Inputs
         ------
@@ -54,17 +94,86 @@ class global_similarity:
         str2 : str or list of strings
         backtrace : bool
            flag for whether to perform backtrace
+        op_costs : dict
+           costs of operations. An optional 'Open' cost is paid once 
+           per gap on top of its 'Insert'/'Delete' costs (affine gaps),
+           which runs the numpy kernels of Gotoh's algorithm and so 
+           requires engine 'auto' or 'numpy'
+        engine : str
+           engine used when backtrace = False. 'python' fills the
+           edit array one cell at a time, 'numpy' fills it one 
+           row at a time with vectorized operations, 'bitparallel' 
+           packs a whole column into bit vectors and only works with 
+           unit costs. 'auto' picks 'bitparallel' for unit costs and 
+           'python' otherwise
+        band : int
+           only fill cells of the edit array with |row - col| <= band
+        max_distance : int
+           only look for alignments with match_distance >= -max_distance,
+           stopping as soon as a whole row of the edit array is below it.
+           Requires op_costs that are all <= 0, also narrows the band to
+           the number of insertions/deletions max_distance can pay for
+        linear_space : bool
+           when backtrace = True, find the alignment with Hirschberg's
+           algorithm in O(len1 + len2) memory. edit_array and 
+           backtrace_array are not stored
+        substitution_matrix : substitution_matrix
+           scores of aligning every pair of symbols, e.g. BLOSUM62.
+           Replaces test and the 'Substitute' and 'Exact' costs
+        vocabulary : vocabulary
+           integer ids of tokens shared across pairs, so test is only
+           called once per pair of distinct tokens over every pair
+        instrument : function or None
+           called after each run with a record of time spent per 
+           phase (setup, fill, traceback, align), cells filled and 
+           bytes of edit_array/backtrace_array, e.g. a collector.
+           None skips all timing
         """
 
+        if instrument is not None:
+            setup_start = time.perf_counter()
+
+        if engine not in ENGINES:
+            raise ValueError("engine must be one of {}, got {!r}".format(ENGINES,engine))
+        affine = is_affine(op_costs)
+        unit_costs = is_unit_costs(op_costs) and substitution_matrix is None and not affine
+        if gap_open(op_costs) > 0:
+            raise ValueError("'Open' cost must be <= 0, got {!r}".format(op_costs))
+        if affine and engine not in ('auto','numpy'):
+            raise ValueError("affine gaps require engine 'auto' or 'numpy', got {!r}".format(engine))
+        if engine=='bitparallel' and not unit_costs:
+            raise ValueError("engine 'bitparallel' requires unit op_costs, got {!r}".format(op_costs))
+        if max_distance is not None and max(op_costs.values()) > 0:
+            raise ValueError("max_distance requires op_costs <= 0, got {!r}".format(op_costs))
+        if max_distance is not None and substitution_matrix is not None and substitution_matrix.table.max() > 0:
+            raise ValueError("max_distance requires substitution_matrix scores <= 0")
+        banded = band is not None or max_distance is not None
+        if engine=='bitparallel' and banded:
+            raise ValueError("engine 'bitparallel' does not support band or max_distance")
+        if linear_space and banded:
+            raise ValueError("linear_space does not support band or max_distance")
+        if affine and (banded or linear_space):
+            raise ValueError("affine gaps do not support band, max_distance or linear_space")
+        if engine=='auto':
+            if banded or affine:
+                engine = 'numpy'
+            else:
+                engine = 'bitparallel' if unit_costs else 'python'
+
         # Set parameter variables
         self.str1 = str1 
         self.str2 = str2
         self.edit_array = None
         self.match_distance = None
         self.backtrace = backtrace
+        self.linear_space = linear_space
+        self.engine = engine
+        self.affine = affine
 
-        # Create testing function
+        # Create testing function + scores of pairs of symbols
         self.test = test
+        self.substitution_matrix = substitution_matrix
+        self.vocabulary = vocabulary
         
         # Set helper values
         self.len1 = len(self.str1) + 1 # Count empty string
@@ -73,6 +182,55 @@ class global_similarity:
         # Set values of cost of operations
         self.op_costs = op_costs
 
+        # Set band + threshold, each insertion/deletion moves one
+        #  cell off the diagonal so max_distance caps the band
+        self.band = band
+        self.max_distance = max_distance
+        self.exceeds_threshold = False
+        if max_distance is not None:
+            gap_cost = min(-op_costs['Insert'],-op_costs['Delete'])
+            if gap_cost > 0:
+                max_band = max_distance // gap_cost
+                self.band = max_band if band is None else min(band,max_band)
+
+        # Report runs to instrument, with the time spent setting up
+        self.instrument = instrument
+        if instrument is not None:
+            self.setup_time = time.perf_counter() - setup_start
+
+    def _encode(self):
+        '''
+        Map both strings onto integer codes, along with the table of 
+          substitute/exact values of every pair of codes
+        '''
+        if self.vocabulary is not None:
+            return (self.vocabulary.encode(self.str1),self.vocabulary.encode(self.str2)
+                   ,self.vocabulary.score_table(self.op_costs,self.test,self.substitution_matrix))
+        alphabet, codes1, codes2 = encode_sequences(self.str1,self.str2)
+        score_table = make_score_table(alphabet,self.op_costs,self.test,self.substitution_matrix)
+        return codes1, codes2, score_table
+
+    def _band_limits(self, row):
+        '''
+        First and last column of the band in a row of the edit array
+        '''
+        if self.band is None:
+            return 0, self.len2-1
+        return max(0,row-self.band), min(self.len2-1,row+self.band)
+
+    def _outside_band(self):
+        '''
+        True if the last cell of the edit array is outside of the band,
+          so no path of the band reaches it
+        '''
+        return self.band is not None and abs(self.len1-self.len2) > self.band
+
+    def _below_threshold(self, values):
+        '''
+        True if every value is below -max_distance, or there are none
+        '''
+        return self.max_distance is not None and (len(values)==0 or max(values) < -self.max_distance)
+
     def run(self):
         """Run string distance algorithm to find maximum similarity score b/w strings
          
@@ -84,8 +242,16 @@ class global_similarity:
         -------
         _run_with_backtrace()
             runs algorithm, storing backtrace values in backtrace_array
+        _run_linear_space()
+            runs algorithm, finding backtrace path in linear memory
+        _run_affine()
+            runs Gotoh's algorithm for affine gaps, with or without backtrace
         _run_without_backtrace()
             runs algorithm, not storing backtrace values
+        _run_without_backtrace_numpy()
+            runs algorithm row by row with numpy, not storing backtrace values
+        _run_without_backtrace_bit_parallel()
+            runs algorithm on bit vectors, only for unit costs
         _align_matches()
             uses backtrace values to find optimal alignment path, 
             returns alignment of strings and edit actions used to create
@@ -100,7 +266,25 @@ class global_similarity:
             only occrus if backtrace = True. 
         """
 
-        if self.backtrace:
+        timer = make_timer(self.instrument)
+
+        # Rows of the edit array swept, fewer when stopping early, and
+        #  cells filled by engines that don't sweep it row by row
+        self._rows_swept = self.len1
+        self._cells_filled = None
+
+        if self._outside_band():
+            # Every banded path stops short of the last cell, nothing to fill
+            self._rows_swept = 0
+            self.exceeds_threshold = True
+            self.match_distance = None
+            if self.backtrace:
+                self.backtrace_array = None
+                self.backtrace_path = None
+                self.backtrace_table = None
+                self.match_alignment_table = None
+
+        elif self.backtrace:
             # Create arrays for holding data 
             self.backtrace = True
             self.backtrace_array = None
@@ -108,16 +292,64 @@ class global_similarity:
             self.backtrace_table = None
             self.match_alignment_table = None
 
-            # Run string matching, keeping edit distance array
-            self._run_with_backtrace()
+            with timer.phase('fill'):
+                if self.linear_space:
+                    # Run string matching, keeping only the path
+                    self._run_linear_space()
+                elif self.affine:
+                    # Run string matching with affine gaps
+                    self._run_affine()
+                else:
+                    # Run string matching, keeping edit distance array
+                    self._run_with_backtrace()
 
             # Create string alignment from str1 to str2,
             #  with edit distance operations
-            self._align_matches()
-        
+            if not self.exceeds_threshold:
+                self._align_matches(timer)
+
         else:
-            # Run string matching, storing edit distance array
-            self._run_without_backtrace()
+            with timer.phase('fill'):
+                if self.affine:
+                    # Run string matching with affine gaps, two rows at a time
+                    self._run_affine()
+
+                elif self.engine=='numpy':
+                    # Run string matching one row at a time
+                    self._run_without_backtrace_numpy()
+
+                elif self.engine=='bitparallel':
+                    # Run string matching one column of bits at a time
+                    self._run_without_backtrace_bit_parallel()
+
+                elif self.band is not None or self.max_distance is not None:
+                    # Run string matching over the band only
+                    self._run_without_backtrace_banded()
+
+                else:
+                    # Run string matching, storing edit distance array
+                    self._run_without_backtrace()
+
+        if self.instrument is not None:
+            timer.phases['setup'] = self.setup_time
+            self.instrument(make_record('global_similarity',timer,self._cells()
+                                       ,array_bytes(edit_array=self.edit_array
+                                                  ,backtrace_array=getattr(self,'backtrace_array',None))))
+
+    def _cells(self):
+        '''
+        Number of cells of the edit array (or its band) a run filled,
+          over the rows swept before stopping. Hirschberg counts the 
+          cells of every sweep, bit-parallel counts the machine words 
+          of its bit vectors
+        '''
+        if self._cells_filled is not None:
+            return self._cells_filled
+        if self.band is None:
+            return self._rows_swept*self.len2
+        rows = np.arange(self._rows_swept)
+        widths = np.minimum(self.len2-1,rows+self.band) - np.maximum(0,rows-self.band) + 1
+        return int(np.maximum(widths,0).sum())
     
     def _run_with_backtrace(self):
         """Run algorithm while storing edit distance array
@@ -125,8 +357,8 @@ class global_similarity:
         OUTPUT
         ------
         backtrace_array : np.array
-            3d binary array of backtrace operations. 1st is 
-            empty string, 2nd is insertion, 3rd is deletion
+            2d uint8 array of backtrace operations packed as bit 
+            flags. Bit 0 is insertion, bit 1 is deletion, bit 2 is match
         match_distance : int
             optimal value of similarity problem
         """
@@ -135,7 +367,9 @@ class global_similarity:
         ##  dist values
         ##
         ## Add extra row + column for empty string
-        self.edit_array = np.empty((self.len1,self.len2), dtype=np.int8)
+        ## Values are stored in the narrowest type that can't overflow
+        dtype = score_dtype(self.len1,self.len2,self.op_costs,self.substitution_matrix)
+        self.edit_array = np.empty((self.len1,self.len2), dtype=dtype)
 
         ## Initialize first row + column of array
         ##  for the empty string value
@@ -143,45 +377,96 @@ class global_similarity:
         self.edit_array[0,:] = [i*self.op_costs['Insert'] for i in np.arange(0,self.len2)]
 
         ## Initalize matrix for backtrace values
-        self.backtrace_array = np.zeros((self.len1,self.len2,3), dtype=bool)
+        self.backtrace_array = np.zeros((self.len1,self.len2), dtype=np.uint8)
+
+        # Once hit the first col/row can only do deletions/insertions
+        self.backtrace_array[1:,0] = 1 << GLOBAL_ACTIONS.index('Delete')
+        self.backtrace_array[0,:] = 1 << GLOBAL_ACTIONS.index('Insert')
+
+        ## Cells outside of the band are never on a path
+        OUTSIDE = float('-inf')
+
+        ## Values of substitute or exact match, one row at a time
+        codes1, codes2, score_table = self._encode()
+        row_scorer = make_row_scorer(codes1,codes2,self.op_costs,score_table)
 
         ## Fill in row by row, keeping 
         ##   track of backtrace values 
-        for row, col in product(range(1,self.len1), range(1,self.len2)):
-            
-            # Get substrings to compare
-            sub1 = self.str1[row-1]
-            sub2 = self.str2[col-1]
-            
-            # Find minimum values using
-            #  bellman recursion
-            #
-            # Order is : [Insert, Delete, Substitute or Exact Match]
-
-            # Value of substitute or exact match
-            t_ij = self.op_costs['Substitute']*(sub1!=sub2) + self.op_costs['Exact']*(1-(sub1!=sub2))
-
-            # Values of inserting, deleting and substituting
-            action_values = [self.edit_array[row,col-1]+self.op_costs['Insert']
-                            ,self.edit_array[row-1,col]+self.op_costs['Delete']
-                            ,self.edit_array[row-1,col-1]+t_ij
-                            ]
-
-            # What is minimum value of action
-            max_val = np.max(action_values)
-            self.edit_array[row,col] = max_val
-            
-            # Which action resulted in minimum value
-            self.backtrace_array[row,col,np.where(action_values==max_val)] = 1
+        for row in range(1,self.len1):
+            lo, hi = self._band_limits(row)
+            past_hi = self._band_limits(row-1)[1]
+            start = max(lo,1)
+            t_row = row_scorer(row,start-1,hi)
+
+            for col in range(start,hi+1):
+                
+                # Find minimum values using
+                #  bellman recursion
+                #
+                # Order is : [Insert, Delete, Substitute or Exact Match]
+
+                # Value of substitute or exact match
+                t_ij = t_row[col-start]
+
+                # Values of inserting, deleting and substituting
+                action_values = [self.edit_array[row,col-1]+self.op_costs['Insert'] if col > lo else OUTSIDE
+                                ,self.edit_array[row-1,col]+self.op_costs['Delete'] if col <= past_hi else OUTSIDE
+                                ,self.edit_array[row-1,col-1]+t_ij
+                                ]
+
+                # What is minimum value of action
+                max_val = np.max(action_values)
+                self.edit_array[row,col] = max_val
+                
+                # Which action resulted in minimum value
+                self.backtrace_array[row,col] = pack_flags(action_values,max_val)
+
+            # Every path crosses this row, stop once all of it is too low
+            if self._below_threshold(self.edit_array[row,lo:hi+1]):
+                self.exceeds_threshold = True
+                self._rows_swept = row+1
+                return
 
-        # Once hit the first col/row can only do deletions/insertions
-        self.backtrace_array[:,0,:] = 0 
-        self.backtrace_array[:,0,1] = 1 
-        self.backtrace_array[0,:,0] = 1
-        self.backtrace_array[0,:,1:] = 0
-            
         # Get distance between strings
         self.match_distance = self.edit_array[-1,-1]
+        if self._below_threshold([self.match_distance]):
+            self.exceeds_threshold = True
+            self.match_distance = None
+
+    def _run_linear_space(self):
+        '''
+        Find the backtrace path with Hirschberg's algorithm, see 
+          hirschberg_path. Only rows of the distance array are kept.
+        '''
+
+        ## Map both strings onto integer codes, evaluating
+        ##  test once per pair of distinct symbols
+        codes1, codes2, score_table = self._encode()
+
+        self.match_distance, self.backtrace_path, self._cells_filled = hirschberg_path(codes1,codes2,self.op_costs
+                                                                                      ,score_table,return_cells=True)
+
+    def _run_affine(self):
+        """Run Gotoh's algorithm for affine gaps with numpy, see affine_rows
+
+        Without backtrace only two rows of each edit array are kept. 
+        With backtrace H is stored as edit_array, along with flags of
+        the gaps that extend into each cell, and the path follows gaps
+        back to where they open.
+        """
+
+        codes1, codes2, score_table = self._encode()
+
+        if not self.backtrace:
+            self.match_distance = affine_score(codes1,codes2,self.op_costs,score_table)
+            return
+
+        dtype = score_dtype(self.len1,self.len2,self.op_costs,self.substitution_matrix)
+        self.edit_array, self.backtrace_array = affine_arrays(codes1,codes2,self.op_costs,GLOBAL_ACTIONS
+                                                             ,dtype,score_table)
+        self.match_distance = self.edit_array[-1,-1]
+        self.backtrace_path = affine_path(self.backtrace_array,(self.len1-1,self.len2-1)
+                                         ,GLOBAL_ACTIONS,GLOBAL_PREFERENCE)
 
     def _run_without_backtrace(self):
         '''
@@ -209,21 +494,18 @@ class global_similarity:
         ## Get operation costs into a dict
         INSERT = self.op_costs['Insert']
         DELETE = self.op_costs['Delete']
-        SUBSTITUTE = self.op_costs['Substitute']
-        EXACT = self.op_costs['Exact']
 
         ## SET VARIABLES WE NEED FOR RUN
         len1 = self.len1
         len2 = self.len2
-        str1 = self.str1
-        str2 = self.str2
-        test = self.test
+        codes1, codes2, score_table = self._encode()
+        row_scorer = make_row_scorer(codes1,codes2,self.op_costs,score_table)
 
         ## Initialize first row of array + first element of next row
         ##  for the empty string value
         past_row = [0] * (len2)
         for i in range(0,len2):
-            past_row[i] = i*DELETE
+            past_row[i] = i*INSERT
 
         ## Initialize current row 
         curr_row = [0] * (len2)
@@ -231,6 +513,7 @@ class global_similarity:
         ## Go row by row, keeping track of past row + current row only
         for row_num in range(1,len1):
             curr_row[0] = DELETE*row_num
+            t_row = row_scorer(row_num)
             for col_num in range(1,len2):
 
                 # Find maximum values using
@@ -239,8 +522,7 @@ class global_similarity:
                 # Order is : [Insert, Delete, Substitute or Exact Match]
 
                 # Value of substitute or exact match
-                
-                t_ij = EXACT if test(str1[row_num-1],str2[col_num-1]) else SUBSTITUTE
+                t_ij = t_row[col_num-1]
 
                 # Values of inserting, deleting and substituting
                 curr_row[col_num] = max(curr_row[col_num-1]+INSERT
@@ -250,11 +532,112 @@ class global_similarity:
 
             # Moving onto to comparing next letter in the first string 
             # i.e. moving down a row
-            for i in range(1,len2):
+            for i in range(0,len2):
                 past_row[i] = curr_row[i]
             
         # Get distance between strings
         self.match_distance = past_row[-1]
+
+    def _run_without_backtrace_banded(self):
+        '''
+        Run string distance algorithm over the band of the distance
+          array only, stopping once a row is entirely below 
+          -max_distance.
+        '''
+
+        ## Get operation costs into a dict
+        INSERT = self.op_costs['Insert']
+        DELETE = self.op_costs['Delete']
+
+        ## SET VARIABLES WE NEED FOR RUN
+        len1 = self.len1
+        len2 = self.len2
+        codes1, codes2, score_table = self._encode()
+        row_scorer = make_row_scorer(codes1,codes2,self.op_costs,score_table)
+
+        ## Cells outside of the band are never on a path
+        OUTSIDE = float('-inf')
+
+        ## Initialize first row of array for the empty string value
+        past_row = [OUTSIDE] * (len2)
+        for i in range(0,self._band_limits(0)[1]+1):
+            past_row[i] = i*INSERT
+
+        ## Initialize current row 
+        curr_row = [OUTSIDE] * (len2)
+        
+        ## Go row by row, over the band only
+        for row_num in range(1,len1):
+            lo, hi = self._band_limits(row_num)
+
+            # Clear cells left over from two rows up
+            for i in range(max(0,lo-2),lo):
+                curr_row[i] = OUTSIDE
+
+            if lo==0:
+                curr_row[0] = DELETE*row_num
+            start = max(lo,1)
+            t_row = row_scorer(row_num,start-1,hi)
+            for col_num in range(start,hi+1):
+
+                # Value of substitute or exact match
+                t_ij = t_row[col_num-start]
+
+                # Values of inserting, deleting and substituting
+                curr_row[col_num] = max(curr_row[col_num-1]+INSERT
+                                        ,past_row[col_num]+DELETE
+                                        ,past_row[col_num-1]+t_ij
+                                        )
+
+            # Every path crosses this row, stop once all of it is too low
+            if self._below_threshold(curr_row[lo:hi+1]):
+                self.exceeds_threshold = True
+                self._rows_swept = row_num+1
+                return
+
+            past_row, curr_row = curr_row, past_row
+
+        # Get distance between strings
+        self.match_distance = past_row[-1]
+        if self._below_threshold([self.match_distance]):
+            self.exceeds_threshold = True
+            self.match_distance = None
+
+    def _run_without_backtrace_numpy(self):
+        '''
+        Run string distance algorithm one row at a time using 
+          numpy, see global_last_row. Gives the same distance as 
+          _run_without_backtrace. With a band or max_distance only 
+          the band is swept, see global_banded_distance.
+        '''
+
+        ## Map both strings onto integer codes, evaluating
+        ##  test once per pair of distinct symbols
+        codes1, codes2, score_table = self._encode()
+
+        if self.band is not None or self.max_distance is not None:
+            min_score = None if self.max_distance is None else -self.max_distance
+            self.match_distance, self._rows_swept = global_banded_distance(codes1,codes2,self.op_costs,score_table
+                                                                          ,self.band,min_score,return_rows=True)
+            self.exceeds_threshold = self.match_distance is None
+            return
+
+        last_row = global_last_row(codes1,codes2,self.op_costs,score_table)
+
+        # Get distance between strings
+        self.match_distance = int(last_row[-1])
+
+    def _run_without_backtrace_bit_parallel(self):
+        '''
+        Run Levenshtein distance on bit vectors, see 
+          levenshtein_bit_parallel. Requires unit op_costs.
+        '''
+
+        distance = levenshtein_bit_parallel(self.str1,self.str2,self.test)
+        self._cells_filled = bit_parallel_words(self.str1,self.str2,self.test)
+
+        # Unit costs are all -1, so similarity is minus the distance
+        self.match_distance = -distance
     
     def _get_shortest_path(self):
         '''
@@ -266,16 +649,12 @@ class global_similarity:
         i, j = self.len1-1, self.len2-1
         self.backtrace_path = [(i,j)]
 
+        ## Flags decode straight into a step back, preferring
+        ##  substitution/exact match, then deletion, then insertion
+        backtrace_array = self.backtrace_array
         while (i,j) != (0,0):
-            # Substitution/Exact Match
-            if self.backtrace_array[i,j,2]==1:
-                i,j = (i-1,j-1)
-            # Deletion
-            elif self.backtrace_array[i,j,1]==1:
-                i,j = (i-1,j)
-            # Insertion
-            elif self.backtrace_array[i,j,0]==1:
-                i,j = (i,j-1)
+            di, dj = STEP_TABLE[backtrace_array[i,j]]
+            i,j = (i-di,j-dj)
             self.backtrace_path.append((i,j))
 
     def make_backtrace_table(self):
@@ -284,69 +663,28 @@ class global_similarity:
           initializing class
         '''
 
+        if self.linear_space:
+            raise ValueError("make_backtrace_table requires linear_space=False, no backtrace_array is stored")
+
         # Run string matching
         self.run()
 
-        # Initialize list to hold arrows
+        # Look up arrows of every cell at once
         # Index is [row][col]
-        self.backtrace_table = []
-
-        # Get total # cols and rows
-        rows = self.backtrace_array.shape[0]
-        cols = self.backtrace_array.shape[1]
-
-        # Loop through row and col to get direction
-        for i in range(0,rows):
-            row_elems = []
-            for j in range(0,cols):
-                directions=''
-                btrace_elems = self.backtrace_array[i,j,:]
-                if btrace_elems[0]==1:
-                    directions=directions+'⇐'
-                if btrace_elems[1]==1:
-                    directions=directions+'⇑'
-                if btrace_elems[2]==1:
-                    directions=directions+'⇖'
-                row_elems.append(directions)
-            self.backtrace_table.append(row_elems)
+        self.backtrace_table = ARROW_TABLE[self.backtrace_array & ACTION_BITS].tolist()
     
-    def _align_matches(self):
+    def _align_matches(self, timer=NULL_TIMER):
         '''
         Requires backtrace array, set backtrace = True when 
           initializing class
         '''
         
-        # Get shortest path
-        self._get_shortest_path()
+        # Get shortest path, unless already found in linear space
+        if self.backtrace_path is None:
+            with timer.phase('traceback'):
+                self._get_shortest_path()
         
-        # Initialize aligned text
-        str1_aligned = []
-        str2_aligned = []
-        action = []
-
-        for ix in range(len(self.backtrace_path)-1,0,-1):
-            i_0, j_0 = self.backtrace_path[ix]
-            i_1, j_1 = self.backtrace_path[ix-1]
-
-            # Replacement/Substitution
-            if i_1 > i_0 and j_1 > j_0:
-                # Do letters match 
-                if self.str1[i_1-1]==self.str2[j_1-1]:
-                    action.append('S')
-                else:
-                    action.append('R')
-                str1_aligned.append(self.str1[i_1-1])
-                str2_aligned.append(self.str2[j_1-1])
-            # Insertion
-            elif i_1==i_0:
-                action.append('I')
-                str1_aligned.append(' ')
-                str2_aligned.append(self.str2[j_1-1])
-            # Deletion 
-            elif j_1==j_0:
-                action.append('D')
-                str1_aligned.append(self.str1[i_1-1])
-                str2_aligned.append(' ')
-
-        self.match_alignment_table = np.array([str1_aligned,str2_aligned,action])
+        with timer.phase('align'):
+            self.match_alignment_table = align_path(self.str1,self.str2,self.backtrace_path)
+
 
@@ -0,0 +1,197 @@
+import numpy as np
+
+from ..helpers.encoding import row_scores
+
+
+def global_rows(codes1, codes2, op_costs, score_table=None):
+    """Sweep the global edit array row by row with numpy operations
+
+    Each row is filled in two vectorized steps. First the deletion 
+      and substitute/exact moves, which only depend on the past row. 
+      Then the chain of insertions along the row, which is a prefix 
+      maximum once the insertion costs are taken out :
+
+        curr[j] = max_{k<=j} (tmp[k] - k*INSERT) + j*INSERT
+
+    Only two rows are kept, so rows are yielded in a reused buffer 
+      and must be copied to be kept past the next row.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+
+    Outputs
+    -------
+    row : numpy.array
+        each row of the edit array, starting with the empty string row
+    """
+
+    ## Get operation costs into a dict
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+
+    len1 = len(codes1) + 1 # Count empty string
+    len2 = len(codes2) + 1 # Count empty string
+
+    ## Cost of inserting every prefix of str2
+    insert_chain = np.arange(0,len2,dtype=np.int64)*INSERT
+
+    ## Initialize first row of array for the empty string value
+    past_row = insert_chain.copy()
+    curr_row = np.empty(len2, dtype=np.int64)
+    yield past_row
+
+    ## Go row by row, keeping track of past row + current row only
+    for row_num in range(1,len1):
+        t_row = row_scores(codes1[row_num-1], codes2, op_costs, score_table)
+
+        # Deletion + substitute/exact match
+        curr_row[0] = DELETE*row_num
+        np.maximum(past_row[1:]+DELETE, past_row[:-1]+t_row, out=curr_row[1:])
+
+        # Insertions along the row
+        curr_row -= insert_chain
+        np.maximum.accumulate(curr_row, out=curr_row)
+        curr_row += insert_chain
+
+        past_row, curr_row = curr_row, past_row
+        yield past_row
+
+
+def global_last_row(codes1, codes2, op_costs, score_table=None):
+    """Last row of the global edit array, see global_rows
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+
+    Outputs
+    -------
+    last_row : numpy.array
+        last row of the edit array, the distance between strings
+        is the last element
+    """
+
+    for last_row in global_rows(codes1, codes2, op_costs, score_table):
+        pass
+
+    return last_row
+
+
+def global_banded_distance(codes1, codes2, op_costs, score_table=None, band=None, min_score=None, return_rows=False):
+    """Sweep only a diagonal band of the global edit array with numpy
+
+    Row i only fills the cells i-band <= j <= i+band, cells outside
+      the band are never on an alignment path. When min_score is given
+      the sweep stops as soon as every cell of a row is below it, 
+      which is only valid when no operation has a positive cost.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+    band : int or None
+        half width of the band, None for no band
+    min_score : int or None
+        lowest score of interest, None for no threshold
+    return_rows : bool
+        also return the number of rows swept before stopping
+
+    Outputs
+    -------
+    match_distance : int or None
+        distance between strings, None if the last cell is outside 
+        the band or the score is below min_score
+    rows : int
+        rows of the edit array swept, only if return_rows
+    """
+
+    match_distance, rows = _banded_distance(codes1, codes2, op_costs, score_table, band, min_score)
+    if return_rows:
+        return match_distance, rows
+    return match_distance
+
+
+def _banded_distance(codes1, codes2, op_costs, score_table, band, min_score):
+    '''
+    (match_distance, rows swept) of global_banded_distance
+    '''
+
+    ## Get operation costs into a dict
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+
+    len1 = len(codes1) + 1 # Count empty string
+    len2 = len(codes2) + 1 # Count empty string
+    if band is None:
+        band = len1 + len2
+    if abs(len1-len2) > band:
+        return None, 0
+
+    ## Cells outside of the band, low enough that adding costs
+    ##  can never bring them back into play
+    OUTSIDE = np.iinfo(np.int64).min // 2
+
+    ## Cost of inserting every prefix of str2
+    insert_chain = np.arange(0,len2,dtype=np.int64)*INSERT
+
+    ## Initialize first row of array for the empty string value
+    past_row = np.full(len2, OUTSIDE, dtype=np.int64)
+    past_row[:band+1] = insert_chain[:band+1]
+    curr_row = np.full(len2, OUTSIDE, dtype=np.int64)
+
+    if min_score is not None and past_row.max() < min_score:
+        return None, 1
+
+    ## Go row by row, only over the band
+    for row_num in range(1,len1):
+        lo = max(0,row_num-band)
+        hi = min(len2-1,row_num+band)
+
+        # Clear cells left over from two rows up
+        curr_row[max(0,lo-2):lo] = OUTSIDE
+
+        # Deletion + substitute/exact match
+        start = max(lo,1)
+        t_row = row_scores(codes1[row_num-1], codes2[start-1:hi], op_costs, score_table)
+        np.maximum(past_row[start:hi+1]+DELETE, past_row[start-1:hi]+t_row, out=curr_row[start:hi+1])
+        if lo==0:
+            curr_row[0] = DELETE*row_num
+
+        # Insertions along the band
+        curr_band = curr_row[lo:hi+1]
+        curr_band -= insert_chain[lo:hi+1]
+        np.maximum.accumulate(curr_band, out=curr_band)
+        curr_band += insert_chain[lo:hi+1]
+
+        # Every path crosses this row, stop once all of it is too low
+        if min_score is not None and curr_band.max() < min_score:
+            return None, row_num+1
+
+        past_row, curr_row = curr_row, past_row
+
+    match_distance = int(past_row[-1])
+    if min_score is not None and match_distance < min_score:
+        return None, len1
+
+    return match_distance, len1
@@ -0,0 +1,106 @@
+import numpy as np
+
+## Backtrace operations are packed as bit flags into one uint8 per cell 
+##  of the edit array, bit k is set when action k reaches the cell's value
+
+# Global similarity actions, in order : [Insert, Delete, Substitute or Exact Match]
+GLOBAL_ACTIONS = ('Insert','Delete','Substitute')
+
+# Local similarity actions, in order : [Zero String, Insert, Delete, Substitute or Exact Match]
+LOCAL_ACTIONS = ('Zero','Insert','Delete','Substitute')
+
+# Affine gaps also flag whether the insertion/deletion ending in a 
+#  cell extends a gap, above the bits of the actions
+INSERT_EXTEND = np.uint8(1 << 4)
+DELETE_EXTEND = np.uint8(1 << 5)
+ACTION_BITS = np.uint8((1 << 4) - 1)
+
+# Step back through the edit array for each action, None stops the path
+ACTION_STEPS = {'Zero':None
+               ,'Insert':(0,1)
+               ,'Delete':(1,0)
+               ,'Substitute':(1,1)}
+
+# Arrow drawn in backtrace tables for each action
+ACTION_ARROWS = {'Zero':''
+                ,'Insert':'⇐'
+                ,'Delete':'⇑'
+                ,'Substitute':'⇖'}
+
+
+def pack_flags(action_values, max_val):
+    """Bit flags of the actions whose value is max_val"""
+    flags = 0
+    for bit, value in enumerate(action_values):
+        if value==max_val:
+            flags |= 1 << bit
+    return flags
+
+
+def make_step_table(actions, preference):
+    """Step taken back from a cell for every possible value of its flags
+
+    Inputs
+    ------
+    actions : tuple
+        action of each bit, GLOBAL_ACTIONS or LOCAL_ACTIONS
+    preference : tuple
+        order actions are tried in when several reach the cell's value
+
+    Outputs
+    -------
+    step_table : list
+        (row step, col step) for each flag value, None to stop
+    """
+
+    step_table = []
+    for flags in range(1 << len(actions)):
+        step = None
+        for action in preference:
+            if flags & (1 << actions.index(action)):
+                step = ACTION_STEPS[action]
+                break
+        step_table.append(step)
+    return step_table
+
+
+def make_arrow_table(actions):
+    """Arrows drawn for every possible value of a cell's flags"""
+    return np.array([''.join(ACTION_ARROWS[action] for bit, action in enumerate(actions) if flags & (1 << bit))
+                     for flags in range(1 << len(actions))])
+
+
+def align_path(str1, str2, backtrace_path):
+    """Aligned strings and edit actions along a backtrace path
+
+    Inputs
+    ------
+    str1 : str or list of strings
+    str2 : str or list of strings
+    backtrace_path : list
+        list of indices of the path, from its last cell back to its first
+
+    Outputs
+    -------
+    match_alignment_table : numpy.array
+        array with aligned strings in first 2 rows. 3rd row is edit actions
+    """
+
+    ## Cells of the path in order, and the step into each of them
+    path = np.array(backtrace_path[::-1], dtype=np.int64).reshape(-1,2)
+    rows, cols = path[1:,0], path[1:,1]
+    row_step = np.diff(path[:,0]) > 0
+    col_step = np.diff(path[:,1]) > 0
+
+    ## Symbols consumed at each step, with a gap as the last symbol
+    symbols1 = np.array(list(str1) + [' '])
+    symbols2 = np.array(list(str2) + [' '])
+    str1_aligned = symbols1[np.where(row_step, rows-1, len(str1))]
+    str2_aligned = symbols2[np.where(col_step, cols-1, len(str2))]
+
+    # Substitution/exact match, insertion or deletion
+    action = np.where(row_step & col_step
+                     ,np.where(str1_aligned==str2_aligned,'S','R')
+                     ,np.where(row_step,'D','I'))
+
+    return np.array([str1_aligned.tolist(),str2_aligned.tolist(),action.tolist()])
@@ -0,0 +1,164 @@
+import itertools
+import tracemalloc
+import string
+import random
+import time
+import json
+
+from ..global_similarity import global_similarity
+from ..local_similarity import local_similarity
+
+# Similarity class run for each mode
+MODES = {'global':global_similarity
+        ,'local':local_similarity}
+
+# Configurations timed at every length + alphabet size. Filling the
+#  full edit array with backtrace runs one cell at a time, so it
+#  stops at max_length
+CASES = [{'name':'global-score-numpy','mode':'global','backtrace':False,'options':{'engine':'numpy'}}
+        ,{'name':'global-score-bitparallel','mode':'global','backtrace':False,'options':{'engine':'bitparallel'}}
+        ,{'name':'global-backtrace','mode':'global','backtrace':True,'options':{},'max_length':1000}
+        ,{'name':'global-backtrace-linear','mode':'global','backtrace':True,'options':{'linear_space':True}}
+        ,{'name':'local-score-numpy','mode':'local','backtrace':False,'options':{'engine':'numpy'}}
+        ,{'name':'local-backtrace','mode':'local','backtrace':True,'options':{},'max_length':1000}
+        ,{'name':'local-backtrace-linear','mode':'local','backtrace':True,'options':{'linear_space':True}}]
+
+# Sweep of sequence lengths + alphabet sizes (DNA, protein)
+LENGTHS = (100,1000,10000)
+ALPHABET_SIZES = (4,20)
+
+# Fraction of baseline throughput a case may lose before it fails
+REGRESSION_THRESHOLD = 0.25
+
+
+def random_pair(length, alphabet_size, seed=0):
+    """Two random sequences of length symbols, drawn from the first
+    alphabet_size lowercase letters"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase[:alphabet_size]
+    return tuple(''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(2))
+
+
+def case_key(case, length, alphabet_size):
+    """Name of one benchmark in baseline files"""
+    return '{}/n={}/alphabet={}'.format(case['name'],length,alphabet_size)
+
+
+def time_case(case, str1, str2, repeat=3):
+    """Time one case on one pair of sequences
+
+    Inputs
+    ------
+    case : dict
+        one of CASES
+    str1 : str
+    str2 : str
+    repeat : int
+        number of timed runs, the fastest is kept
+
+    Outputs
+    -------
+    result : dict
+        wall_time (seconds), cells_per_second and peak_memory (bytes,
+        from a separate run under tracemalloc)
+    """
+
+    similarity = MODES[case['mode']]
+
+    def run():
+        sim_init = similarity(str1,str2,case['backtrace'],**case['options'])
+        sim_init.run()
+
+    wall_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        wall_time = min(wall_time,time.perf_counter()-start)
+
+    # Memory is measured on its own, as tracing slows the run down
+    tracemalloc.start()
+    run()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    cells = (len(str1)+1)*(len(str2)+1)
+    return {'wall_time':wall_time
+           ,'cells_per_second':cells/wall_time
+           ,'peak_memory':peak_memory}
+
+
+def run_benchmarks(cases=CASES, lengths=LENGTHS, alphabet_sizes=ALPHABET_SIZES, repeat=3, report=print):
+    """Time every case at every length + alphabet size
+
+    Inputs
+    ------
+    cases : list
+        configurations to time, see CASES
+    lengths : tuple
+        lengths of both sequences
+    alphabet_sizes : tuple
+        number of distinct symbols
+    repeat : int
+        number of timed runs per benchmark
+    report : function or None
+        called with a line of text as each benchmark finishes
+
+    Outputs
+    -------
+    results : dict
+        results of time_case, by case_key
+    """
+
+    results = {}
+    for case, length, alphabet_size in itertools.product(cases,lengths,alphabet_sizes):
+        if length > case.get('max_length',length):
+            continue
+        key = case_key(case,length,alphabet_size)
+        str1, str2 = random_pair(length,alphabet_size)
+        results[key] = time_case(case,str1,str2,repeat)
+        if report is not None:
+            report('{:<50} {:>10.4f}s {:>14,.0f} cells/s {:>12,} bytes'.format(
+                key,results[key]['wall_time'],results[key]['cells_per_second'],results[key]['peak_memory']))
+
+    return results
+
+
+def save_baseline(results, path):
+    """Save results as a json baseline"""
+    with open(path,'w') as ofile:
+        json.dump(results,ofile,indent=2,sort_keys=True)
+
+
+def load_baseline(path):
+    """Load a json baseline saved by save_baseline"""
+    with open(path) as ifile:
+        return json.load(ifile)
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Benchmarks whose throughput dropped past threshold
+
+    Benchmarks missing from either results or baseline are skipped.
+
+    Inputs
+    ------
+    results : dict
+        output of run_benchmarks
+    baseline : dict
+        earlier output of run_benchmarks, see load_baseline
+    threshold : float
+        fraction of baseline cells_per_second a benchmark may lose
+
+    Outputs
+    -------
+    regressions : dict
+        (baseline, current) cells_per_second of each regressed benchmark
+    """
+
+    regressions = {}
+    for key in sorted(set(results) & set(baseline)):
+        before = baseline[key]['cells_per_second']
+        after = results[key]['cells_per_second']
+        if after < before*(1-threshold):
+            regressions[key] = (before,after)
+    return regressions
@@ -0,0 +1,42 @@
+import numpy as np
+
+# Integer types tried for the edit array, narrowest first
+SCORE_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def score_dtype(len1, len2, op_costs, substitution_matrix=None):
+    """Narrowest integer type that can hold every value of an edit array
+
+    A path through the edit array takes at most len1 + len2 steps, 
+      each worth at most the largest absolute cost, which bounds every 
+      cell and every candidate value computed from a neighbour.
+
+    Inputs
+    ------
+    len1 : int
+        number of rows of the edit array
+    len2 : int
+        number of columns of the edit array
+    op_costs : dict
+        costs of operations
+    substitution_matrix : substitution_matrix or None
+        scores of every pair of symbols
+
+    Outputs
+    -------
+    dtype : numpy.dtype
+        integer type for the edit array
+    """
+
+    max_cost = max(abs(cost) for cost in op_costs.values())
+    if substitution_matrix is not None:
+        max_cost = max(max_cost,int(np.abs(substitution_matrix.table).max()))
+    # Affine gaps may pay 'Open' on top of each step
+    bound = (len1 + len2) * (max_cost + abs(op_costs.get('Open',0)))
+
+    for dtype in SCORE_DTYPES:
+        info = np.iinfo(dtype)
+        if -bound >= info.min and bound <= info.max:
+            return dtype
+
+    raise OverflowError("edit array values up to {} do not fit in 64 bits".format(bound))
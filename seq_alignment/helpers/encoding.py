@@ -0,0 +1,264 @@
+import numpy as np
+import operator
+
+from .equivalence import match_table
+
+
+def encode_sequences(str1, str2):
+    """Map the symbols of two sequences onto dense integer codes
+
+    Symbols are numbered in order of first appearance, first in str1 
+      and then in str2, so equal symbols always share the same code.
+
+    Inputs
+    ------
+    str1 : str or list of strings
+    str2 : str or list of strings
+
+    Outputs
+    -------
+    alphabet : dict
+        maps each symbol to its integer code
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    """
+
+    alphabet = {}
+    codes1 = np.array([alphabet.setdefault(s,len(alphabet)) for s in str1], dtype=np.int64)
+    codes2 = np.array([alphabet.setdefault(s,len(alphabet)) for s in str2], dtype=np.int64)
+
+    return alphabet, codes1, codes2
+
+
+def encode_padded(sequences, alphabet, padding=0):
+    """Map the symbols of many sequences onto integer codes, padded 
+    into one 2d array
+
+    Inputs
+    ------
+    sequences : list
+        strings or lists of strings
+    alphabet : dict
+        maps each symbol to its integer code, new symbols are added
+    padding : int
+        code filling each row past the end of its sequence
+
+    Outputs
+    -------
+    codes : numpy.array
+        (number of sequences, longest length) integer codes
+    lengths : numpy.array
+        length of each sequence
+    """
+
+    lengths = np.array([len(seq) for seq in sequences], dtype=np.int64)
+    codes = np.full((len(sequences),lengths.max(initial=0)), padding, dtype=np.int64)
+    for row, seq in zip(codes,sequences):
+        row[:len(seq)] = [alphabet.setdefault(s,len(alphabet)) for s in seq]
+
+    return codes, lengths
+
+
+def make_score_table(alphabet, op_costs, test=operator.eq, substitution_matrix=None):
+    """Evaluate substitute/exact costs once per pair of symbols
+
+    Inputs
+    ------
+    alphabet : dict
+        maps each symbol to its integer code
+    op_costs : dict
+        costs of operations, uses 'Substitute' and 'Exact'
+    test : function
+        returns True if two symbols match
+    substitution_matrix : substitution_matrix or None
+        scores of every pair of symbols, replaces test and the 
+        'Substitute' and 'Exact' costs
+
+    Outputs
+    -------
+    score_table : numpy.array or None
+        2d array indexed by [code1, code2]. None when test is 
+        operator.eq, as codes can then be compared directly
+    """
+
+    if substitution_matrix is not None:
+        index = substitution_matrix.codes(alphabet)
+        return substitution_matrix.table[np.ix_(index,index)]
+
+    if test is operator.eq:
+        return None
+
+    if isinstance(test, match_table):
+        return np.where(compile_matches(list(alphabet),test), op_costs['Exact'], op_costs['Substitute'])
+
+    symbols = list(alphabet)
+    score_table = np.empty((len(symbols),len(symbols)), dtype=np.int64)
+    for ii, sub1 in enumerate(symbols):
+        for jj, sub2 in enumerate(symbols):
+            score_table[ii,jj] = op_costs['Exact'] if test(sub1,sub2) else op_costs['Substitute']
+
+    return score_table
+
+
+def compile_matches(symbols, test):
+    """Boolean table of which symbols match, read from a match_table
+
+    Declared symbols are looked up all at once, test is only called
+      for pairs with an undeclared symbol.
+
+    Inputs
+    ------
+    symbols : list
+        symbols in order of their codes
+    test : match_table
+
+    Outputs
+    -------
+    matches : numpy.array
+        matches[i,j] is True if symbols[i] matches symbols[j]
+    """
+
+    codes = test.codes(symbols)
+    known = np.flatnonzero(codes >= 0)
+    matches = np.zeros((len(symbols),len(symbols)), dtype=bool)
+    matches[np.ix_(known,known)] = test.table[np.ix_(codes[known],codes[known])]
+
+    for ii in np.flatnonzero(codes < 0):
+        for jj, symbol in enumerate(symbols):
+            matches[ii,jj] = test(symbols[ii],symbol)
+            matches[jj,ii] = test(symbol,symbols[ii])
+
+    return matches
+
+
+def row_scores(code, codes2, op_costs, score_table=None):
+    """Substitute/exact values of one symbol against a whole sequence
+
+    Inputs
+    ------
+    code : int
+        integer code of the symbol from str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations, uses 'Substitute' and 'Exact'
+    score_table : numpy.array or None
+        output of make_score_table
+
+    Outputs
+    -------
+    t_row : numpy.array
+        value of substitute or exact match for every symbol of str2
+    """
+
+    if score_table is None:
+        return np.where(codes2==code, op_costs['Exact'], op_costs['Substitute'])
+    return score_table[code,codes2]
+
+
+def make_row_scorer(codes1, codes2, op_costs, score_table=None):
+    """Substitute/exact values of one row at a time, for the scalar loops
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations, uses 'Substitute' and 'Exact'
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+
+    Outputs
+    -------
+    row_scorer : function
+        row_scorer(row, lo, hi) gives the list of values of 
+        str1[row-1] against str2[lo:hi]
+    """
+
+    def row_scorer(row, lo=0, hi=None):
+        return row_scores(codes1[row-1],codes2[lo:hi],op_costs,score_table).tolist()
+
+    return row_scorer
+
+
+class vocabulary:
+    """
+    Dense integer ids of tokens, shared across many pairs
+
+    Tokens get ids in order of first appearance, so sequences encoded
+    with the same vocabulary share the ids of equal tokens. Score
+    tables are kept for each test (or substitution matrix) + costs,
+    and grown as tokens are added, so test is called once per pair of
+    distinct tokens over every pair of sequences.
+
+    Attributes
+    ----------
+    index : dict
+        maps each token to its id
+
+    Methods
+    -------
+    encode(sequence)
+        ids of the tokens of a sequence, adding new tokens
+    score_table(op_costs, test, substitution_matrix)
+        substitute/exact values of every pair of ids
+    """
+
+    def __init__(self, tokens=()):
+        """
+        Inputs
+        ------
+        tokens : list
+           tokens to add up front
+        """
+
+        self.index = {}
+        self._tables = {}
+        self.encode(tokens)
+
+    def __len__(self):
+        return len(self.index)
+
+    def encode(self, sequence):
+        """Integer ids of the tokens of a sequence, adding new tokens"""
+        index = self.index
+        return np.array([index.setdefault(token,len(index)) for token in sequence], dtype=np.int64)
+
+    def score_table(self, op_costs, test=operator.eq, substitution_matrix=None):
+        """Substitute/exact values of every pair of ids, see make_score_table
+
+        Only the rows + columns of tokens added since the last call
+          with the same test and costs are evaluated.
+
+        Outputs
+        -------
+        score_table : numpy.array or None
+            2d array indexed by [id1, id2]. None when test is 
+            operator.eq, as ids can then be compared directly
+        """
+
+        if substitution_matrix is None and test is operator.eq:
+            return None
+        if substitution_matrix is not None or isinstance(test, match_table):
+            return make_score_table(self.index,op_costs,test,substitution_matrix)
+
+        key = (test,op_costs['Exact'],op_costs['Substitute'])
+        table = self._tables.get(key, np.empty((0,0), dtype=np.int64))
+        old, new = len(table), len(self.index)
+        if new==old:
+            return table
+
+        ## Copy the old table, evaluating test for new tokens only
+        tokens = list(self.index)
+        grown = np.empty((new,new), dtype=np.int64)
+        grown[:old,:old] = table
+        for ii, sub1 in enumerate(tokens):
+            for jj in range(old if ii < old else 0, new):
+                grown[ii,jj] = op_costs['Exact'] if test(sub1,tokens[jj]) else op_costs['Substitute']
+
+        self._tables[key] = grown
+        return grown
@@ -0,0 +1,118 @@
+import numpy as np
+import operator
+
+
+class match_table:
+    """
+    Test compiled into a boolean table over a declared alphabet
+
+    An instance is called like any test, test(sub1, sub2), but pairs
+    of declared symbols are one array lookup, and make_score_table
+    reads the whole table at once instead of calling it. Pairs with a
+    symbol outside of the alphabet call the fallback test once and
+    keep its answer, so with no alphabet this only memoizes a test.
+
+    Attributes
+    ----------
+    alphabet : list
+        declared symbols
+    index : dict
+        maps each declared symbol to its row + column of table
+    table : numpy.array
+        table[i,j] is True if alphabet[i] matches alphabet[j]
+
+    Methods
+    -------
+    from_classes(classes)
+        symbols match others of the same class
+    from_sets(meanings)
+        symbols match when their meanings overlap, e.g. ambiguity codes
+    codes(symbols)
+        table indices of symbols, -1 for undeclared symbols
+    """
+
+    def __init__(self, alphabet=(), test=operator.eq, table=None):
+        """
+        Inputs
+        ------
+        alphabet : str or list of strings
+           declared symbols
+        test : function
+           returns True if two symbols match. Evaluated once per pair
+           of declared symbols up front, and for other pairs when
+           they are first seen
+        table : numpy.array
+           boolean table of the alphabet, instead of evaluating test
+        """
+
+        self.alphabet = list(alphabet)
+        self.index = {symbol:ix for ix, symbol in enumerate(self.alphabet)}
+        self.test = test
+        self._memo = {}
+
+        if table is None:
+            table = [[test(sub1,sub2) for sub2 in self.alphabet] for sub1 in self.alphabet]
+        self.table = np.array(table, dtype=bool).reshape(len(self.alphabet),len(self.alphabet))
+
+    @classmethod
+    def from_classes(cls, classes, test=operator.eq):
+        """Symbols match the other symbols of their class
+
+        Inputs
+        ------
+        classes : list
+            groups of symbols, e.g. ['aA','bB'] for case insensitive
+            letters. A symbol may only be in one class
+        test : function
+            fallback for undeclared symbols
+        """
+
+        members = {}
+        for ix, group in enumerate(classes):
+            for symbol in group:
+                if symbol in members:
+                    raise ValueError("symbol {!r} is in more than one class".format(symbol))
+                members[symbol] = ix
+
+        labels = np.array(list(members.values()), dtype=np.int64)
+        return cls(list(members), test, labels[:,None]==labels[None,:])
+
+    @classmethod
+    def from_sets(cls, meanings, test=operator.eq):
+        """Symbols match when the sets they stand for overlap
+
+        Inputs
+        ------
+        meanings : dict
+            maps each symbol to the symbols it stands for, e.g.
+            {'R':'AG','A':'A'}
+        test : function
+            fallback for undeclared symbols
+        """
+
+        alphabet = list(meanings)
+        sets = [set(meanings[symbol]) for symbol in alphabet]
+        table = [[not sub1.isdisjoint(sub2) for sub2 in sets] for sub1 in sets]
+        return cls(alphabet, test, table)
+
+    def codes(self, symbols):
+        """Table indices of symbols, -1 for undeclared symbols"""
+        index = self.index
+        return np.array([index.get(symbol,-1) for symbol in symbols], dtype=np.int64)
+
+    def __call__(self, sub1, sub2):
+        ix1 = self.index.get(sub1)
+        ix2 = self.index.get(sub2)
+        if ix1 is not None and ix2 is not None:
+            return bool(self.table[ix1,ix2])
+
+        key = (sub1,sub2)
+        if key not in self._memo:
+            self._memo[key] = bool(self.test(sub1,sub2))
+        return self._memo[key]
+
+
+# IUPAC nucleotide codes, each standing for the bases it may be
+IUPAC_DNA = match_table.from_sets({'A':'A','C':'C','G':'G','T':'T','U':'T'
+                                  ,'R':'AG','Y':'CT','S':'CG','W':'AT','K':'GT','M':'AC'
+                                  ,'B':'CGT','D':'AGT','H':'ACT','V':'ACG','N':'ACGT'})
@@ -0,0 +1,161 @@
+import time
+
+## Runs report what they did to an optional instrument, any function
+##  taking one record (a dict) per run :
+##
+##  name   : what ran, e.g. 'global_similarity'
+##  phases : seconds spent in each phase, e.g. setup, fill, traceback, align
+##  cells  : number of cells of edit arrays filled
+##  bytes  : bytes allocated for the largest arrays, by array name
+##  cache  : hits + misses of any cache used, if there is one
+##
+## Without an instrument runs use NULL_TIMER, whose phases do nothing
+
+
+class _null_phase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class null_timer:
+    """
+    Phase timer that records nothing, used when no instrument is set
+    """
+    phases = {}
+    _phase = _null_phase()
+
+    def phase(self, name):
+        return self._phase
+
+
+NULL_TIMER = null_timer()
+
+
+class _phase:
+    def __init__(self, phases, name):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.phases[self.name] = self.phases.get(self.name,0.0) + elapsed
+        return False
+
+
+class phase_timer:
+    """
+    Wall time spent in each phase of a run
+
+    Attributes
+    ----------
+    phases : dict
+        seconds spent in each phase, by name
+
+    Methods
+    -------
+    phase(name)
+        context manager timing one phase, repeated phases add up
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    def phase(self, name):
+        return _phase(self.phases, name)
+
+
+def make_timer(instrument):
+    """phase_timer when there is an instrument to report to, else NULL_TIMER"""
+    return NULL_TIMER if instrument is None else phase_timer()
+
+
+def array_bytes(**arrays):
+    """Bytes of each array, skipping arrays that were not made (None)"""
+    return {name:int(array.nbytes) for name, array in arrays.items() if array is not None}
+
+
+def make_record(name, timer, cells, nbytes=None, cache=None):
+    """Record of one run, passed to its instrument
+
+    Inputs
+    ------
+    name : str
+        what ran
+    timer : phase_timer
+        timings of the run
+    cells : int
+        number of cells of edit arrays filled
+    nbytes : dict or None
+        bytes allocated for the largest arrays of the run, by name
+    cache : dict or None
+        hits + misses of a cache
+    """
+
+    record = {'name':name
+             ,'phases':dict(timer.phases)
+             ,'cells':int(cells)
+             ,'bytes':dict(nbytes or {})}
+    if cache is not None:
+        record['cache'] = dict(cache)
+    return record
+
+
+class collector:
+    """
+    Instrument keeping the records of every run, with totals
+
+    Attributes
+    ----------
+    records : list
+        record of each run, in order
+
+    Methods
+    -------
+    summary()
+        totals over all records
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def summary(self):
+        """Totals over all records
+
+        Outputs
+        -------
+        summary : dict
+            runs, seconds per phase, total seconds, cells, cells per
+            second, bytes per array, and cache hits, misses + hit rate
+        """
+
+        phases = {}
+        arrays = {}
+        cache = {'hits':0,'misses':0}
+        for record in self.records:
+            for key, value in record['phases'].items():
+                phases[key] = phases.get(key,0.0) + value
+            for key, value in record['bytes'].items():
+                arrays[key] = arrays.get(key,0) + value
+            for key in cache:
+                cache[key] += record.get('cache',{}).get(key,0)
+
+        seconds = sum(phases.values())
+        cells = sum(record['cells'] for record in self.records)
+        lookups = cache['hits'] + cache['misses']
+        return {'runs':len(self.records)
+               ,'phases':phases
+               ,'seconds':seconds
+               ,'cells':cells
+               ,'cells_per_second':cells/seconds if seconds else 0.0
+               ,'bytes':arrays
+               ,'cache':dict(cache,hit_rate=cache['hits']/lookups if lookups else 0.0)}
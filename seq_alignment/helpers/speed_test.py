@@ -1,5 +1,6 @@
 import csv 
 import os
+import random
 
 # ~~~ Read in testing data ~~~ #
 def create_test_data(path_to_data):
@@ -23,3 +24,15 @@ def run_matching(run_function,test_data,backtrace=False):
         wf_init = run_function(elems[0],elems[1],backtrace)
         # Run matching 
         wf_init.run() 
+
+
+# ~~~ Create random testing data ~~~ #
+def create_random_test_data(n_pairs, length, alphabet='acgt', seed=0):
+    rng = random.Random(seed)
+    alignment_tests=[]
+    for _ in range(n_pairs):
+        str1 = ''.join(rng.choice(alphabet) for _ in range(length))
+        str2 = ''.join(rng.choice(alphabet) for _ in range(length))
+        alignment_tests.append((str1,str2))
+
+    return(alignment_tests)
@@ -0,0 +1,108 @@
+import numpy as np
+
+# BLOSUM62 in NCBI format, from ftp://ftp.ncbi.nih.gov/blast/matrices/BLOSUM62
+BLOSUM62_TEXT = """
+   A  R  N  D  C  Q  E  G  H  I  L  K  M  F  P  S  T  W  Y  V  B  Z  X  *
+A  4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0 -2 -1  0 -4
+R -1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1  0 -1 -4
+N -2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3  3  0 -1 -4
+D -2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3  4  1 -1 -4
+C  0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -3 -3 -2 -4
+Q -1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2  0  3 -1 -4
+E -1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+G  0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1 -2 -1 -4
+H -2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3  0  0 -1 -4
+I -1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -3 -3 -1 -4
+L -1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -4 -3 -1 -4
+K -1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2  0  1 -1 -4
+M -1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -3 -1 -1 -4
+F -2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -3 -3 -1 -4
+P -1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2 -1 -2 -4
+S  1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0  0  0 -4
+T  0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0 -1 -1  0 -4
+W -3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -4 -3 -2 -4
+Y -2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -3 -2 -1 -4
+V  0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -3 -2 -1 -4
+B -2 -1  3  4 -3  0  1 -1  0 -3 -4  0 -3 -3 -2  0 -1 -4 -3 -3  4  1 -1 -4
+Z -1  0  0  1 -3  3  4 -2  0 -3 -3  1 -1 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+X  0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1 -1 -1 -4
+* -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4  1
+"""
+
+
+class substitution_matrix:
+    """
+    A class holding a substitution matrix (BLOSUM, PAM, ...)
+
+    Scores are compiled into an integer indexed numpy table, so the 
+    value of aligning two symbols is a table lookup.
+
+    Attributes
+    ----------
+    alphabet : list
+        symbols of the matrix, in table order
+    index : dict
+        maps each symbol to its row/column of table
+    table : numpy.array
+        2d array of scores, indexed by [index[sub1], index[sub2]]
+    default : str or None
+        symbol used in place of symbols missing from the alphabet
+
+    Methods
+    -------
+    from_text(text)
+        Read a matrix in NCBI format
+    codes(symbols)
+        Table indices of a sequence of symbols
+    """
+
+    def __init__(self, alphabet, scores, default=None):
+        """
+        Inputs
+        ------
+        alphabet : str or list of strings
+            symbols of the matrix
+        scores : list of lists or numpy.array
+            scores[i][j] is the value of aligning alphabet[i] with alphabet[j]
+        default : str
+            symbol of the alphabet used for unknown symbols, None to 
+            raise a KeyError on unknown symbols
+        """
+
+        self.alphabet = list(alphabet)
+        self.index = {symbol:ix for ix, symbol in enumerate(self.alphabet)}
+        self.table = np.array(scores, dtype=np.int64)
+        self.default = default
+
+        if self.table.shape != (len(self.alphabet),len(self.alphabet)):
+            raise ValueError("scores must be {0}x{0}, got {1}".format(len(self.alphabet),self.table.shape))
+        if default is not None and default not in self.index:
+            raise ValueError("default symbol {!r} is not in alphabet".format(default))
+
+    @classmethod
+    def from_text(cls, text, default=None):
+        """Read a matrix in NCBI format
+
+        Lines starting with '#' are comments, the first line lists the
+          column symbols and every following line starts with its row 
+          symbol.
+        """
+
+        lines = [line.split() for line in text.splitlines()
+                 if line.strip() and not line.startswith('#')]
+        alphabet = lines[0]
+        rows = {line[0]:[int(score) for score in line[1:]] for line in lines[1:]}
+
+        return cls(alphabet, [rows[symbol] for symbol in alphabet], default)
+
+    def codes(self, symbols):
+        """Table indices of a sequence of symbols"""
+        index = self.index
+        if self.default is None:
+            return np.array([index[symbol] for symbol in symbols], dtype=np.int64)
+        default = index[self.default]
+        return np.array([index.get(symbol,default) for symbol in symbols], dtype=np.int64)
+
+
+# Unknown residues score like 'X'
+BLOSUM62 = substitution_matrix.from_text(BLOSUM62_TEXT, default='X')
@@ -0,0 +1,2 @@
+# Make incremental similarity visible to next module
+from .main import incremental_similarity
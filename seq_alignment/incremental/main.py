@@ -0,0 +1,275 @@
+import numpy as np
+import operator
+
+from ..global_similarity import global_similarity
+from ..local_similarity import local_similarity
+from ..global_similarity.affine import is_affine
+from ..batch.main import DEFAULT_COSTS
+
+# Similarity class used for alignments of each mode
+MODES = {'global':global_similarity
+        ,'local':local_similarity}
+
+# Sequence a symbol is appended to
+SIDES = ('str1','str2')
+
+
+class _growing:
+    '''
+    1d array with amortized O(1) appends
+    '''
+
+    def __init__(self, values=(), dtype=np.int64):
+        values = np.asarray(values, dtype=dtype)
+        self.size = len(values)
+        self.data = np.empty(max(16,2*self.size), dtype=dtype)
+        self.data[:self.size] = values
+
+    def append(self, value):
+        if self.size==len(self.data):
+            self.data = np.concatenate([self.data,np.empty_like(self.data)])
+        self.data[self.size] = value
+        self.size += 1
+
+    @property
+    def values(self):
+        return self.data[:self.size]
+
+
+class incremental_similarity:
+    """
+    Similarity score of two sequences that grow one symbol at a time
+
+    Only the last row and last column of the edit array are kept.
+    Appending a symbol to str2 adds a column, filled from the last
+    column in O(len1), appending to str1 adds a row in O(len2). Both
+    are filled with numpy as in global_rows, with the chain of
+    insertions (or deletions, for columns) taken as a prefix maximum.
+
+    Attributes
+    ----------
+    str1 : list
+        symbols of the first sequence so far
+    str2 : list
+        symbols of the second sequence so far
+    mode : str
+        'global' or 'local' similarity
+    match_distance : int or None
+        same as running the similarity class on str1, str2 without
+        backtrace. None for local similarity with an empty sequence
+    match_end : tuple or None
+        local similarity only, (row, col) of the first cell of the
+        edit array in row order holding match_distance
+
+    Methods
+    -------
+    append(symbol, to)
+        add one symbol to the end of str1 or str2
+    extend(symbols, to)
+        add each symbol in turn
+    align(**options)
+        run the similarity class with backtrace on the current sequences
+    """
+
+    def __init__(self
+                ,str1=''
+                ,str2=''
+                ,mode='global'
+                ,op_costs=None
+                ,test=operator.eq
+                ,substitution_matrix=None):
+        """
+        Inputs
+        ------
+        str1 : str or list of strings
+           starting symbols of the first sequence
+        str2 : str or list of strings
+           starting symbols of the second sequence
+        mode : str
+           'global' or 'local' similarity
+        op_costs : dict or None
+           costs of operations, None for the defaults of the class.
+           Affine gaps ('Open') are not supported
+        test : function
+           returns True if two symbols match, called once per pair of
+           distinct symbols
+        substitution_matrix : substitution_matrix
+           scores of aligning every pair of symbols, e.g. BLOSUM62.
+           Replaces test and the 'Substitute' and 'Exact' costs
+        """
+
+        if mode not in MODES:
+            raise ValueError("mode must be one of {}, got {!r}".format(tuple(MODES),mode))
+        if op_costs is None:
+            op_costs = DEFAULT_COSTS[mode]
+        if is_affine(op_costs):
+            raise ValueError("incremental_similarity does not support affine gaps, got {!r}".format(op_costs))
+
+        self.mode = mode
+        self.local = mode=='local'
+        self.op_costs = op_costs
+        self.test = test
+        self.substitution_matrix = substitution_matrix
+
+        ## Symbols get integer codes as they arrive, along with
+        ##  a table of substitute/exact values of every pair of codes
+        self.alphabet = {}
+        self._table = None
+        if test is not operator.eq or substitution_matrix is not None:
+            self._table = np.empty((16,16), dtype=np.int64)
+
+        self.str1 = []
+        self.str2 = []
+        self._codes = {'str1':_growing(),'str2':_growing()}
+
+        ## Last row + last column of an edit array of two empty strings
+        self._last = {'str1':_growing([0]),'str2':_growing([0])}
+        self.match_distance = None if self.local else 0
+        self.match_end = None
+
+        self.extend(str1,'str1')
+        self.extend(str2,'str2')
+
+    def _code(self, symbol):
+        '''
+        Integer code of a symbol, adding it to the alphabet + score
+          table the first time it is seen
+        '''
+        code = self.alphabet.get(symbol)
+        if code is not None:
+            return code
+
+        code = self.alphabet[symbol] = len(self.alphabet)
+        if self._table is None:
+            return code
+
+        if code==len(self._table):
+            table = np.empty((2*code,2*code), dtype=np.int64)
+            table[:code,:code] = self._table
+            self._table = table
+
+        symbols = list(self.alphabet)
+        if self.substitution_matrix is not None:
+            index = self.substitution_matrix.codes(symbols)
+            self._table[code,:code+1] = self.substitution_matrix.table[index[code],index]
+            self._table[:code+1,code] = self.substitution_matrix.table[index,index[code]]
+        else:
+            EXACT = self.op_costs['Exact']
+            SUBSTITUTE = self.op_costs['Substitute']
+            self._table[code,:code+1] = [EXACT if self.test(symbol,other) else SUBSTITUTE for other in symbols]
+            self._table[:code+1,code] = [EXACT if self.test(other,symbol) else SUBSTITUTE for other in symbols]
+
+        return code
+
+    def _scores(self, code, to):
+        '''
+        Substitute/exact values of a new symbol of sequence `to`
+          against every symbol of the other sequence
+        '''
+        other = self._codes['str1' if to=='str2' else 'str2'].values
+        if self._table is None:
+            return np.where(other==code, self.op_costs['Exact'], self.op_costs['Substitute'])
+        if to=='str2':
+            return self._table[other,code]
+        return self._table[code,other]
+
+    def append(self, symbol, to='str2'):
+        """Add one symbol to the end of a sequence, updating
+        match_distance in O(length of the other sequence)
+
+        A new symbol of str2 is a new column of the edit array :
+          moving down a column is a deletion and moving across from
+          the last column an insertion. Rows swap the two around.
+
+        Inputs
+        ------
+        symbol : str
+            symbol to add
+        to : str
+            'str1' or 'str2', the sequence to add it to
+        """
+
+        if to not in SIDES:
+            raise ValueError("to must be one of {}, got {!r}".format(SIDES,to))
+        other = 'str1' if to=='str2' else 'str2'
+        if to=='str2':
+            ACROSS = self.op_costs['Insert']
+            ALONG = self.op_costs['Delete']
+        else:
+            ACROSS = self.op_costs['Delete']
+            ALONG = self.op_costs['Insert']
+
+        code = self._code(symbol)
+        getattr(self,to).append(symbol)
+        self._codes[to].append(code)
+        n = len(getattr(self,to))
+
+        ## Last row/column of the edit array, across from the new one
+        past = self._last[to].values
+        t_line = self._scores(code, to)
+
+        ## First cell is the new symbol against the empty string
+        curr = np.empty(len(past), dtype=np.int64)
+        curr[0] = 0 if self.local else n*ACROSS
+
+        # Moving across + substitute/exact match
+        np.maximum(past[1:]+ACROSS, past[:-1]+t_line, out=curr[1:])
+        if self.local:
+            np.maximum(curr, 0, out=curr)
+
+        # Chain of moves along the new row/column
+        along_chain = np.arange(0,len(curr),dtype=np.int64)*ALONG
+        curr -= along_chain
+        np.maximum.accumulate(curr, out=curr)
+        curr += along_chain
+
+        ## New line is the last of its kind, and adds one cell to
+        ##  the end of the other kind
+        self._last[to] = _growing(curr)
+        self._last[other].append(curr[-1])
+
+        if not self.local:
+            self.match_distance = int(curr[-1])
+        elif len(curr) > 1:
+            self._track_best(curr, n, to)
+
+    def _track_best(self, curr, n, to):
+        '''
+        Keep the first cell in row order holding the maximum value
+        '''
+        ix = int(np.argmax(curr[1:])) + 1
+        end = (n,ix) if to=='str1' else (ix,n)
+        if self.match_distance is None or curr[ix] > self.match_distance or \
+           (curr[ix]==self.match_distance and end < self.match_end):
+            self.match_distance = int(curr[ix])
+            self.match_end = end
+
+    def extend(self, symbols, to='str2'):
+        """Add each symbol of symbols to the end of a sequence, see append"""
+        for symbol in symbols:
+            self.append(symbol, to)
+
+    def align(self, **options):
+        """Alignment of the current sequences
+
+        Only the last row + column are kept, so the alignment is found
+          from scratch by the similarity class with backtrace, in
+          linear space unless options say otherwise.
+
+        Inputs
+        ------
+        options :
+            other arguments of the similarity class
+
+        Outputs
+        -------
+        sim_init : global_similarity or local_similarity
+            after run(), holding match_alignment_table
+        """
+
+        options.setdefault('linear_space',True)
+        sim_init = MODES[self.mode](self.str1,self.str2,True,self.op_costs
+                                   ,test=self.test,substitution_matrix=self.substitution_matrix
+                                   ,**options)
+        sim_init.run()
+        return sim_init
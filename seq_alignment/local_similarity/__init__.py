@@ -1,2 +1,3 @@
 # Make global similarity class visible to next module
 from .main import local_similarity
+from .striped import query_profile
@@ -1,6 +1,23 @@
 import numpy as np
 from itertools import product
 import operator
+import time
+
+from ..helpers.encoding import encode_sequences, make_score_table, make_row_scorer
+from ..helpers.dtypes import score_dtype
+from ..helpers.instrumentation import NULL_TIMER, make_timer, make_record, array_bytes
+from ..helpers.backtrace import LOCAL_ACTIONS, ACTION_BITS, pack_flags, make_step_table, make_arrow_table, align_path
+from .vectorized import local_best_cell, local_start_cell
+from ..global_similarity.hirschberg import hirschberg_path
+from ..global_similarity.affine import is_affine, gap_open, affine_best_cell, affine_arrays, affine_path
+
+# Order moves are tried in when backtracing, see _get_shortest_path
+PREFERENCE = ('Zero','Insert','Delete','Substitute')
+STEP_TABLE = make_step_table(LOCAL_ACTIONS,PREFERENCE)
+ARROW_TABLE = make_arrow_table(LOCAL_ACTIONS)
+
+# Engines available for computing the similarity without backtrace
+ENGINES = ('auto','python','numpy')
 
 class local_similarity:
     """
@@ -16,13 +33,26 @@ class local_similarity:
         second string to compare
     backtrace : bool
         flag for whether to perform backtrace
+    linear_space : bool
+        flag for whether backtrace uses memory that scales with the
+        matched region instead of the full edit array
+    engine : str
+        engine used when backtrace = False, one of 'auto', 'python'
+        or 'numpy'
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, e.g. BLOSUM62
+    instrument : function or None
+        called with a record of timings, cells + bytes of each run
     edit_array : numpy.array
         array of edit distances
     match_distance : int
         optimal value of similarity problem
+    match_end : tuple
+        (row, col) of edit array cell where the best local match ends,
+        i.e. the match ends at str1[row-1] and str2[col-1]
     backtrace_array : numpy.array
-        3d binary array of backtrace operations. In 3rd dimension, 1st is 
-        empty string, 2nd is insertion, 3rd is deletion, 4th is match
+        2d uint8 array of backtrace operations packed as bit flags. Bit 0
+        is empty string, bit 1 is insertion, bit 2 is deletion, bit 3 is match
     backtrace_path : list
         list of indices showing the optimal backtrace path
     backtrace_table : numpy.array
@@ -46,16 +76,75 @@ class local_similarity:
                           ,'Insert':-1
                           ,'Substitute':-1
                           ,'Exact':2}
-                ,test=operator.eq):
+                ,test=operator.eq
+                ,engine='auto'
+                ,linear_space=False
+                ,substitution_matrix=None
+                ,vocabulary=None
+                ,instrument=None):
+        """
+        Inputs
+        ------
+        str1 : str or list of strings
+        str2 : str or list of strings
+        backtrace : bool
+           flag for whether to perform backtrace
+        op_costs : dict
+           costs of operations. An optional 'Open' cost is paid once 
+           per gap on top of its 'Insert'/'Delete' costs (affine gaps),
+           which runs the numpy kernels of Gotoh's algorithm and so 
+           requires engine 'auto' or 'numpy'
+        engine : str
+           engine used when backtrace = False. 'python' fills the
+           edit array one cell at a time, 'numpy' fills it one 
+           row at a time with vectorized operations. 'auto' picks 
+           'numpy' for affine gaps and 'python' otherwise
+        linear_space : bool
+           when backtrace = True, find the match end with a score-only
+           pass, its start with a reverse pass, and the alignment of 
+           the region in between with Hirschberg's algorithm. 
+           edit_array and backtrace_array are not stored
+        substitution_matrix : substitution_matrix
+           scores of aligning every pair of symbols, e.g. BLOSUM62.
+           Replaces test and the 'Substitute' and 'Exact' costs
+        vocabulary : vocabulary
+           integer ids of tokens shared across pairs, so test is only
+           called once per pair of distinct tokens over every pair
+        instrument : function or None
+           called after each run with a record of time spent per 
+           phase (setup, fill, traceback, align), cells filled and 
+           bytes of edit_array/backtrace_array, e.g. a collector.
+           None skips all timing
+        """
+
+        if instrument is not None:
+            setup_start = time.perf_counter()
+
+        if engine not in ENGINES:
+            raise ValueError("engine must be one of {}, got {!r}".format(ENGINES,engine))
+        if gap_open(op_costs) > 0:
+            raise ValueError("'Open' cost must be <= 0, got {!r}".format(op_costs))
+        if is_affine(op_costs) and linear_space:
+            raise ValueError("affine gaps do not support linear_space")
+        if is_affine(op_costs) and engine not in ('auto','numpy'):
+            raise ValueError("affine gaps require engine 'auto' or 'numpy', got {!r}".format(engine))
+        if engine=='auto':
+            engine = 'numpy' if is_affine(op_costs) else 'python'
         
         # Set parameter variables
         self.str1 = str1 
         self.str2 = str2
         self.edit_array = None
+        self.match_end = None
         self.backtrace = backtrace
+        self.linear_space = linear_space
+        self.engine = engine
+        self.affine = is_affine(op_costs)
 
-        # Create testing function
+        # Create testing function + scores of pairs of symbols
         self.test = test
+        self.substitution_matrix = substitution_matrix
+        self.vocabulary = vocabulary
         
         # Set helper values
         self.len1 = len(self.str1) + 1 # Count empty string
@@ -68,6 +157,11 @@ class local_similarity:
         self.match_distance = self.len1*self.op_costs['Delete'] + \
                               self.len2*self.op_costs['Insert']
 
+        # Report runs to instrument, with the time spent setting up
+        self.instrument = instrument
+        if instrument is not None:
+            self.setup_time = time.perf_counter() - setup_start
+
     def run(self):
         """Run string distance algorithm to find maximum similarity score b/w strings
          
@@ -78,8 +172,14 @@ class local_similarity:
         -------
         _run_with_backtrace()
             runs algorithm, storing backtrace values in backtrace_array
+        _run_linear_space()
+            runs algorithm, finding backtrace path in linear memory
+        _run_affine()
+            runs Gotoh's algorithm for affine gaps, with or without backtrace
         _run_without_backtrace()
             runs algorithm, not storing backtrace values
+        _run_without_backtrace_numpy()
+            runs algorithm row by row with numpy, not storing backtrace values
         _align_matches()
             uses backtrace values to find optimal alignment path, 
             returns alignment of strings and edit actions used to create
@@ -94,6 +194,12 @@ class local_similarity:
             only occrus if backtrace = True. 
         """
 
+        timer = make_timer(self.instrument)
+
+        # Cells filled, more than the edit array when linear_space
+        #  sweeps parts of it again
+        self._cells_filled = self.len1*self.len2
+
         if self.backtrace:
 
             # Initialize backtrace arrays
@@ -102,17 +208,52 @@ class local_similarity:
             self.backtrace_table = None
             self.match_alignment_table = None
             
-            # Run string matching, keeping edit distance array
-            self._run_with_backtrace()
+            with timer.phase('fill'):
+                if self.linear_space:
+                    # Run string matching, keeping only the path
+                    self._run_linear_space()
+                elif self.affine:
+                    # Run string matching with affine gaps
+                    self._run_affine()
+                else:
+                    # Run string matching, keeping edit distance array
+                    self._run_with_backtrace()
 
             # Create string alignment from str1 to str2,
             #  with edit distance operations
-            self._align_matches()
-        
+            self._align_matches(timer)
+
         else:
-            # Run string matching, storing edit distance array
-            self._run_without_backtrace()
+            with timer.phase('fill'):
+                if self.affine:
+                    # Run string matching with affine gaps, two rows at a time
+                    self._run_affine()
+
+                elif self.engine=='numpy':
+                    # Run string matching one row at a time
+                    self._run_without_backtrace_numpy()
+
+                else:
+                    # Run string matching, storing edit distance array
+                    self._run_without_backtrace()
+
+        if self.instrument is not None:
+            timer.phases['setup'] = self.setup_time
+            self.instrument(make_record('local_similarity',timer,self._cells_filled
+                                       ,array_bytes(edit_array=self.edit_array
+                                                  ,backtrace_array=getattr(self,'backtrace_array',None))))
 
+    def _encode(self):
+        '''
+        Map both strings onto integer codes, along with the table of 
+          substitute/exact values of every pair of codes
+        '''
+        if self.vocabulary is not None:
+            return (self.vocabulary.encode(self.str1),self.vocabulary.encode(self.str2)
+                   ,self.vocabulary.score_table(self.op_costs,self.test,self.substitution_matrix))
+        alphabet, codes1, codes2 = encode_sequences(self.str1,self.str2)
+        score_table = make_score_table(alphabet,self.op_costs,self.test,self.substitution_matrix)
+        return codes1, codes2, score_table
 
     def _run_with_backtrace(self):
         """Create edit array, which holds edit distance values"""
@@ -121,7 +262,9 @@ class local_similarity:
         ##  dist values
         ##
         ## Add extra row + column for empty string
-        self.edit_array = np.empty((self.len1,self.len2),dtype= np.int8)
+        ## Values are stored in the narrowest type that can't overflow
+        dtype = score_dtype(self.len1,self.len2,self.op_costs,self.substitution_matrix)
+        self.edit_array = np.empty((self.len1,self.len2), dtype=dtype)
 
         ## Initialize first row + column of array
         ##  for the empty string value
@@ -129,15 +272,16 @@ class local_similarity:
         self.edit_array[0,:] = 0
 
         if self.backtrace:
-            self.backtrace_array = np.zeros((self.len1,self.len2,4),dtype= bool)
+            self.backtrace_array = np.zeros((self.len1,self.len2),dtype= np.uint8)
+
+        ## Values of substitute or exact match, one row at a time
+        codes1, codes2, score_table = self._encode()
+        row_scorer = make_row_scorer(codes1,codes2,self.op_costs,score_table)
 
         ## Fill in row by row
         for ii in range(1,self.len1):
+            t_row = row_scorer(ii)
             for jj in range(1,self.len2):
-            
-                # Get last letter from string, and compare value
-                sub1 = self.str1[ii-1]
-                sub2 = self.str2[jj-1]
                 
                 # Find maximum values using
                 #  bellman recursion
@@ -145,7 +289,7 @@ class local_similarity:
                 # Order is : [Zero String, Insert, Delete, Substitute or Exact Match]
 
                 # Value of substitute or exact match
-                t_ij = self.op_costs['Substitute']*(sub1!=sub2) + self.op_costs['Exact']*(1-(sub1!=sub2))
+                t_ij = t_row[jj-1]
 
                 # Values of zero string, inserting, deleting and substituting
                 action_values = [0
@@ -163,36 +307,89 @@ class local_similarity:
                     self.match_distance = max_val
 
                 if self.backtrace:
-                    self.backtrace_array[ii,jj,np.where(action_values==max_val)] = 1
+                    self.backtrace_array[ii,jj] = pack_flags(action_values,max_val)
         
     
+    def _run_linear_space(self):
+        """Find backtrace path of best local match in three passes
+
+        1. forward score-only pass finds the end cell, see local_best_cell
+        2. reverse pass finds the start cell, see local_start_cell
+        3. global alignment of the region in between, see hirschberg_path
+        """
+
+        ## Map both strings onto integer codes, evaluating
+        ##  test once per pair of distinct symbols
+        codes1, codes2, score_table = self._encode()
+
+        match_distance, match_end = local_best_cell(codes1,codes2,self.op_costs,score_table)
+        if match_distance is None:
+            self.backtrace_path = [(0,0)]
+            return
+        self.match_distance = match_distance
+        self.match_end = match_end
+
+        start_row, start_col = local_start_cell(codes1,codes2,match_end,match_distance
+                                               ,self.op_costs,score_table)
+        end_row, end_col = match_end
+
+        # Path through the region, shifted back onto the full edit array
+        _, region_path, region_cells = hirschberg_path(codes1[start_row:end_row],codes2[start_col:end_col]
+                                                      ,self.op_costs,score_table,PREFERENCE,return_cells=True)
+        self._cells_filled += (end_row-start_row+1)*(end_col+1) + region_cells
+        self.backtrace_path = [(i+start_row,j+start_col) for i, j in region_path]
+
+    def _run_affine(self):
+        """Run Gotoh's algorithm for affine gaps with numpy, see affine_rows
+
+        Without backtrace only two rows of each edit array are kept. 
+        With backtrace H is stored as edit_array, along with flags of
+        the gaps that extend into each cell, and the path follows gaps
+        back to where they open.
+        """
+
+        codes1, codes2, score_table = self._encode()
+
+        if not self.backtrace:
+            match_distance, match_end = affine_best_cell(codes1,codes2,self.op_costs,score_table)
+            if match_distance is not None:
+                self.match_distance = match_distance
+                self.match_end = match_end
+            return
+
+        dtype = score_dtype(self.len1,self.len2,self.op_costs,self.substitution_matrix)
+        self.edit_array, self.backtrace_array = affine_arrays(codes1,codes2,self.op_costs,LOCAL_ACTIONS
+                                                             ,dtype,score_table,local=True)
+
+        ## Start at max value of edit array
+        i, j = np.unravel_index(np.argmax(self.edit_array),self.edit_array.shape)
+        self.match_distance = self.edit_array[i,j]
+        self.match_end = (int(i),int(j))
+        self.backtrace_path = affine_path(self.backtrace_array,self.match_end
+                                         ,LOCAL_ACTIONS,PREFERENCE,local=True)
+
     def _run_without_backtrace(self):
         """Create edit array, which holds edit distance values"""
         ## Get operation costs into a dict
         INSERT = self.op_costs['Insert']
         DELETE = self.op_costs['Delete']
-        SUBSTITUTE = self.op_costs['Substitute']
-        EXACT = self.op_costs['Exact']
 
         ## SET VARIABLES WE NEED FOR RUN
         len1 = self.len1
         len2 = self.len2
-        str1 = self.str1
-        str2 = self.str2
-        test = self.test
+        codes1, codes2, score_table = self._encode()
+        row_scorer = make_row_scorer(codes1,codes2,self.op_costs,score_table)
 
         ## Initialize first row of array + first element of next row
-        ##  for the empty string value
+        ##  for the empty string value, local matches can start anywhere
         past_row = [0] * (len2)
-        for i in range(0,len2):
-            past_row[i] = i*DELETE
 
         ## Initialize current row 
         curr_row = [0] * (len2)
         
         ## Go row by row, keeping track of past row + current row only
         for row_num in range(1,len1):
-            curr_row[0] = DELETE*row_num
+            t_row = row_scorer(row_num)
             for col_num in range(1,len2):
 
                 # Find maximum values using
@@ -201,8 +398,7 @@ class local_similarity:
                 # Order is : [Insert, Delete, Substitute or Exact Match]
 
                 # Value of substitute or exact match
-                
-                t_ij = EXACT if test(str1[row_num-1],str2[col_num-1]) else SUBSTITUTE
+                t_ij = t_row[col_num-1]
 
                 # Values of inserting, deleting and substituting
                 max_val = max(0
@@ -215,15 +411,28 @@ class local_similarity:
                 # Keep track of global maximum 
                 if max_val > self.match_distance:
                     self.match_distance = max_val
+                    self.match_end = (row_num,col_num)
 
             # Moving onto to comparing next letter in the first string 
             # i.e. moving down a row
             for i in range(1,len2):
                 past_row[i] = curr_row[i]
 
+    def _run_without_backtrace_numpy(self):
+        """Find maximum value of edit array one row at a time using 
+        numpy, see local_best_cell. Gives the same value and end cell
+        as _run_without_backtrace.
+        """
+
+        ## Map both strings onto integer codes, evaluating
+        ##  test once per pair of distinct symbols
+        codes1, codes2, score_table = self._encode()
+
+        match_distance, match_end = local_best_cell(codes1,codes2,self.op_costs,score_table)
+        if match_distance is not None:
+            self.match_distance = match_distance
+            self.match_end = match_end
 
-        
-       
     def _get_shortest_path(self):
         '''Gets the shortest path through edit array
 
@@ -233,63 +442,38 @@ class local_similarity:
         ## Start at max value of edit array
         i, j = np.unravel_index(np.argmax(self.edit_array),self.edit_array.shape)
         self.match_distance = self.edit_array[i,j]
+        self.match_end = (int(i),int(j))
 
+        i, j = self.match_end
         self.backtrace_path = [(i,j)]
 
-        while (i,j) != (0,0):
-            # Empty
-            if self.backtrace_array[i,j,0]==1:
+        ## Flags decode straight into a step back, stopping at the 
+        ##  empty string, then preferring insertion, deletion and 
+        ##  substitution/exact match
+        ##
+        ## First row/column are the empty string, where every
+        ##  local match starts
+        backtrace_array = self.backtrace_array
+        while i > 0 and j > 0:
+            step = STEP_TABLE[backtrace_array[i,j]]
+            if step is None:
                 break
-            # Insertion
-            if self.backtrace_array[i,j,1]==1:
-                i,j = (i,j-1)
-            # Deletion
-            elif self.backtrace_array[i,j,2]==1:
-                i,j = (i-1,j)
-            # Substitution/Exact Match
-            elif self.backtrace_array[i,j,3]==1:
-                i,j = (i-1,j-1)
+            i,j = (i-step[0],j-step[1])
             self.backtrace_path.append((i,j))
 
-    def _align_matches(self):
+    def _align_matches(self, timer=NULL_TIMER):
         '''Align matches
 
         Requires backtrace array, set backtrace = True when 
           initializing class
         '''
-        # Get shortest path
-        self._get_shortest_path()
+        # Get shortest path, unless already found in linear space
+        if self.backtrace_path is None:
+            with timer.phase('traceback'):
+                self._get_shortest_path()
         
-        # Initialize aligned text
-        str1_aligned = []
-        str2_aligned = []
-        action = []
-
-        for ix in range(len(self.backtrace_path)-1,0,-1):
-            i_0, j_0 = self.backtrace_path[ix]
-            i_1, j_1 = self.backtrace_path[ix-1]
-
-            # Replacement/Substitution
-            if i_1 > i_0 and j_1 > j_0:
-                # Do letters match 
-                if self.str1[i_1-1]==self.str2[j_1-1]:
-                    action.append('S')
-                else:
-                    action.append('R')
-                str1_aligned.append(self.str1[i_1-1])
-                str2_aligned.append(self.str2[j_1-1])
-            # Insertion
-            elif i_1==i_0:
-                action.append('I')
-                str1_aligned.append(' ')
-                str2_aligned.append(self.str2[j_1-1])
-            # Deletion 
-            elif j_1==j_0:
-                action.append('D')
-                str1_aligned.append(self.str1[i_1-1])
-                str2_aligned.append(' ')
-
-        self.match_alignment_table = np.array([str1_aligned,str2_aligned,action])
+        with timer.phase('align'):
+            self.match_alignment_table = align_path(self.str1,self.str2,self.backtrace_path)
 
     def make_backtrace_table(self):
             '''
@@ -297,28 +481,12 @@ class local_similarity:
             initializing class
             '''
 
+            if self.linear_space:
+                raise ValueError("make_backtrace_table requires linear_space=False, no backtrace_array is stored")
+
             # Run string matching
             self.run()
 
-            # Initialize list to hold arrows
+            # Look up arrows of every cell at once
             # Index is [row][col]
-            self.backtrace_table = []
-
-            # Get total # cols and rows
-            rows = self.backtrace_array.shape[0]
-            cols = self.backtrace_array.shape[1]
-
-            # Loop through row and col to get direction
-            for i in range(0,rows):
-                row_elems = []
-                for j in range(0,cols):
-                    directions=''
-                    btrace_elems = self.backtrace_array[i,j,:]
-                    if btrace_elems[0]==1:
-                        directions=directions+'⇐'
-                    if btrace_elems[1]==1:
-                        directions=directions+'⇑'
-                    if btrace_elems[2]==1:
-                        directions=directions+'⇖'
-                    row_elems.append(directions)
-                self.backtrace_table.append(row_elems)
\ No newline at end of file
+            self.backtrace_table = ARROW_TABLE[self.backtrace_array & ACTION_BITS].tolist()
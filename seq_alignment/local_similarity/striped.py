@@ -0,0 +1,239 @@
+import numpy as np
+import operator
+
+from ..helpers.instrumentation import make_timer, make_record
+
+# Score of padding cells past the end of the query, low enough that
+#  they never start or extend a match
+PADDING = -(1 << 40)
+
+# Default number of segments per stripe. Each segment is a numpy call
+#  per target symbol, so short stripes over many lanes run fastest
+SEGMENTS = 4
+
+
+class query_profile:
+    """
+    A striped query profile for local similarity (Farrar)
+
+    The query is laid out in stripes : position i of the query sits in 
+    lane i // segments, segment i % segments. A column of the edit 
+    array then is a (segments, lanes) array, and each segment is 
+    updated for all lanes at once. Deletions running from one segment 
+    into the next are carried along in the same pass, deletions 
+    crossing from one lane into the next are fixed up afterwards 
+    (lazy-F), which rarely takes more than a couple of passes.
+
+    The substitute/exact values of every symbol against the whole 
+    query are computed once and kept, so one profile can be aligned 
+    against many targets.
+
+    Attributes
+    ----------
+    query : str or list of characters
+        sequence compared against every target, plays the role of str1
+    op_costs : dict
+        costs of operations
+    test : function
+        returns True if two symbols match
+    substitution_matrix : substitution_matrix
+        scores of aligning every pair of symbols, replaces test
+    lanes : int
+        number of stripes the query is split into
+    segments : int
+        length of each stripe
+    cache_stats : dict
+        hits + misses of the profiles kept per symbol
+
+    Methods
+    -------
+    align(target)
+        Best local similarity between query and target
+    """
+
+    def __init__(self
+                ,query
+                ,op_costs={'Delete':-1
+                          ,'Insert':-1
+                          ,'Substitute':-1
+                          ,'Exact':2}
+                ,test=operator.eq
+                ,lanes=None
+                ,substitution_matrix=None
+                ,instrument=None):
+        """
+        Inputs
+        ------
+        query : str or list of strings
+        op_costs : dict
+           costs of operations, same as local_similarity
+        test : function
+           returns True if two symbols match
+        lanes : int
+           number of stripes, defaults to stripes of SEGMENTS positions
+        substitution_matrix : substitution_matrix
+           scores of aligning every pair of symbols, e.g. BLOSUM62
+        instrument : function or None
+           called after each align with a record of its time, cells
+           and profile cache hits + misses, e.g. a collector
+        """
+
+        self.query = query
+        self.op_costs = op_costs
+        self.test = test
+        self.substitution_matrix = substitution_matrix
+        self.instrument = instrument
+
+        # Set helper values
+        self.len_query = len(query)
+        if lanes is None:
+            lanes = -(-self.len_query // SEGMENTS)
+        self.lanes = max(1,lanes)
+        self.segments = max(1,-(-self.len_query // self.lanes))
+
+        # Lane + segment of every query position, to report match ends
+        self.positions = np.arange(self.segments*self.lanes).reshape(self.lanes,self.segments).T
+        self.is_query = self.positions < self.len_query
+
+        # Profiles are built once per symbol, with exact matching all
+        #  symbols missing from the query share one profile
+        self._profiles = {}
+        self._query_symbols = set(query)
+        self._mismatch_profile = None
+        self.cache_stats = {'hits':0,'misses':0}
+
+    def _stripe(self, values):
+        '''
+        Lay out one value per query position in (segments, lanes) stripes
+        '''
+        striped = np.full(self.segments*self.lanes, PADDING, dtype=np.int64)
+        striped[:self.len_query] = values
+        return striped.reshape(self.lanes,self.segments).T.copy()
+
+    def profile(self, symbol):
+        '''
+        Striped substitute/exact values of symbol against the query
+        '''
+        if symbol in self._profiles:
+            self.cache_stats['hits'] += 1
+            return self._profiles[symbol]
+
+        EXACT = self.op_costs['Exact']
+        SUBSTITUTE = self.op_costs['Substitute']
+
+        if self.substitution_matrix is not None:
+            self.cache_stats['misses'] += 1
+            matrix = self.substitution_matrix
+            values = matrix.table[matrix.codes(self.query),matrix.codes([symbol])[0]]
+            self._profiles[symbol] = self._stripe(values)
+            return self._profiles[symbol]
+
+        if self.test is operator.eq and symbol not in self._query_symbols:
+            if self._mismatch_profile is None:
+                self.cache_stats['misses'] += 1
+                self._mismatch_profile = self._stripe([SUBSTITUTE]*self.len_query)
+            else:
+                self.cache_stats['hits'] += 1
+            return self._mismatch_profile
+
+        self.cache_stats['misses'] += 1
+        values = [EXACT if self.test(sub1,symbol) else SUBSTITUTE for sub1 in self.query]
+        self._profiles[symbol] = self._stripe(values)
+        return self._profiles[symbol]
+
+    def align(self, target):
+        """Best local similarity between query and target
+
+        Inputs
+        ------
+        target : str or list of strings
+            sequence aligned against the query, plays the role of str2
+
+        Outputs
+        -------
+        match_distance : int or None
+            optimal value of similarity problem, None if either 
+            sequence is empty
+        match_end : tuple or None
+            (row, col) of edit array cell where the best local match 
+            ends, same as local_similarity
+        """
+
+        if self.instrument is None:
+            return self._align(target)
+
+        timer = make_timer(self.instrument)
+        before = dict(self.cache_stats)
+        with timer.phase('fill'):
+            result = self._align(target)
+        cache = {key:self.cache_stats[key]-before[key] for key in before}
+        self.instrument(make_record('query_profile',timer,(self.len_query+1)*(len(target)+1),cache=cache))
+        return result
+
+    def _align(self, target):
+        '''
+        Best local similarity between query and target, see align
+        '''
+
+        ## Get operation costs into a dict
+        INSERT = self.op_costs['Insert']
+        DELETE = self.op_costs['Delete']
+
+        segments = self.segments
+        match_distance = None
+        match_end = None
+        if self.len_query==0 or len(target)==0:
+            return match_distance, match_end
+
+        ## Columns of the edit array + insertions into the next column
+        past_col = np.zeros((segments,self.lanes), dtype=np.int64)
+        curr_col = np.zeros((segments,self.lanes), dtype=np.int64)
+        insert_col = np.full((segments,self.lanes), PADDING, dtype=np.int64)
+        lane_shift = np.empty(self.lanes, dtype=np.int64)
+        no_delete = np.full(self.lanes, PADDING, dtype=np.int64)
+
+        for col_num, symbol in enumerate(target,1):
+            profile = self.profile(symbol)
+
+            # Diagonal of the first segment comes from the last segment
+            #  of the lane above, the empty string for the first lane
+            lane_shift[0] = 0
+            lane_shift[1:] = past_col[-1,:-1]
+            diag = lane_shift
+            delete = no_delete
+
+            for seg in range(segments):
+                cell = diag + profile[seg]
+                np.maximum(cell, insert_col[seg], out=cell)
+                np.maximum(cell, delete, out=cell)
+                np.maximum(cell, 0, out=cell)
+                curr_col[seg] = cell
+
+                insert_col[seg] = cell + INSERT
+                delete = cell + DELETE
+                diag = past_col[seg]
+
+            # Lazy-F : carry deletions over from one lane to the next
+            seg = 0
+            delete = np.concatenate((no_delete[:1],delete[:-1]))
+            while (delete > curr_col[seg]).any():
+                np.maximum(curr_col[seg], delete, out=curr_col[seg])
+                np.maximum(insert_col[seg], curr_col[seg]+INSERT, out=insert_col[seg])
+                delete = delete + DELETE
+                seg += 1
+                if seg==segments:
+                    seg = 0
+                    delete = np.concatenate((no_delete[:1],delete[:-1]))
+
+            # Keep track of global maximum, earliest row first. Padding
+            #  cells are always below the query cell feeding them
+            col_max = int(curr_col.max())
+            if match_distance is None or col_max >= match_distance:
+                row_num = int(self.positions[(curr_col==col_max) & self.is_query].min()) + 1
+                if match_distance is None or col_max > match_distance or row_num < match_end[0]:
+                    match_distance = col_max
+                    match_end = (row_num,col_num)
+
+            past_col, curr_col = curr_col, past_col
+
+        return match_distance, match_end
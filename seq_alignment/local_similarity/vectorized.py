@@ -0,0 +1,115 @@
+import numpy as np
+
+from ..helpers.encoding import row_scores
+from ..global_similarity.vectorized import global_rows
+
+
+def local_best_cell(codes1, codes2, op_costs, score_table=None):
+    """Sweep the local edit array row by row with numpy operations
+
+    Rows are filled as in global_last_row, with every cell floored at 
+      zero before the chain of insertions is taken. The best cell 
+      is tracked with one max reduction per row.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+
+    Outputs
+    -------
+    match_distance : int or None
+        maximum value of the edit array, None if either string is empty
+    match_end : tuple or None
+        (row, col) of the first cell holding the maximum value
+    """
+
+    ## Get operation costs into a dict
+    INSERT = op_costs['Insert']
+    DELETE = op_costs['Delete']
+
+    len1 = len(codes1) + 1 # Count empty string
+    len2 = len(codes2) + 1 # Count empty string
+
+    match_distance = None
+    match_end = None
+    if len1==1 or len2==1:
+        return match_distance, match_end
+
+    ## Cost of inserting every prefix of str2
+    insert_chain = np.arange(0,len2,dtype=np.int64)*INSERT
+
+    ## Initialize first row of array for the empty string value
+    past_row = np.zeros(len2, dtype=np.int64)
+    curr_row = np.zeros(len2, dtype=np.int64)
+
+    ## Go row by row, keeping track of past row + current row only
+    for row_num in range(1,len1):
+        t_row = row_scores(codes1[row_num-1], codes2, op_costs, score_table)
+
+        # Zero string, deletion + substitute/exact match
+        np.maximum(past_row[1:]+DELETE, past_row[:-1]+t_row, out=curr_row[1:])
+        np.maximum(curr_row, 0, out=curr_row)
+
+        # Insertions along the row
+        curr_row -= insert_chain
+        np.maximum.accumulate(curr_row, out=curr_row)
+        curr_row += insert_chain
+
+        # Keep track of global maximum
+        col_num = int(np.argmax(curr_row[1:])) + 1
+        if match_distance is None or curr_row[col_num] > match_distance:
+            match_distance = int(curr_row[col_num])
+            match_end = (row_num,col_num)
+
+        past_row, curr_row = curr_row, past_row
+
+    return match_distance, match_end
+
+
+def local_start_cell(codes1, codes2, match_end, match_distance, op_costs, score_table=None):
+    """Find where a best local match ending at match_end starts
+
+    Sweeps the prefixes of both strings ending at match_end backwards,
+      as a global alignment of the reversed prefixes. The first cell 
+      whose score reaches match_distance is a start of the match, rows 
+      are swept nearest first so the shortest match in str1 is found.
+
+    Inputs
+    ------
+    codes1 : numpy.array
+        integer codes of str1
+    codes2 : numpy.array
+        integer codes of str2
+    match_end : tuple
+        (row, col) of the edit array cell where the match ends
+    match_distance : int
+        score of the best local match
+    op_costs : dict
+        costs of operations
+    score_table : numpy.array or None
+        output of make_score_table, None to compare codes directly
+
+    Outputs
+    -------
+    match_start : tuple
+        (row, col) of the edit array cell the match starts from, the 
+        match covers str1[row:end_row] and str2[col:end_col]
+    """
+
+    end_row, end_col = match_end
+    reversed1 = codes1[:end_row][::-1]
+    reversed2 = codes2[:end_col][::-1]
+
+    for row_num, row in enumerate(global_rows(reversed1, reversed2, op_costs, score_table)):
+        hits = np.flatnonzero(row==match_distance)
+        if len(hits):
+            return end_row-row_num, end_col-int(hits[0])
+
+    raise ValueError("no local match ending at {} scores {}".format(match_end,match_distance))
@@ -0,0 +1,2 @@
+# Make metric index visible to next module
+from .main import bk_tree
@@ -0,0 +1,259 @@
+import operator
+import heapq
+import json
+
+from ..global_similarity import global_similarity
+from ..global_similarity.affine import is_affine
+
+# Default costs, same as global_similarity
+DEFAULT_COSTS = {'Delete':-1
+                ,'Insert':-1
+                ,'Substitute':-1
+                ,'Exact':0}
+
+
+def check_metric(op_costs):
+    """Raise a ValueError unless op_costs make -match_distance a metric
+
+    Distance is the cheapest path of edits, so it is a metric when
+      every edit has a positive cost, no cost is paid for exact
+      matches and insertions cost the same as deletions.
+    """
+
+    if is_affine(op_costs):
+        raise ValueError("bk_tree does not support affine gaps, got {!r}".format(op_costs))
+    if op_costs['Exact']!=0:
+        raise ValueError("bk_tree requires an 'Exact' cost of 0, got {!r}".format(op_costs))
+    if op_costs['Insert']!=op_costs['Delete']:
+        raise ValueError("bk_tree requires 'Insert' and 'Delete' costs to be equal, got {!r}".format(op_costs))
+    if max(op_costs['Insert'],op_costs['Substitute']) >= 0:
+        raise ValueError("bk_tree requires 'Insert', 'Delete' and 'Substitute' costs < 0, got {!r}".format(op_costs))
+
+
+class _node:
+    '''
+    One distinct item of the tree, with the indices of every item
+      at distance 0 and children by distance
+    '''
+    __slots__ = ('items','children')
+
+    def __init__(self, index):
+        self.items = [index]
+        self.children = {}
+
+
+class bk_tree:
+    """
+    Burkhard-Keller tree of sequences under global edit distance
+
+    Distance is minus the match_distance of global_similarity. Each
+    child of a node sits at a fixed distance from it, so by the
+    triangle inequality a query at distance d from a node only needs
+    the children at distances within d - radius and d + radius.
+
+    Attributes
+    ----------
+    items : list
+        sequences in the order they were added
+    op_costs : dict
+        costs of operations, see check_metric
+    distance_evaluations : int
+        global_similarity runs since the tree was made
+    stats : dict
+        evaluations and avoided items of the last query. Avoided
+        items are those of nodes pruned without being compared,
+        duplicates of a compared node are not avoided
+
+    Methods
+    -------
+    add(item)
+        add one sequence
+    within(query, radius)
+        every item at distance <= radius, nearest first
+    nearest(query, k)
+        k nearest items
+    save(path) / load(path)
+        keep the tree in a json file
+    """
+
+    def __init__(self
+                ,items=()
+                ,op_costs=None
+                ,test=operator.eq
+                ,engine='auto'):
+        """
+        Inputs
+        ------
+        items : list
+           strings or lists of strings
+        op_costs : dict or None
+           costs of operations, None for the defaults of
+           global_similarity. Must make distance a metric, see
+           check_metric
+        test : function
+           returns True if two symbols match, must be symmetric
+        engine : str
+           engine of global_similarity
+        """
+
+        if op_costs is None:
+            op_costs = DEFAULT_COSTS
+        check_metric(op_costs)
+
+        self.op_costs = op_costs
+        self.test = test
+        self.engine = engine
+        self.items = []
+        self.root = None
+        self.distance_evaluations = 0
+        self.stats = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def distance(self, str1, str2):
+        """Edit distance of two sequences, counted in distance_evaluations"""
+        self.distance_evaluations += 1
+        sim_init = global_similarity(str1,str2,False,self.op_costs,test=self.test,engine=self.engine)
+        sim_init.run()
+        return -sim_init.match_distance
+
+    def add(self, item):
+        """Add one sequence, returning its index in items"""
+        index = len(self.items)
+        self.items.append(item)
+        if self.root is None:
+            self.root = _node(index)
+            return index
+
+        node = self.root
+        while True:
+            d = self.distance(item,self.items[node.items[0]])
+            if d==0:
+                node.items.append(index)
+                return index
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _node(index)
+                return index
+            node = child
+
+    def _search(self, query, radius, results, k=None):
+        '''
+        Walk the tree, closest bound first, keeping (distance, index)
+          of items within radius. With k, radius shrinks to the k-th
+          best distance found so far
+        '''
+        start = self.distance_evaluations
+        reached = 0 # items of compared nodes
+        best = [] # max heap of the k best, as (-distance, -index)
+        queue = [(0,0,self.root)] if self.root is not None else []
+        order = 1
+        while queue:
+            bound, _, node = heapq.heappop(queue)
+            if bound > radius:
+                break
+
+            d = self.distance(query,self.items[node.items[0]])
+            reached += len(node.items)
+            if d <= radius:
+                for index in node.items:
+                    results.append((d,index))
+                    if k is not None:
+                        heapq.heappush(best,(-d,-index))
+                        if len(best) > k:
+                            heapq.heappop(best)
+                if k is not None and len(best)==k:
+                    radius = -best[0][0]
+
+            # Triangle inequality, children at distance key are at
+            #  least |d - key| from query
+            for key, child in node.children.items():
+                child_bound = max(bound,abs(d-key))
+                if child_bound <= radius:
+                    heapq.heappush(queue,(child_bound,order,child))
+                    order += 1
+
+        evaluations = self.distance_evaluations - start
+        self.stats = {'evaluations':evaluations,'avoided':len(self.items)-reached}
+        return radius
+
+    def within(self, query, radius):
+        """Every item at distance <= radius of query
+
+        Inputs
+        ------
+        query : str or list of strings
+        radius : int or float
+            largest distance kept
+
+        Outputs
+        -------
+        matches : list
+            (item, distance) by distance, then order of items
+        """
+
+        results = []
+        self._search(query, radius, results)
+        return [(self.items[index],d) for d, index in sorted(results)]
+
+    def nearest(self, query, k=1):
+        """The k items nearest to query
+
+        Inputs
+        ------
+        query : str or list of strings
+        k : int
+            number of items, at least 1. Fewer if the tree is smaller
+
+        Outputs
+        -------
+        matches : list
+            (item, distance) by distance, then order of items
+        """
+
+        if k < 1:
+            raise ValueError("nearest requires k >= 1, got {!r}".format(k))
+        results = []
+        self._search(query, float('inf'), results, k)
+        return [(self.items[index],d) for d, index in sorted(results)[:k]]
+
+    def save(self, path):
+        """Save the tree as json, test must be operator.eq"""
+        if self.test is not operator.eq:
+            raise ValueError("bk_tree can only save trees using operator.eq as test")
+
+        ## Flat list of nodes, children refer to their position
+        nodes = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(node.children.values())
+        position = {id(node):ix for ix, node in enumerate(nodes)}
+
+        with open(path,'w') as ofile:
+            json.dump({'op_costs':self.op_costs
+                      ,'items':self.items
+                      ,'nodes':[[node.items,[[key,position[id(child)]] for key, child in node.children.items()]]
+                                for node in nodes]}, ofile)
+
+    @classmethod
+    def load(cls, path, engine='auto'):
+        """Load a tree saved by save, without computing any distance"""
+        with open(path) as ifile:
+            saved = json.load(ifile)
+
+        tree = cls(op_costs=saved['op_costs'],engine=engine)
+        tree.items = saved['items']
+        nodes = []
+        for items, _ in saved['nodes']:
+            node = _node(items[0])
+            node.items = items
+            nodes.append(node)
+        for node, (_, children) in zip(nodes, saved['nodes']):
+            node.children = {key:nodes[child] for key, child in children}
+        tree.root = nodes[0] if nodes else None
+        return tree
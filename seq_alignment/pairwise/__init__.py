@@ -0,0 +1,2 @@
+# Make all vs all scoring visible to next module
+from .main import all_vs_all
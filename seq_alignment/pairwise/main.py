@@ -0,0 +1,188 @@
+import numpy as np
+import multiprocessing
+import os
+
+from ..global_similarity import global_similarity
+from ..local_similarity import local_similarity
+from ..helpers.instrumentation import make_timer, make_record
+from ..cache.main import is_symmetric
+
+# Similarity class run for each mode
+MODES = {'global':global_similarity
+        ,'local':local_similarity}
+
+# Tiles handed out per worker, more tiles even out the load when
+#  the weights of pairs are a poor guess of their run time
+TILES_PER_WORKER = 4
+
+# Set in each worker process by _init_worker, so sequences and
+#  settings are sent once per worker instead of once per tile
+_worker = {}
+
+
+def score_pair(similarity, str1, str2, op_costs=None, **options):
+    """Similarity score of one pair, without backtrace
+
+    Inputs
+    ------
+    similarity : class
+        global_similarity or local_similarity
+    str1 : str or list of strings
+    str2 : str or list of strings
+    op_costs : dict or None
+        costs of operations, None for the defaults of the class
+    options :
+        other arguments of the class, e.g. engine or test
+
+    Outputs
+    -------
+    match_distance : float
+        similarity score, nan if the class finds none (e.g. past
+        max_distance)
+    """
+
+    if op_costs is not None:
+        options['op_costs'] = op_costs
+    sim_init = similarity(str1,str2,False,**options)
+    sim_init.run()
+    if sim_init.match_distance is None:
+        return np.nan
+    return sim_init.match_distance
+
+
+def upper_triangle_tiles(lengths, n_tiles, upper=True):
+    """Split the upper triangle of a pairwise matrix into tiles of
+    roughly equal work
+
+    Pairs (i, j) with i <= j are taken in row order, each weighted by
+      the number of cells of its edit array, and cut where the running
+      total of weights crosses a multiple of total / n_tiles.
+
+    Inputs
+    ------
+    lengths : list
+        length of each sequence
+    n_tiles : int
+        number of tiles to split the pairs into
+    upper : bool
+        only pairs with i <= j, False for every pair of the matrix
+
+    Outputs
+    -------
+    tiles : list
+        (rows, cols) integer arrays of the pairs in each tile
+    """
+
+    n = len(lengths)
+    if upper:
+        rows, cols = np.triu_indices(n)
+    else:
+        rows, cols = np.indices((n,n)).reshape(2,-1)
+    if len(rows)==0:
+        return []
+
+    sizes = np.asarray(lengths, dtype=np.int64) + 1 # Count empty string
+    weights = np.cumsum(sizes[rows]*sizes[cols])
+
+    # First pair of each tile, dropping empty tiles
+    targets = weights[-1] * np.arange(1,n_tiles) / n_tiles
+    bounds = np.unique(np.concatenate([[0],np.searchsorted(weights,targets,side='right'),[len(rows)]]))
+
+    return [(rows[start:stop],cols[start:stop]) for start, stop in zip(bounds[:-1],bounds[1:])]
+
+
+def _init_worker(shared, n, sequences, similarity, op_costs, options):
+    '''
+    Attach a worker process to the shared result matrix
+    '''
+    _worker['result'] = np.frombuffer(shared, dtype=np.float64).reshape(n,n)
+    _worker['args'] = (sequences, similarity, op_costs, options)
+
+
+def _score_tile(tile):
+    '''
+    Score every pair of a tile into the shared result matrix
+    '''
+    sequences, similarity, op_costs, options = _worker['args']
+    result = _worker['result']
+    for i, j in zip(*tile):
+        result[i,j] = score_pair(similarity,sequences[i],sequences[j],op_costs,**options)
+
+
+def all_vs_all(sequences, mode='global', op_costs=None, workers=None, instrument=None, **options):
+    """Similarity score of every pair of sequences
+
+    When scores are symmetric (see is_symmetric) only pairs (i, j)
+      with i <= j are run and mirrored below the diagonal, otherwise
+      every pair is run. The pairs are split into tiles of
+      roughly equal len1*len2 (see upper_triangle_tiles) which are
+      handed out to a pool of processes. Workers write scores straight
+      into a matrix in shared memory, so only tile indices are pickled.
+
+    Inputs
+    ------
+    sequences : list
+        strings or lists of strings to compare
+    mode : str
+        'global' or 'local' similarity
+    op_costs : dict or None
+        costs of operations, None for the defaults of the class
+    workers : int or None
+        number of processes, None for one per CPU. With 1 worker
+        pairs are scored in this process
+    instrument : function or None
+        called with a record of time spent tiling, scoring and 
+        mirroring, cells of the pairs run and bytes of the result
+    options :
+        other arguments of the similarity class, e.g. engine, test or
+        substitution_matrix. They are sent to the workers, so test
+        must be picklable (no lambdas)
+
+    Outputs
+    -------
+    scores : numpy.array
+        (n, n) float array, scores[i,j] is the similarity of
+        sequences[i] and sequences[j]
+    """
+
+    if mode not in MODES:
+        raise ValueError("mode must be one of {}, got {!r}".format(tuple(MODES),mode))
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    timer = make_timer(instrument)
+    similarity = MODES[mode]
+    sequences = list(sequences)
+    n = len(sequences)
+    lengths = [len(seq) for seq in sequences]
+    symmetric = is_symmetric(op_costs, options)
+    with timer.phase('tiles'):
+        tiles = upper_triangle_tiles(lengths, workers*TILES_PER_WORKER, symmetric)
+
+    ## Shared result matrix, filled in by the workers
+    shared = multiprocessing.RawArray('d', n*n)
+    _init_worker(shared, n, sequences, similarity, op_costs, options)
+
+    with timer.phase('score'):
+        if workers==1 or len(tiles) <= 1:
+            for tile in tiles:
+                _score_tile(tile)
+        else:
+            with multiprocessing.Pool(workers, _init_worker, (shared, n, sequences, similarity, op_costs, options)) as pool:
+                pool.map(_score_tile, tiles, chunksize=1)
+
+    ## Mirror the upper triangle of symmetric scores, copying out of shared memory
+    with timer.phase('mirror'):
+        scores = np.frombuffer(shared, dtype=np.float64).reshape(n,n).copy()
+        _worker.clear()
+        if symmetric:
+            lower = np.tril_indices(n,-1)
+            scores[lower] = scores.T[lower]
+
+    if instrument is not None:
+        sizes = np.array(lengths, dtype=np.int64) + 1 # Count empty string
+        cells = sizes.sum()**2
+        if symmetric:
+            cells = (cells + (sizes**2).sum()) // 2
+        instrument(make_record('all_vs_all',timer,cells,{'scores':scores.nbytes}))
+    return scores
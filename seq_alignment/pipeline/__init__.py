@@ -0,0 +1,2 @@
+# Make streaming pipeline visible to next module
+from .main import run_pipeline, read_pairs
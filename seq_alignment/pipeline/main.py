@@ -0,0 +1,305 @@
+import numpy as np
+import multiprocessing
+import collections
+import itertools
+import json
+import csv
+import os
+
+from ..batch import batch_pairs
+from ..helpers.instrumentation import NULL_TIMER, make_timer, make_record
+
+# Pairs scored per task sent to a worker
+CHUNK_SIZE = 1000
+
+# Chunks sent to workers but not yet written, per worker
+IN_FLIGHT_PER_WORKER = 2
+
+
+def read_pairs(path, columns=(0,1), skip=0):
+    """Read (str1, str2) pairs from a csv file one row at a time
+
+    Inputs
+    ------
+    path : str
+        csv file, e.g. seq_alignment.csv made by create_seq_align.py
+    columns : tuple
+        columns holding str1 and str2
+    skip : int
+        number of pairs to skip from the start of the file
+
+    Outputs
+    -------
+    pairs : generator
+        (str1, str2) of each row
+    """
+
+    col1, col2 = columns
+    with open(path, newline='') as ifile:
+        for row in itertools.islice(csv.reader(ifile), skip, None):
+            yield row[col1], row[col2]
+
+
+def chunked(pairs, chunk_size=CHUNK_SIZE):
+    """Group an iterable of pairs into lists of chunk_size pairs"""
+    pairs = iter(pairs)
+    while True:
+        chunk = list(itertools.islice(pairs, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_chunk(chunk, mode='global', op_costs=None, options=None):
+    """Scores of one chunk of pairs, see batch_pairs
+
+    Outputs
+    -------
+    match_distance : numpy.array
+        similarity of each pair
+    match_end : numpy.array or None
+        (pairs, 2) array of where each local match ends, None for
+        global similarity
+    """
+    options = options or {}
+    if mode=='local':
+        return batch_pairs(chunk,mode,op_costs,**options)
+    return batch_pairs(chunk,mode,op_costs,**options), None
+
+
+class csv_results:
+    """
+    Results appended to one csv file, one row per pair
+
+    A progress file next to the csv records the number of finished
+    chunks and the size of the csv after the last of them. Resuming
+    cuts off anything written after it.
+
+    Attributes
+    ----------
+    path : str
+        csv file
+    chunks_done : int
+        number of chunks already written
+    """
+
+    def __init__(self, path, mode, chunk_size, resume=False):
+        self.path = path
+        self.progress_path = path + '.progress'
+        self.chunk_size = chunk_size
+        self.chunks_done = 0
+
+        offset = 0
+        if resume and os.path.exists(self.progress_path):
+            with open(self.progress_path) as ifile:
+                progress = json.load(ifile)
+            if progress['chunk_size']!=chunk_size:
+                raise ValueError("resume requires chunk_size {}, got {}".format(progress['chunk_size'],chunk_size))
+            self.chunks_done = progress['chunks_done']
+            offset = progress['offset']
+
+        if self.chunks_done:
+            self.ofile = open(path, 'r+', newline='')
+            self.ofile.seek(offset)
+            self.ofile.truncate()
+        else:
+            self.ofile = open(path, 'w', newline='')
+            header = ['pair','match_distance'] + (['end_row','end_col'] if mode=='local' else [])
+            csv.writer(self.ofile).writerow(header)
+        self.writer = csv.writer(self.ofile)
+
+    def write(self, chunk_index, match_distance, match_end):
+        '''
+        Append the scores of one chunk, then record it as finished
+        '''
+        first = chunk_index*self.chunk_size
+        columns = [range(first,first+len(match_distance)), match_distance.tolist()]
+        if match_end is not None:
+            columns += [match_end[:,0].tolist(), match_end[:,1].tolist()]
+        self.writer.writerows(zip(*columns))
+        self.ofile.flush()
+
+        self.chunks_done = chunk_index + 1
+        with open(self.progress_path, 'w') as ofile:
+            json.dump({'chunks_done':self.chunks_done
+                      ,'offset':self.ofile.tell()
+                      ,'chunk_size':self.chunk_size}, ofile)
+
+    def close(self):
+        self.ofile.close()
+
+
+class npy_results:
+    """
+    Results saved as one npy file per chunk in a folder
+
+    Files are written under a temporary name and renamed once
+    complete, so resuming starts after the last complete file. The
+    chunk size is kept in meta.json, as resuming with another one
+    would misplace every pair after the finished chunks.
+
+    Attributes
+    ----------
+    path : str
+        folder of chunk_<index>.npy files (+ ends_<index>.npy for local)
+    chunks_done : int
+        number of chunks already written
+    """
+
+    def __init__(self, path, mode, chunk_size, resume=False):
+        self.path = path
+        self.meta_path = os.path.join(path, 'meta.json')
+        os.makedirs(path, exist_ok=True)
+        self.chunks_done = 0
+        if resume and os.path.exists(self.meta_path):
+            with open(self.meta_path) as ifile:
+                meta = json.load(ifile)
+            if meta['chunk_size']!=chunk_size:
+                raise ValueError("resume requires chunk_size {}, got {}".format(meta['chunk_size'],chunk_size))
+            while os.path.exists(self._file('chunk',self.chunks_done)):
+                self.chunks_done += 1
+        else:
+            with open(self.meta_path, 'w') as ofile:
+                json.dump({'chunk_size':chunk_size}, ofile)
+
+    def _file(self, name, chunk_index):
+        return os.path.join(self.path, '{}_{:06d}.npy'.format(name,chunk_index))
+
+    def _save(self, name, chunk_index, values):
+        temp_path = self._file(name,chunk_index) + '.tmp'
+        with open(temp_path, 'wb') as ofile:
+            np.save(ofile, values)
+        os.replace(temp_path, self._file(name,chunk_index))
+
+    def write(self, chunk_index, match_distance, match_end):
+        '''
+        Save the scores of one chunk, scores last as they mark it finished
+        '''
+        if match_end is not None:
+            self._save('ends',chunk_index,match_end)
+        self._save('chunk',chunk_index,match_distance)
+        self.chunks_done = chunk_index + 1
+
+    def close(self):
+        pass
+
+
+def _write_oldest(in_flight, results, timer=NULL_TIMER):
+    '''
+    Wait for the oldest chunk in flight and write its results
+    '''
+    chunk_index, chunk_size, task = in_flight.popleft()
+    with timer.phase('score'):
+        scores = task.get()
+    with timer.phase('write'):
+        results.write(chunk_index, *scores)
+    return chunk_size
+
+
+def _pair_cells(chunk):
+    '''
+    Number of cells of the edit arrays of a chunk of pairs
+    '''
+    return sum((len(str1)+1)*(len(str2)+1) for str1, str2 in chunk)
+
+
+def run_pipeline(input_path
+                ,output_path
+                ,mode='global'
+                ,op_costs=None
+                ,chunk_size=CHUNK_SIZE
+                ,workers=None
+                ,max_in_flight=None
+                ,resume=False
+                ,columns=(0,1)
+                ,instrument=None
+                ,**options):
+    """Score every pair of a csv file, streaming results to disk
+
+    Pairs are read lazily and grouped into chunks, which are scored on
+      a pool of processes with batch_pairs. At most max_in_flight
+      chunks are read ahead of the last one written, and results are
+      written in input order as soon as each chunk finishes, so memory
+      stays flat however long the file is.
+
+    Inputs
+    ------
+    input_path : str
+        csv file of pairs, see read_pairs
+    output_path : str
+        a .csv file, or a folder of .npy files for any other path
+    mode : str
+        'global' or 'local' similarity
+    op_costs : dict or None
+        costs of operations, None for the defaults of the class
+    chunk_size : int
+        pairs per chunk
+    workers : int or None
+        number of processes, None for one per CPU. With 1 worker
+        chunks are scored in this process
+    max_in_flight : int or None
+        most chunks being scored at once, defaults to
+        IN_FLIGHT_PER_WORKER per worker
+    resume : bool
+        skip the chunks an earlier run already wrote to output_path,
+        which must have used the same chunk_size
+    columns : tuple
+        columns of the csv holding str1 and str2
+    instrument : function or None
+        called at the end with a record of time spent waiting on
+        scores + writing them and cells of every pair scored
+    options :
+        other arguments of batch_pairs, e.g. test or substitution_matrix.
+        They are sent to the workers, so test must be picklable
+
+    Outputs
+    -------
+    pairs_done : int
+        number of pairs scored by this run
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = IN_FLIGHT_PER_WORKER*workers
+
+    results_type = csv_results if output_path.endswith('.csv') else npy_results
+    results = results_type(output_path, mode, chunk_size, resume)
+    first_chunk = results.chunks_done
+
+    pairs = read_pairs(input_path, columns, skip=first_chunk*chunk_size)
+    chunks = enumerate(chunked(pairs, chunk_size), first_chunk)
+
+    timer = make_timer(instrument)
+    pairs_done = 0
+    cells = 0
+    try:
+        if workers==1:
+            for chunk_index, chunk in chunks:
+                with timer.phase('score'):
+                    scores = score_chunk(chunk,mode,op_costs,options)
+                with timer.phase('write'):
+                    results.write(chunk_index, *scores)
+                pairs_done += len(chunk)
+                if instrument is not None:
+                    cells += _pair_cells(chunk)
+        else:
+            ## Queue of chunks being scored, oldest first so results
+            ##  are written in input order
+            with multiprocessing.Pool(workers) as pool:
+                in_flight = collections.deque()
+                for chunk_index, chunk in chunks:
+                    if len(in_flight) >= max_in_flight:
+                        pairs_done += _write_oldest(in_flight, results, timer)
+                    task = pool.apply_async(score_chunk,(chunk,mode,op_costs,options))
+                    in_flight.append((chunk_index,len(chunk),task))
+                    if instrument is not None:
+                        cells += _pair_cells(chunk)
+                while in_flight:
+                    pairs_done += _write_oldest(in_flight, results, timer)
+    finally:
+        results.close()
+
+    if instrument is not None:
+        instrument(make_record('run_pipeline',timer,cells))
+    return pairs_done
@@ -0,0 +1,2 @@
+# Make seed index visible to next module
+from .main import seed_index
@@ -0,0 +1,339 @@
+import numpy as np
+import json
+
+from ..local_similarity import local_similarity
+from ..helpers.instrumentation import make_timer, make_record
+
+# Default costs, same as local_similarity
+DEFAULT_COSTS = {'Delete':-1
+                ,'Insert':-1
+                ,'Substitute':-1
+                ,'Exact':2}
+
+
+def parse_seed(seed):
+    """Offsets of the symbols a spaced seed reads
+
+    Inputs
+    ------
+    seed : int or str
+        k for a contiguous k-mer, or a pattern such as '110101' where
+        '1' positions are read and '0' positions are skipped
+
+    Outputs
+    -------
+    offsets : numpy.array
+        offset of each symbol read, from the start of the seed
+    """
+
+    if isinstance(seed, int):
+        seed = '1'*seed
+    if not seed or set(seed) - {'0','1'} or seed[0]!='1' or seed[-1]!='1':
+        raise ValueError("seed must be k or a pattern of 0/1 starting + ending with 1, got {!r}".format(seed))
+    return np.array([ix for ix, flag in enumerate(seed) if flag=='1'], dtype=np.int64)
+
+
+def seed_values(codes, offsets, alphabet_size):
+    """Integer value of the seed starting at every position of a sequence
+
+    Symbols read by the seed are taken as digits base alphabet_size.
+
+    Inputs
+    ------
+    codes : numpy.array
+        integer codes of the sequence, -1 for symbols to never seed on
+    offsets : numpy.array
+        output of parse_seed
+    alphabet_size : int
+        number of distinct codes
+
+    Outputs
+    -------
+    values : numpy.array
+        value of the seed at each start position, -1 where it reads a -1
+    """
+
+    span = int(offsets[-1]) + 1
+    n = len(codes) - span + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    values = np.zeros(n, dtype=np.int64)
+    unknown = np.zeros(n, dtype=bool)
+    for offset in offsets:
+        window = codes[offset:offset+n]
+        values = values*alphabet_size + window
+        unknown |= window < 0
+    values[unknown] = -1
+    return values
+
+
+class seed_index:
+    """
+    k-mer index of a collection of target sequences, for
+    seed-and-extend local search
+
+    Every seed (a k-mer, or a spaced seed) of every target is stored
+    by value, along with its target and position. A search looks up
+    the seeds of the query, groups the hits on nearby diagonals of the
+    same target into candidate regions, and only runs local_similarity
+    on the window of the target around each region.
+
+    Knobs trading sensitivity for speed :
+
+      seed           longer seeds give fewer, more specific hits.
+                     Spaced seeds ('11011') stay sensitive to mismatches
+      min_hits       seed hits a region needs to be extended
+      band           diagonals merged into one region, and slack added
+                     on both sides of its window
+      max_occurrences seeds found more often in the targets are
+                     skipped, as in repeat masking
+      max_regions    most regions extended, by number of hits
+
+    Attributes
+    ----------
+    targets : list
+        the indexed sequences
+    seed : str
+        pattern of the seed
+    alphabet : dict
+        maps each symbol of the targets to its integer code
+    stats : dict
+        hits, regions + extended regions and cells filled by the
+        last search
+
+    Methods
+    -------
+    search(query, ...)
+        best local match in each target with enough seed hits
+    scan(query, ...)
+        local_similarity against every target, for comparison
+    save(path) / load(path)
+        keep the index on disk
+    """
+
+    def __init__(self, targets, seed=4):
+        """
+        Inputs
+        ------
+        targets : list
+           strings or lists of strings to index
+        seed : int or str
+           k for contiguous k-mers, or a spaced seed pattern, see
+           parse_seed
+        """
+
+        self.targets = list(targets)
+        offsets = parse_seed(seed)
+        self.seed = seed if isinstance(seed, str) else '1'*seed
+        self.stats = {}
+
+        self.alphabet = {}
+        target_codes = [np.array([self.alphabet.setdefault(s,len(self.alphabet)) for s in target], dtype=np.int64)
+                        for target in self.targets]
+        if max(len(self.alphabet),2)**len(offsets) >= 2**62:
+            raise ValueError("seed of {} symbols overflows for an alphabet of {}".format(len(offsets),len(self.alphabet)))
+
+        ## Every seed of every target, sorted by value
+        values = []
+        target_ids = []
+        positions = []
+        for target_id, codes in enumerate(target_codes):
+            target_values = seed_values(codes,offsets,len(self.alphabet))
+            values.append(target_values)
+            target_ids.append(np.full(len(target_values),target_id,dtype=np.int64))
+            positions.append(np.arange(len(target_values),dtype=np.int64))
+
+        values = np.concatenate(values) if values else np.empty(0,dtype=np.int64)
+        order = np.argsort(values, kind='stable')
+        self._set_table(values[order]
+                       ,np.concatenate(target_ids)[order] if target_ids else np.empty(0,dtype=np.int64)
+                       ,np.concatenate(positions)[order] if positions else np.empty(0,dtype=np.int64))
+
+    def _set_table(self, sorted_values, target_ids, positions):
+        '''
+        Distinct seed values, with the start of their hits in
+          target_ids + positions
+        '''
+        self.values, starts = np.unique(sorted_values, return_index=True)
+        self.starts = np.append(starts, len(sorted_values)).astype(np.int64)
+        self.target_ids = target_ids
+        self.positions = positions
+
+    def save(self, path):
+        """Save the index, targets included, as a numpy .npz file"""
+        meta = json.dumps({'seed':self.seed,'alphabet':list(self.alphabet),'targets':self.targets})
+        with open(path,'wb') as ofile:
+            np.savez(ofile
+                    ,values=self.values
+                    ,starts=self.starts
+                    ,target_ids=self.target_ids
+                    ,positions=self.positions
+                    ,meta=np.array(meta))
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved by save, without rebuilding it"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            index = cls.__new__(cls)
+            index.targets = meta['targets']
+            index.seed = meta['seed']
+            index.alphabet = {symbol:code for code, symbol in enumerate(meta['alphabet'])}
+            index.stats = {}
+            index.values = data['values']
+            index.starts = data['starts']
+            index.target_ids = data['target_ids']
+            index.positions = data['positions']
+        return index
+
+    def _hits(self, query, max_occurrences):
+        '''
+        (target_id, target position, query position) of every seed
+          of query found in the index
+        '''
+        offsets = parse_seed(self.seed)
+        codes = np.array([self.alphabet.get(s,-1) for s in query], dtype=np.int64)
+        query_values = seed_values(codes,offsets,len(self.alphabet))
+        query_positions = np.arange(len(query_values),dtype=np.int64)
+
+        ## Look up every seed of query at once
+        ix = np.searchsorted(self.values, query_values)
+        ix = np.minimum(ix, len(self.values)-1)
+        found = (query_values >= 0) & (len(self.values) > 0)
+        if len(self.values):
+            found &= self.values[ix]==query_values
+        starts = self.starts[ix][found]
+        counts = self.starts[ix+1][found] - starts
+        query_positions = query_positions[found]
+        if max_occurrences is not None:
+            keep = counts <= max_occurrences
+            starts, counts, query_positions = starts[keep], counts[keep], query_positions[keep]
+
+        ## Expand each seed into all of its hits
+        total = int(counts.sum())
+        first = np.repeat(np.cumsum(counts)-counts, counts)
+        rows = np.repeat(starts, counts) + np.arange(total) - first
+        return self.target_ids[rows], self.positions[rows], np.repeat(query_positions, counts)
+
+    def _regions(self, target_ids, target_positions, query_positions, band, min_hits):
+        '''
+        Group hits on diagonals at most band apart in the same target,
+          (target_id, lowest diagonal, highest diagonal, hits) of each
+          region with at least min_hits hits. Overlapping hits on one
+          diagonal are one longer match, so hits only count once per
+          block of len(seed) query positions of a diagonal
+        '''
+        if len(target_ids)==0:
+            return []
+        diagonals = target_positions - query_positions
+        order = np.lexsort((query_positions, diagonals, target_ids))
+        target_ids = target_ids[order]
+        diagonals = diagonals[order]
+        blocks = query_positions[order] // len(self.seed)
+
+        new_region = np.ones(len(order), dtype=bool)
+        new_region[1:] = (target_ids[1:]!=target_ids[:-1]) | (diagonals[1:]-diagonals[:-1] > band)
+        new_hit = new_region.copy()
+        new_hit[1:] |= (diagonals[1:]!=diagonals[:-1]) | (blocks[1:]!=blocks[:-1])
+
+        starts = np.flatnonzero(new_region)
+        stops = np.append(starts[1:], len(order))
+        hits = np.add.reduceat(new_hit.astype(np.int64), starts)
+
+        return [(int(target_ids[start]),int(diagonals[start]),int(diagonals[stop-1]),int(n_hits))
+                for start, stop, n_hits in zip(starts, stops, hits) if n_hits >= min_hits]
+
+    def search(self
+              ,query
+              ,op_costs=None
+              ,min_hits=2
+              ,band=8
+              ,max_occurrences=None
+              ,max_regions=None
+              ,instrument=None
+              ,**options):
+        """Best local match of query in each target with a candidate region
+
+        Inputs
+        ------
+        query : str or list of strings
+        op_costs : dict or None
+            costs of operations, None for the defaults of local_similarity
+        min_hits : int
+            seed hits a region needs to be extended. Lower is more
+            sensitive + slower
+        band : int
+            diagonals at most band apart form one region, and the
+            window extended spans band more on each side
+        max_occurrences : int or None
+            skip seeds found more often than this in the targets
+        max_regions : int or None
+            extend only this many regions, those with the most hits
+        instrument : function or None
+            called with a record of time spent in seed lookup,
+            clustering and extension, and cells filled
+        options :
+            other arguments of local_similarity, e.g. test or
+            substitution_matrix. Seeds always match exact symbols
+
+        Outputs
+        -------
+        matches : list
+            (target_id, match_distance, match_end) best first, where
+            match_end is the (row, col) of the match in the edit array
+            of query vs the whole target, as in local_similarity
+        """
+
+        if op_costs is None:
+            op_costs = DEFAULT_COSTS
+        timer = make_timer(instrument)
+
+        with timer.phase('seed'):
+            target_ids, target_positions, query_positions = self._hits(query, max_occurrences)
+        with timer.phase('cluster'):
+            regions = self._regions(target_ids, target_positions, query_positions, band, min_hits)
+            n_regions = len(regions)
+            if max_regions is not None:
+                regions = sorted(regions, key=lambda region: -region[3])[:max_regions]
+
+        ## Extend each region over the window of its diagonals
+        best = {}
+        cells = 0
+        with timer.phase('extend'):
+            for target_id, low, high, hits in regions:
+                target = self.targets[target_id]
+                start = max(0, low-band)
+                stop = min(len(target), high+len(query)+band)
+                sim_init = local_similarity(query,target[start:stop],False,op_costs,engine='numpy',**options)
+                sim_init.run()
+                cells += sim_init.len1*sim_init.len2
+                if sim_init.match_end is None:
+                    continue
+                match = (sim_init.match_distance,(sim_init.match_end[0],sim_init.match_end[1]+start))
+                if target_id not in best or match[0] > best[target_id][0]:
+                    best[target_id] = match
+
+        self.stats = {'hits':len(target_ids),'regions':n_regions,'extended':len(regions),'cells':cells}
+        if instrument is not None:
+            instrument(make_record('seed_index',timer,cells))
+
+        matches = [(target_id,int(score),end) for target_id, (score, end) in best.items()]
+        matches.sort(key=lambda match: (-match[1],match[0]))
+        return matches
+
+    def scan(self, query, op_costs=None, **options):
+        """Best local match of query in every target, running
+        local_similarity on each whole target. Same outputs as search
+        """
+
+        if op_costs is None:
+            op_costs = DEFAULT_COSTS
+        matches = []
+        for target_id, target in enumerate(self.targets):
+            sim_init = local_similarity(query,target,False,op_costs,engine='numpy',**options)
+            sim_init.run()
+            if sim_init.match_end is not None:
+                matches.append((target_id,int(sim_init.match_distance),sim_init.match_end))
+        matches.sort(key=lambda match: (-match[1],match[0]))
+        return matches
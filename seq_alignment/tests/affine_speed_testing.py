@@ -0,0 +1,40 @@
+# Add Parent Directory to Python Path (HACK: DON"T PUT IN PRODUCTION)
+import os 
+import inspect 
+import sys 
+import timeit 
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(os.path.dirname(currentdir))
+sys.path.insert(0,parentdir)
+
+from seq_alignment import global_similarity, local_similarity
+from seq_alignment.helpers.speed_test import create_random_test_data, run_matching
+from functools import partial 
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+# ~~~~ AFFINE GAPS VS LINEAR GAPS SPEED TEST ~~~~ #
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# PARAMETERS
+SLOWDOWN_THRESHOLD = 3   #<- Affine gaps slower than linear gaps by more than this, then test fails
+LINEAR_COSTS = {'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':1}
+AFFINE_COSTS = dict(LINEAR_COSTS,Open=-3)
+
+# Create test data, shorter with backtrace as linear gaps then
+#  fill the edit array one cell at a time #
+test_data = {False:create_random_test_data(n_pairs=10,length=1000)
+            ,True:create_random_test_data(n_pairs=10,length=200)}
+
+for name, similarity in [('global',global_similarity),('local',local_similarity)]:
+    for backtrace in [False,True]:
+        # Without backtrace both run on the numpy kernels, so only the gap model differs
+        linear = partial(similarity,op_costs=LINEAR_COSTS,engine='numpy')
+        affine = partial(similarity,op_costs=AFFINE_COSTS,engine='numpy')
+
+        linear_run = timeit.Timer(partial(run_matching,run_function=linear,test_data=test_data[backtrace],backtrace=backtrace)).timeit(1)
+        affine_run = timeit.Timer(partial(run_matching,run_function=affine,test_data=test_data[backtrace],backtrace=backtrace)).timeit(1)
+
+        slowdown = affine_run/linear_run
+        outcome = 'OK' if slowdown <= SLOWDOWN_THRESHOLD else 'TOO SLOW'
+        print('{outcome} : {name} similarity, backtrace={backtrace}, linear {linear_run:.3f}s, affine {affine_run:.3f}s ({slowdown:.2f}x)'.format(
+            outcome=outcome,name=name,backtrace=backtrace,linear_run=linear_run,affine_run=affine_run,slowdown=slowdown))
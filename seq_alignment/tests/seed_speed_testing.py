@@ -0,0 +1,61 @@
+# Add Parent Directory to Python Path (HACK: DON"T PUT IN PRODUCTION)
+import os 
+import inspect 
+import sys 
+import random
+import time
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(os.path.dirname(currentdir))
+sys.path.insert(0,parentdir)
+
+from seq_alignment import seed_index
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+# ~~~~ SEED + EXTEND VS FULL SCAN SPEED TEST ~~~~ #
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# PARAMETERS
+N_TARGETS = 500
+TARGET_LENGTH = 2000
+N_QUERIES = 10
+QUERY_LENGTH = 100
+MUTATION_RATE = 0.1
+SETTINGS = [{'seed':8,'min_hits':2}
+           ,{'seed':11,'min_hits':1}
+           ,{'seed':'110110110111','min_hits':2}
+           ,{'seed':8,'min_hits':2,'max_regions':5}]
+
+rng = random.Random(0)
+
+def mutate(seq):
+    return ''.join(rng.choice('acgt') if rng.random() < MUTATION_RATE else s for s in seq)
+
+# Random database, with each query a mutated piece of one target #
+targets = [''.join(rng.choice('acgt') for _ in range(TARGET_LENGTH)) for _ in range(N_TARGETS)]
+queries = []
+for _ in range(N_QUERIES):
+    target_id = rng.randrange(N_TARGETS)
+    start = rng.randrange(TARGET_LENGTH-QUERY_LENGTH)
+    queries.append(mutate(targets[target_id][start:start+QUERY_LENGTH]))
+
+# Full scan, the reference for both speed + sensitivity #
+index = seed_index(targets,8)
+start = time.perf_counter()
+expected = [index.scan(query)[0] for query in queries]
+scan_time = time.perf_counter() - start
+print('full scan : {:.3f}s'.format(scan_time))
+
+# Sensitivity = fraction of queries whose best match is found #
+for settings in SETTINGS:
+    options = {key:value for key, value in settings.items() if key!='seed'}
+    build_start = time.perf_counter()
+    index = seed_index(targets,settings['seed'])
+    build_time = time.perf_counter() - build_start
+
+    start = time.perf_counter()
+    found = [index.search(query,**options)[:1] for query in queries]
+    search_time = time.perf_counter() - start
+
+    sensitivity = sum(match==[best] for match, best in zip(found,expected))/len(queries)
+    print('{settings} : build {build_time:.3f}s, search {search_time:.3f}s ({speedup:.1f}x faster), sensitivity {sensitivity:.0%}'.format(
+        settings=settings,build_time=build_time,search_time=search_time,speedup=scan_time/search_time,sensitivity=sensitivity))
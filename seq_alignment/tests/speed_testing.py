@@ -11,50 +11,50 @@ class bcolors:
     UNDERLINE = '\033[4m'
 
 # Add Parent Directory to Python Path (HACK: DON"T PUT IN PRODUCTION)
-import os 
-import inspect 
-import sys 
-import timeit 
+import os
+import inspect
+import sys
+import argparse
 currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-parentdir = os.path.dirname(currentdir)
+parentdir = os.path.dirname(os.path.dirname(currentdir))
 sys.path.insert(0,parentdir)
 
-# Get path to data files
-path_to_data = os.path.join(parentdir,'data/seq_alignments/seq_alignment.csv')
-
-# PYTHON RELOAD THE SOURCE FILE
-os.chdir('../')
-print(os.getcwd())
-from seq_alignment.wagner_fisher.main import wagner_fisher as wf_curr
-from seq_alignment.wagner_fisher.main_test import wagner_fisher as wf_new
-from seq_alignment.helpers.speed_test import create_test_data, run_matching
-from functools import partial 
+from seq_alignment.helpers.benchmark import run_benchmarks, save_baseline, load_baseline, find_regressions
+from seq_alignment.helpers.benchmark import LENGTHS, ALPHABET_SIZES, REGRESSION_THRESHOLD
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-# ~~~~ RUN SPEED IMPROVEMENT TEST ~~~~ #
+# ~~~~~~~~~ RUN BENCHMARK SUITE ~~~~~~~~~ #
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-
-# PARAMETERS
-SPEED_IMPROVEMENT_THRESHOLD = 2   #<- Speed improvement > than this, then test is a success
-
-# Create test data #
-test_data = create_test_data(path_to_data)
-
-# Run speed test on old code + new code #
-curr_version = timeit.Timer(partial(run_matching,run_function=wf_curr,test_data=test_data,backtrace=False))
-new_version = timeit.Timer(partial(run_matching,run_function=wf_new,test_data=test_data,backtrace=False))
-curr_version_run = curr_version.timeit(2)
-new_version_run = new_version.timeit(2)
-
-# Create variables indicating whether there was a speed improvement
-#  and change color of message to green if there is and red if there is no
-run_time_change = curr_version_run/new_version_run
-speed_test_outcome = run_time_change>SPEED_IMPROVEMENT_THRESHOLD
-outcome_color = bcolors.OKGREEN if speed_test_outcome else bcolors.FAIL 
-outcome_message = 'SUCCESSFUL SPEED IMPROVEMENT' if speed_test_outcome else 'NO SPEED IMPROVEMENT' 
-
-# Return improvement
-print('{color_start}{outcome_message}{color_end} : New code improves Old code by {color_start}{run_time_change:2.2f}x{color_end}'.format(color_start=outcome_color
-                                                                                                 ,color_end=bcolors.ENDC
-                                                                                                 ,outcome_message=outcome_message
-                                                                                                 ,run_time_change=run_time_change))
\ No newline at end of file
+#
+# python seq_alignment/tests/speed_testing.py --save baseline.json
+# python seq_alignment/tests/speed_testing.py --baseline baseline.json
+
+parser = argparse.ArgumentParser(description='Time global/local similarity over a sweep of lengths + alphabet sizes.')
+parser.add_argument('--lengths', type=int, nargs='+', default=list(LENGTHS))
+parser.add_argument('--alphabet-sizes', type=int, nargs='+', default=list(ALPHABET_SIZES))
+parser.add_argument('--repeat', type=int, default=3)
+parser.add_argument('--save', help='save results as a json baseline')
+parser.add_argument('--baseline', help='json baseline to compare against')
+parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD
+                   ,help='fraction of baseline cells/s a benchmark may lose')
+args = parser.parse_args()
+
+# Run benchmarks #
+results = run_benchmarks(lengths=args.lengths,alphabet_sizes=args.alphabet_sizes,repeat=args.repeat)
+if args.save:
+    save_baseline(results,args.save)
+
+# Compare to baseline, failing on any regression #
+if args.baseline:
+    regressions = find_regressions(results,load_baseline(args.baseline),args.threshold)
+    for key, (before, after) in regressions.items():
+        print('{color_start}REGRESSION{color_end} : {key} {before:,.0f} -> {after:,.0f} cells/s'.format(color_start=bcolors.FAIL
+                                                                                                         ,color_end=bcolors.ENDC
+                                                                                                         ,key=key
+                                                                                                         ,before=before
+                                                                                                         ,after=after))
+    if regressions:
+        sys.exit(1)
+    print('{color_start}NO REGRESSIONS{color_end} : every benchmark within {threshold:.0%} of baseline'.format(color_start=bcolors.OKGREEN
+                                                                                                                ,color_end=bcolors.ENDC
+                                                                                                                ,threshold=args.threshold))
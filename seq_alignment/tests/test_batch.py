@@ -0,0 +1,61 @@
+import numpy as np
+
+def test_batch_score():
+
+    import random
+    from seq_alignment import batch_score, global_similarity, local_similarity, BLOSUM62
+
+    rng = random.Random(7)
+    query = ''.join(rng.choice('acgt') for _ in range(25))
+    targets = [''.join(rng.choice('acgt') for _ in range(rng.randint(0,40))) for _ in range(50)]
+    op_costs = {'Delete':-2,'Insert':-1,'Substitute':-1,'Exact':1}
+
+    # Same match_distance as the classes, whatever the buckets
+    for mode, similarity in [('global',global_similarity),('local',local_similarity)]:
+        for costs in [None,op_costs]:
+            expected = []
+            for target in targets:
+                sim_init = similarity(query,target) if costs is None else similarity(query,target,False,costs)
+                sim_init.run()
+                expected.append(sim_init.match_distance)
+            for bucket_size in [1,7,256]:
+                scores = batch_score(query,targets,mode,costs,bucket_size=bucket_size)
+                assert scores.tolist() == expected
+
+    # Substitution matrices + custom tests
+    proteins = ['HEAGAWGHEE','PAWHEAE','MKTAYIAKQR','W']
+    costs = {'Delete':-8,'Insert':-8,'Substitute':0,'Exact':0}
+    scores = batch_score('PAWHEAE',proteins,'local',costs,substitution_matrix=BLOSUM62)
+    for target, score in zip(proteins,scores):
+        sim_init = local_similarity('PAWHEAE',target,False,costs,substitution_matrix=BLOSUM62)
+        sim_init.run()
+        assert score == sim_init.match_distance
+
+    caseless = lambda a, b: a.lower()==b.lower()
+    scores = batch_score('Vine',['vINE','wine'],test=caseless)
+    assert scores.tolist() == [0,-1]
+
+
+def test_batch_pairs():
+
+    import random
+    from seq_alignment import batch_pairs, global_similarity, local_similarity
+
+    rng = random.Random(11)
+    pairs = [(''.join(rng.choice('acgt') for _ in range(rng.randint(0,30)))
+             ,''.join(rng.choice('acgt') for _ in range(rng.randint(0,30)))) for _ in range(60)]
+    op_costs = {'Delete':-1,'Insert':-2,'Substitute':-1,'Exact':2}
+
+    # Same match_distance (+ match_end) as the classes, whatever the buckets
+    for bucket_size in [1,8,256]:
+        scores = batch_pairs(pairs,'global',op_costs,bucket_size=bucket_size)
+        scores_local, ends = batch_pairs(pairs,'local',op_costs,bucket_size=bucket_size)
+        for (str1, str2), score, score_local, end in zip(pairs,scores,scores_local,ends):
+            wf_init = global_similarity(str1,str2,False,op_costs)
+            wf_init.run()
+            assert score == wf_init.match_distance
+
+            ls_init = local_similarity(str1,str2,False,op_costs)
+            ls_init.run()
+            assert score_local == ls_init.match_distance
+            assert tuple(end) == (ls_init.match_end or (-1,-1))
@@ -0,0 +1,24 @@
+def test_benchmarks():
+
+    from seq_alignment.helpers.benchmark import run_benchmarks, CASES
+
+    # Every case runs on a small sweep, skipping those past max_length
+    results = run_benchmarks(lengths=(10,2000),alphabet_sizes=(4,),repeat=1,report=None,cases=CASES[:3])
+    assert sorted(results) == ['global-backtrace/n=10/alphabet=4'
+                              ,'global-score-bitparallel/n=10/alphabet=4'
+                              ,'global-score-bitparallel/n=2000/alphabet=4'
+                              ,'global-score-numpy/n=10/alphabet=4'
+                              ,'global-score-numpy/n=2000/alphabet=4']
+    assert all(result['cells_per_second'] > 0 and result['peak_memory'] > 0 for result in results.values())
+
+
+def test_find_regressions(tmp_path):
+
+    from seq_alignment.helpers.benchmark import find_regressions, save_baseline, load_baseline
+
+    baseline = {'a':{'cells_per_second':100.0},'b':{'cells_per_second':100.0},'c':{'cells_per_second':100.0}}
+    results = {'a':{'cells_per_second':80.0},'b':{'cells_per_second':70.0},'d':{'cells_per_second':1.0}}
+
+    # Only benchmarks in both, and past the threshold, regress
+    save_baseline(baseline,str(tmp_path/'baseline.json'))
+    assert find_regressions(results,load_baseline(str(tmp_path/'baseline.json')),0.25) == {'b':(100.0,70.0)}
@@ -0,0 +1,78 @@
+def near(a, b, tol):
+    return abs(ord(a)-ord(b)) <= tol
+
+
+def test_result_cache(tmp_path):
+
+    import operator
+    import functools
+    from seq_alignment import result_cache, global_similarity, local_similarity, collector
+    from seq_alignment.cache import cache_key
+
+    pairs = [('kitten','sitting'),('sitting','kitten'),('GATTACA','TACGAT'),('kitten','sitting')]
+    op_costs = {'Delete':-2,'Insert':-2,'Substitute':-1,'Exact':1}
+
+    # Same match_distance as the classes
+    cache = result_cache(max_size=8)
+    for mode, similarity in [('global',global_similarity),('local',local_similarity)]:
+        for str1, str2 in pairs:
+            sim_init = similarity(str1,str2,False,op_costs)
+            sim_init.run()
+            assert cache.score(str1,str2,mode,op_costs) == sim_init.match_distance
+
+    # Swapped pairs share a key when Insert == Delete, not otherwise
+    assert cache_key('ab','abc','global',op_costs) == cache_key('abc','ab','global',op_costs)
+    skewed = dict(op_costs,Insert=-1)
+    assert cache_key('ab','abc','global',skewed) != cache_key('abc','ab','global',skewed)
+    assert cache_key('ab','abc','global',op_costs) != cache_key('ab','abc','local',op_costs)
+    assert cache_key('ab','abc') == cache_key('ab','abc',engine='numpy')
+
+    # Default costs share a key with passing them
+    assert cache_key('ab','abc') == cache_key('ab','abc','global',{'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':0})
+    assert cache_key('ab','abc','local') == cache_key('ab','abc','local',{'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':2})
+    assert cache_key('ab','abc','local') != cache_key('ab','abc','global')
+    assert cache.stats == {'hits':4,'disk_hits':0,'misses':4,'evictions':0}
+    assert cache.hit_rate() == 0.5
+
+    # Lambdas can't be keyed
+    try:
+        cache.score('a','b',test=lambda a, b: a==b)
+        assert False
+    except ValueError:
+        pass
+    assert cache.score('a','A',test=operator.eq) == -1
+
+    # Partial tests are keyed by their arguments, other unnamed
+    #  callables can't be keyed
+    assert cache.score('abc','bcd',test=functools.partial(near,tol=5)) == 0
+    assert cache.score('abc','bcd',test=functools.partial(near,tol=0)) == -2
+    class always:
+        def __call__(self, a, b):
+            return True
+    try:
+        cache.score('a','b',test=always())
+        assert False
+    except ValueError:
+        pass
+
+    # LRU evicts the oldest result
+    cache = result_cache(max_size=2)
+    for str1 in ['a','b','c','a']:
+        cache.score(str1,'abc')
+    assert len(cache) == 2
+    assert cache.stats['evictions'] == 2 and cache.stats['misses'] == 4
+
+    # Disk tier keeps results across caches, instruments see hits + misses
+    path = str(tmp_path / 'cache.sqlite')
+    cache = result_cache(path=path)
+    assert cache.score('kitten','sitting') == -3
+    cache.close()
+    instrument = collector()
+    cache = result_cache(path=path)
+    assert cache.score('sitting','kitten',instrument=instrument) == -3
+    assert cache.score('kitten','mitten',instrument=instrument) == -1
+    assert cache.stats['disk_hits'] == 1 and cache.stats['misses'] == 1
+    summary = instrument.summary()
+    assert summary['cache']['hits'] == 1 and summary['cache']['misses'] == 1
+    assert [record['name'] for record in instrument.records] == ['result_cache','global_similarity','result_cache']
+    cache.close()
@@ -0,0 +1,35 @@
+def test_trie_search():
+
+    import random
+    from seq_alignment import trie, global_similarity
+
+    rng = random.Random(11)
+    words = [''.join(rng.choice('abc') for _ in range(rng.randint(0,7))) for _ in range(300)]
+    words += ['abc','abc']
+    op_costs = {'Delete':-2,'Insert':-1,'Substitute':-1,'Exact':0}
+    caseless = lambda a, b: a.lower()==b.lower()
+
+    # Same words + scores as running global_similarity on every word
+    index = trie(words)
+    for query in ['abca','','cCab']:
+        for k in [0,1,3]:
+            for costs, options in [(None,{}),(op_costs,{}),(op_costs,{'test':caseless})]:
+                expected = []
+                for ix, word in enumerate(words):
+                    sim_init = global_similarity(query,word,False,costs or {'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':0},engine='numpy',**options)
+                    sim_init.run()
+                    if sim_init.match_distance >= -k:
+                        expected.append((-sim_init.match_distance,ix,word))
+                expected = [(word,-score) for score, ix, word in sorted(expected)]
+                assert index.search(query,k,costs,**options) == expected
+
+    # Shared prefixes are filled once, pruned subtrees not at all
+    index = trie(['kitten','kitchen','kit','sitting','mitten'])
+    assert index.search('kitten',1) == [('kitten',0),('mitten',-1)]
+    assert index.rows_filled < index.nodes
+
+    try:
+        index.search('kitten',1,{'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':1})
+        assert False
+    except ValueError:
+        pass
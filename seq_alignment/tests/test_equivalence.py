@@ -0,0 +1,44 @@
+def test_match_table():
+
+    import random
+    from seq_alignment import global_similarity, local_similarity, batch_pairs, match_table, IUPAC_DNA
+
+    # Ambiguity codes match every base they stand for, not each other's bases
+    assert IUPAC_DNA('R','A') and IUPAC_DNA('R','G') and IUPAC_DNA('N','T')
+    assert not IUPAC_DNA('R','C') and not IUPAC_DNA('A','G') and IUPAC_DNA('R','N')
+
+    meanings = {'A':'A','C':'C','G':'G','T':'T','R':'AG','Y':'CT','N':'ACGT'}
+    def ambiguous(a, b):
+        return bool(set(meanings[a]) & set(meanings[b]))
+
+    # Same scores as the test it was compiled from, for every engine
+    rng = random.Random(8)
+    op_costs = {'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':1}
+    for _ in range(20):
+        str1 = ''.join(rng.choice('ACGTRYN') for _ in range(rng.randint(1,15)))
+        str2 = ''.join(rng.choice('ACGTRYN') for _ in range(rng.randint(1,15)))
+        for similarity in [global_similarity,local_similarity]:
+            for backtrace, engine in [(False,'python'),(False,'numpy'),(True,'python')]:
+                expected = similarity(str1,str2,backtrace,op_costs,test=ambiguous,engine=engine)
+                expected.run()
+                compiled = similarity(str1,str2,backtrace,op_costs,test=IUPAC_DNA,engine=engine)
+                compiled.run()
+                assert compiled.match_distance == expected.match_distance
+        expected = global_similarity(str1,str2,False,op_costs,test=ambiguous)
+        expected.run()
+        assert batch_pairs([(str1,str2)],op_costs=op_costs,test=IUPAC_DNA)[0] == expected.match_distance
+
+    # Classes, with undeclared symbols memoized by the fallback test
+    calls = []
+    def fallback(a, b):
+        calls.append((a,b))
+        return a==b
+    caseless = match_table.from_classes(['aA','bB'],fallback)
+    assert caseless('a','A') and not caseless('a','b') and not calls
+    wf_init = global_similarity('aBxy','Abxz',test=caseless,engine='python')
+    wf_init.run()
+    assert wf_init.match_distance == -1
+    assert len(calls) == len(set(calls))
+    caseless('x','z')
+    caseless('x','z')
+    assert calls.count(('x','z')) == 1
@@ -0,0 +1,42 @@
+def test_filter_pairs():
+
+    import random
+    import numpy as np
+    from seq_alignment import filter_pairs, threshold_pairs, global_similarity, collector
+
+    rng = random.Random(4)
+    pairs = [(''.join(rng.choice('abcd') for _ in range(rng.randint(0,12)))
+             ,''.join(rng.choice('abcd') for _ in range(rng.randint(0,12)))) for _ in range(400)]
+    pairs += [('abcabc','abcabd'),('aaaa','bbbb'),('','')]
+    op_costs = {'Delete':-2,'Insert':-1,'Substitute':-2,'Exact':0}
+
+    for costs in [None,op_costs]:
+        expected = []
+        for str1, str2 in pairs:
+            sim_init = global_similarity(str1,str2,False,costs or {'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':0})
+            sim_init.run()
+            expected.append(sim_init.match_distance)
+        expected = np.array(expected)
+
+        for max_distance in [0,2,5]:
+            within = expected >= -max_distance
+            for q, probe in [(1,False),(2,False),(3,True)]:
+                # Bounds never reject a pair within max_distance
+                keep, stats = filter_pairs(pairs,max_distance,costs,q=q,probe=probe)
+                assert keep[within].all()
+                assert stats['pairs'] - sum(stats['rejected'].values()) == stats['passed'] == keep.sum()
+
+                # Exact scores of the pairs left
+                scores, stats = threshold_pairs(pairs,max_distance,costs,q=q,probe=probe)
+                assert np.array_equal(np.isnan(scores),~within)
+                assert (scores[within] == expected[within]).all()
+                assert stats['passed'] == within.sum()
+
+            # The probe's band is exact, so nothing is left for the exact scores
+            _, stats = threshold_pairs(pairs,max_distance,costs,probe=True)
+            assert stats['rejected']['exact'] == 0
+
+    instrument = collector()
+    _, stats = filter_pairs(pairs,1,probe=True,instrument=instrument)
+    assert stats['rejected']['length'] > 0 and stats['rejected']['qgram'] > 0
+    assert set(instrument.records[0]['phases']) == {'length','qgram','probe'}
@@ -1,3 +1,5 @@
+import numpy as np
+
 def global_similarity_setup(backtrace=True):
 
     # ~~~ Wagner Fischer ~~~ #
@@ -69,3 +71,283 @@ def test_backtrace_result_same():
 
     # Compare that answers are the same
     assert np.array_equal(wf_backtrace.match_distance,wf_no_backtrace.match_distance)
+
+def test_numpy_engine_same_distance():
+
+    import random
+    from seq_alignment import global_similarity
+
+    rng = random.Random(0)
+    op_costs_list = [{'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':0}
+                    ,{'Delete':-2,'Insert':-1,'Substitute':-3,'Exact':1}]
+
+    for op_costs in op_costs_list:
+        for _ in range(25):
+            str1 = ''.join(rng.choice('acgt') for _ in range(rng.randint(0,30)))
+            str2 = ''.join(rng.choice('acgt') for _ in range(rng.randint(0,30)))
+
+            python_run = global_similarity(str1,str2,False,op_costs)
+            numpy_run = global_similarity(str1,str2,False,op_costs,engine='numpy')
+            backtrace_run = global_similarity(str1,str2,True,op_costs)
+            python_run.run()
+            numpy_run.run()
+            if str1 and str2:
+                backtrace_run.run()
+                assert backtrace_run.match_distance == python_run.match_distance
+
+            assert numpy_run.match_distance == python_run.match_distance
+
+
+def test_bit_parallel_engine_same_distance():
+
+    import random
+    from seq_alignment import global_similarity
+
+    rng = random.Random(1)
+
+    # Lengths straddle a 64 bit word
+    for _ in range(40):
+        str1 = ''.join(rng.choice('acgt') for _ in range(rng.randint(0,150)))
+        str2 = ''.join(rng.choice('acgt') for _ in range(rng.randint(0,150)))
+
+        python_run = global_similarity(str1,str2,False,engine='python')
+        bit_run = global_similarity(str1,str2,False)
+        python_run.run()
+        bit_run.run()
+
+        assert bit_run.engine == 'bitparallel'
+        assert bit_run.match_distance == python_run.match_distance
+
+
+def test_auto_engine_falls_back():
+
+    from seq_alignment import global_similarity
+
+    op_costs = {'Delete':-1,'Insert':-1,'Substitute':-2,'Exact':0}
+    wf_init = global_similarity('kitten','sitting',False,op_costs)
+
+    assert wf_init.engine == 'python'
+
+
+def test_max_distance_same_as_full_run():
+
+    import random
+    from seq_alignment import global_similarity
+
+    rng = random.Random(2)
+
+    for _ in range(40):
+        str1 = ''.join(rng.choice('ac') for _ in range(rng.randint(1,20)))
+        str2 = list(str1)
+        for _ in range(rng.randint(0,6)):
+            str2.insert(rng.randint(0,len(str2)),rng.choice('ac'))
+        str2 = ''.join(str2)
+
+        full_run = global_similarity(str1,str2,True)
+        full_run.run()
+        distance = -full_run.match_distance
+
+        for max_distance in (distance-1, distance, distance+2):
+            for engine, backtrace in (('python',False),('numpy',False),('python',True)):
+                banded_run = global_similarity(str1,str2,backtrace,engine=engine,max_distance=max_distance)
+                banded_run.run()
+
+                if max_distance < distance:
+                    assert banded_run.exceeds_threshold
+                    assert banded_run.match_distance is None
+                else:
+                    assert not banded_run.exceeds_threshold
+                    assert banded_run.match_distance == -distance
+                if backtrace and max_distance >= distance:
+                    assert np.array_equal(banded_run.match_alignment_table, full_run.match_alignment_table)
+
+
+def test_band_rejects_length_difference():
+
+    from seq_alignment import global_similarity
+
+    wf_init = global_similarity('abcdef','ab',False,band=2)
+    wf_init.run()
+
+    assert wf_init.exceeds_threshold
+    assert wf_init.match_distance is None
+
+    # str1 longer than str2 past the band, for every engine + backtrace
+    for str1, str2, options in [('cacaaa','',{'max_distance':1})
+                               ,('abcdef','a',{'band':2})
+                               ,('abcdef','ab',{'band':3,'max_distance':2})
+                               ,('a','abcdef',{'band':2})]:
+        for backtrace in [False,True]:
+            for engine in ['python','numpy']:
+                wf_init = global_similarity(str1,str2,backtrace,engine=engine,**options)
+                wf_init.run()
+                assert wf_init.exceeds_threshold
+                assert wf_init.match_distance is None
+
+
+def test_linear_space_alignment():
+
+    import random
+    import pytest
+    from seq_alignment import global_similarity
+
+    # Same table on the small example
+    wf_full = global_similarity_setup(True)
+    wf_linear = global_similarity(['v','i','n','e'],['v','i','n'],True,linear_space=True)
+    wf_linear.run()
+    assert np.array_equal(wf_linear.match_alignment_table, wf_full.match_alignment_table)
+
+    # No backtrace_array to draw a table from
+    with pytest.raises(ValueError):
+        wf_linear.make_backtrace_table()
+
+    # Same score on sequences big enough to split, and the alignment
+    #  spells out both strings
+    rng = random.Random(3)
+    op_costs = {'Delete':-2,'Insert':-1,'Substitute':-2,'Exact':1}
+    for _ in range(5):
+        str1 = ''.join(rng.choice('acgt') for _ in range(rng.randint(50,120)))
+        str2 = ''.join(rng.choice('acgt') for _ in range(rng.randint(50,120)))
+
+        wf_full = global_similarity(str1,str2,False,op_costs,engine='numpy')
+        wf_linear = global_similarity(str1,str2,True,op_costs,linear_space=True)
+        wf_full.run()
+        wf_linear.run()
+
+        table = wf_linear.match_alignment_table
+        assert wf_linear.match_distance == wf_full.match_distance
+        assert ''.join(table[0]).replace(' ','') == str1
+        assert ''.join(table[1]).replace(' ','') == str2
+
+
+def test_substitution_matrix():
+
+    import pytest
+    from seq_alignment import global_similarity, BLOSUM62
+
+    # Every engine gives the same score with BLOSUM62 
+    op_costs = {'Delete':-4,'Insert':-4,'Substitute':0,'Exact':0}
+    pairs = [('HEAGAWGHEE','PAWHEAE'),('MKTAYIAKQR','MKTAHIAKQ'),('WWW','AAAAZ')]
+    for str1, str2 in pairs:
+        scores = []
+        for engine in ('python','numpy','auto'):
+            wf_init = global_similarity(str1,str2,False,op_costs,engine=engine,substitution_matrix=BLOSUM62)
+            wf_init.run()
+            scores.append(wf_init.match_distance)
+        wf_init = global_similarity(str1,str2,True,op_costs,substitution_matrix=BLOSUM62)
+        wf_init.run()
+        scores.append(wf_init.match_distance)
+        assert len(set(scores))==1
+
+    # Alignment spells out both strings
+    wf_init = global_similarity('HEAGAWGHEE','PAWHEAE',True,op_costs,substitution_matrix=BLOSUM62)
+    wf_init.run()
+    table = wf_init.match_alignment_table
+    assert ''.join(table[0]).replace(' ','') == 'HEAGAWGHEE'
+    assert ''.join(table[1]).replace(' ','') == 'PAWHEAE'
+
+    # Bit-parallel only knows unit costs
+    with pytest.raises(ValueError):
+        global_similarity('AR','AN',engine='bitparallel',substitution_matrix=BLOSUM62)
+
+
+def test_affine_gaps():
+
+    import pytest
+    from seq_alignment import global_similarity
+
+    # One gap of 3 costs Open + 3*Delete
+    op_costs = {'Delete':-1,'Insert':-1,'Substitute':-2,'Exact':1,'Open':-4}
+    for backtrace in [False,True]:
+        wf_init = global_similarity('aaagggttt','aaattt',backtrace,op_costs)
+        wf_init.run()
+        assert wf_init.match_distance == 6 - 4 - 3
+    assert ''.join(wf_init.match_alignment_table[2]) == 'SSSDDDSSS'
+
+    # Without 'Open' the same strings are back to linear gaps
+    wf_init = global_similarity('aaagggttt','aaattt',False,dict(op_costs,Open=0))
+    wf_init.run()
+    assert wf_init.match_distance == 6 - 3
+
+    with pytest.raises(ValueError):
+        global_similarity('ab','ab',op_costs=dict(op_costs,Open=1))
+    with pytest.raises(ValueError):
+        global_similarity('ab','ab',op_costs=op_costs,band=2)
+
+    # Only the numpy kernels run affine gaps
+    for engine in ['python','bitparallel']:
+        with pytest.raises(ValueError):
+            global_similarity('ab','ab',op_costs=op_costs,engine=engine)
+
+
+def gotoh_score(str1, str2, op_costs, local=False):
+
+    # Cell by cell Gotoh, H best alignment, E ending in an insertion,
+    #  F ending in a deletion
+    low = float('-inf')
+    open_cost = op_costs['Open']
+    len1, len2 = len(str1)+1, len(str2)+1
+    H = [[low]*len2 for _ in range(len1)]
+    E = [[low]*len2 for _ in range(len1)]
+    F = [[low]*len2 for _ in range(len1)]
+    H[0][0] = 0
+    for row in range(len1):
+        for col in range(len2):
+            if col > 0:
+                E[row][col] = max(E[row][col-1],H[row][col-1]+open_cost) + op_costs['Insert']
+            if row > 0:
+                F[row][col] = max(F[row-1][col],H[row-1][col]+open_cost) + op_costs['Delete']
+            if row > 0 and col > 0:
+                t_ij = op_costs['Exact'] if str1[row-1]==str2[col-1] else op_costs['Substitute']
+                H[row][col] = max(H[row-1][col-1]+t_ij,E[row][col],F[row][col])
+            elif row > 0 or col > 0:
+                H[row][col] = max(E[row][col],F[row][col])
+            if local:
+                H[row][col] = max(H[row][col],0)
+
+    if local:
+        return max(max(row) for row in H)
+    return H[-1][-1]
+
+
+def alignment_score(table, op_costs):
+
+    # Score of an alignment table, paying 'Open' once per run of gaps
+    score = 0
+    past = None
+    for sub1, sub2, action in zip(*table):
+        if action in ('I','D'):
+            score += op_costs['Insert' if action=='I' else 'Delete']
+            if action != past:
+                score += op_costs['Open']
+        else:
+            score += op_costs['Exact'] if sub1==sub2 else op_costs['Substitute']
+        past = action
+    return score
+
+
+def test_affine_gaps_brute_force():
+
+    import random
+    from seq_alignment import global_similarity, local_similarity
+
+    # Same score as cell by cell Gotoh, and alignments add up to it
+    rng = random.Random(4)
+    for _ in range(60):
+        str1 = ''.join(rng.choice('acg') for _ in range(rng.randint(0,12)))
+        str2 = ''.join(rng.choice('acg') for _ in range(rng.randint(0,12)))
+        op_costs = {'Delete':rng.randint(-3,-1),'Insert':rng.randint(-3,-1),'Substitute':rng.randint(-4,0)
+                   ,'Exact':rng.randint(0,3),'Open':rng.randint(-5,-1)}
+
+        for similarity, local in [(global_similarity,False),(local_similarity,True)]:
+            expected = gotoh_score(str1,str2,op_costs,local)
+            for backtrace in [False,True]:
+                if backtrace and not (str1 and str2):
+                    continue
+                sim_init = similarity(str1,str2,backtrace,op_costs)
+                sim_init.run()
+                if local and expected==0:
+                    continue
+                assert sim_init.match_distance == expected
+                if backtrace:
+                    assert alignment_score(sim_init.match_alignment_table,op_costs) == expected
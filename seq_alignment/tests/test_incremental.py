@@ -0,0 +1,38 @@
+def test_incremental_similarity():
+
+    import random
+    from seq_alignment import incremental_similarity, global_similarity, local_similarity, BLOSUM62
+
+    rng = random.Random(3)
+    op_costs = {'Delete':-2,'Insert':-1,'Substitute':-1,'Exact':2}
+    caseless = lambda a, b: a.lower()==b.lower()
+
+    # Same match_distance as the classes after every append, to either side
+    for mode, similarity in [('global',global_similarity),('local',local_similarity)]:
+        for costs, options in [(None,{}),(op_costs,{}),(op_costs,{'test':caseless})]:
+            start = ''.join(rng.choice('acgtA') for _ in range(5))
+            inc = incremental_similarity(start,'',mode,costs,**options)
+            for _ in range(30):
+                to = rng.choice(['str1','str2'])
+                inc.append(rng.choice('acgtA'),to)
+                sim_init = similarity(inc.str1,inc.str2,False,costs or inc.op_costs,engine='numpy',**options)
+                sim_init.run()
+                if inc.str2:
+                    assert inc.match_distance == sim_init.match_distance
+                    assert inc.match_end == getattr(sim_init,'match_end',None)
+
+    # Substitution matrices, symbols arriving one at a time
+    costs = {'Delete':-8,'Insert':-8,'Substitute':0,'Exact':0}
+    inc = incremental_similarity('HEAGAWGHEE','',mode='local',op_costs=costs,substitution_matrix=BLOSUM62)
+    inc.extend('PAWHEAE')
+    sim_init = local_similarity('HEAGAWGHEE','PAWHEAE',False,costs,substitution_matrix=BLOSUM62)
+    sim_init.run()
+    assert inc.match_distance == sim_init.match_distance
+
+    # Alignment on demand, tokens instead of characters
+    inc = incremental_similarity(['the','cat','sat'])
+    inc.extend(['the','bat'])
+    assert inc.match_distance == -2
+    inc.append('sat')
+    assert inc.match_distance == -1
+    assert inc.align().match_distance == -1
@@ -0,0 +1,62 @@
+
+def test_similarity_records():
+
+    from seq_alignment import global_similarity, local_similarity, collector
+
+    # One record per run, with the phases that ran
+    records = collector()
+    wf_init = global_similarity('vine','vin',True,instrument=records)
+    wf_init.run()
+    wf_init = global_similarity('vine','vin',False,engine='numpy',instrument=records)
+    wf_init.run()
+    ls_init = local_similarity('vine','divine',True,instrument=records)
+    ls_init.run()
+
+    assert [record['name'] for record in records.records] == ['global_similarity','global_similarity','local_similarity']
+    assert sorted(records.records[0]['phases']) == ['align','fill','setup','traceback']
+    assert sorted(records.records[1]['phases']) == ['fill','setup']
+    assert records.records[0]['cells'] == 5*4
+    assert records.records[0]['bytes'] == {'edit_array':20,'backtrace_array':20}
+    assert records.records[1]['bytes'] == {}
+
+    summary = records.summary()
+    assert summary['runs'] == 3
+    assert summary['cells'] == 5*4 + 5*4 + 5*7
+    assert summary['seconds'] > 0
+
+
+def test_cells_filled():
+
+    from seq_alignment import global_similarity, local_similarity, collector
+
+    # Early stops only count the rows swept, same for every engine
+    records = collector()
+    for engine, backtrace in (('python',False),('numpy',False),('python',True)):
+        global_similarity('aaaaaaaaaa','cccccccccc',backtrace,engine=engine,max_distance=2,instrument=records).run()
+    assert [record['cells'] for record in records.records] == [3+4+5+5]*3
+
+    # Hirschberg sweeps cells more than once, bit-parallel updates words
+    records = collector()
+    str1, str2 = 'acgt'*30, 'cgta'*30
+    global_similarity(str1,str2,True,linear_space=True,instrument=records).run()
+    local_similarity(str1,str2,True,linear_space=True,instrument=records).run()
+    global_similarity(str1,str2,False,engine='bitparallel',instrument=records).run()
+    assert 121*121 < records.records[0]['cells'] <= 2*122*121
+    assert records.records[1]['cells'] > 121*121
+    assert records.records[2]['cells'] == 120*2
+
+
+def test_batch_records():
+
+    from seq_alignment import batch_pairs, query_profile, collector
+
+    # Cells include padding, cache counts profile lookups
+    records = collector()
+    batch_pairs([('vine','vin'),('wine','divine')],instrument=records)
+    assert records.records[0]['cells'] == 2*5*7
+    assert sorted(records.records[0]['phases']) == ['encode','fill']
+
+    profile = query_profile('vine',instrument=records)
+    profile.align('vivi')
+    assert records.records[1]['cache'] == {'hits':2,'misses':2}
+    assert records.summary()['cache']['hit_rate'] == 0.5
@@ -28,4 +28,181 @@ def test1():
 
     alignment = local_similarity_setup(str1,str2)
 
-    assert np.array_equal(alignment, correct_answer)
\ No newline at end of file
+    assert np.array_equal(alignment, correct_answer)
+
+def test_numpy_engine_same_distance():
+
+    import random
+    from seq_alignment import local_similarity
+
+    rng = random.Random(0)
+    op_costs_list = [{'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':2}
+                    ,{'Delete':-2,'Insert':-1,'Substitute':-3,'Exact':3}]
+
+    for op_costs in op_costs_list:
+        for _ in range(25):
+            str1 = ''.join(rng.choice('acgt') for _ in range(rng.randint(1,30)))
+            str2 = ''.join(rng.choice('acgt') for _ in range(rng.randint(1,30)))
+
+            python_run = local_similarity(str1,str2,False,op_costs)
+            numpy_run = local_similarity(str1,str2,False,op_costs,engine='numpy')
+            backtrace_run = local_similarity(str1,str2,True,op_costs)
+            python_run.run()
+            numpy_run.run()
+            backtrace_run.run()
+
+            assert numpy_run.match_distance == python_run.match_distance
+            assert backtrace_run.match_distance == python_run.match_distance
+            assert numpy_run.match_end == python_run.match_end
+
+
+def test_match_end():
+
+    from seq_alignment import local_similarity
+
+    for engine in ('python','numpy'):
+        ls_init = local_similarity('xxacgtyy','zacgtz',engine=engine)
+        ls_init.run()
+
+        assert ls_init.match_distance == 8
+        assert ls_init.match_end == (6,5)
+
+
+def test_linear_space_alignment():
+
+    import random
+    import pytest
+    from seq_alignment import local_similarity
+
+    str1 = ['p','q','r','a','x','a','b','c','s','t','v','q']
+    str2 = ['x','y','a','x','b','a','c','s','l','l']    
+
+    ls_init = local_similarity(str1,str2,True,linear_space=True)
+    ls_init.run()
+    assert np.array_equal(ls_init.match_alignment_table, local_similarity_setup(str1,str2))
+
+    # No backtrace_array to draw a table from
+    with pytest.raises(ValueError):
+        ls_init.make_backtrace_table()
+
+    rng = random.Random(4)
+    for _ in range(20):
+        str1 = ''.join(rng.choice('acgt') for _ in range(rng.randint(1,60)))
+        str2 = ''.join(rng.choice('acgt') for _ in range(rng.randint(1,60)))
+
+        ls_full = local_similarity(str1,str2,True)
+        ls_linear = local_similarity(str1,str2,True,linear_space=True)
+        ls_full.run()
+        ls_linear.run()
+
+        table = ls_linear.match_alignment_table
+        assert ls_linear.match_distance == ls_full.match_distance
+        assert ls_linear.match_end == ls_full.match_end
+        assert ''.join(table[0]).replace(' ','') in str1
+        assert ''.join(table[1]).replace(' ','') in str2
+
+
+def test_long_match_does_not_overflow():
+
+    from seq_alignment import local_similarity
+
+    # 80 exact matches score 160, past the range of int8
+    str1 = 'x' + 'acdefghikl'*8 + 'y'
+    str2 = 'z' + 'acdefghikl'*8 + 'w'
+
+    ls_init = local_similarity(str1,str2,True)
+    ls_init.run()
+
+    assert ls_init.match_distance == 160
+    assert ls_init.match_end == (81,81)
+    assert ''.join(ls_init.match_alignment_table[0]) == 'acdefghikl'*8
+
+
+def test_local_similarity_backtrace():
+
+    from seq_alignment import local_similarity
+
+    ls_init = local_similarity(['v','i','n','e'],['v','i','n'],True)
+    ls_init.make_backtrace_table()
+
+    # One packed byte of flags per cell
+    assert ls_init.backtrace_array.shape == (5,4)
+    assert ls_init.backtrace_array.dtype == np.uint8
+
+    correct_answer = np.array([['', '', '', ''],
+                               ['', '⇖', '⇐', '⇐'],
+                               ['', '⇑', '⇖', '⇐'],
+                               ['', '⇑', '⇑', '⇖'],
+                               ['', '', '⇑', '⇑']])
+
+    assert np.array_equal(np.array(ls_init.backtrace_table), correct_answer)
+
+
+def test_query_profile_same_as_local_similarity():
+
+    import random
+    from seq_alignment import local_similarity, query_profile
+
+    rng = random.Random(5)
+    op_costs = {'Delete':-2,'Insert':-1,'Substitute':-3,'Exact':3}
+    query = ''.join(rng.choice('acgt') for _ in range(37))
+
+    # One profile reused across targets and lane counts
+    for lanes in (1,4,None,37):
+        profile = query_profile(query,op_costs,lanes=lanes)
+        for _ in range(20):
+            target = ''.join(rng.choice('acgtn') for _ in range(rng.randint(1,50)))
+
+            ls_init = local_similarity(query,target,False,op_costs)
+            ls_init.run()
+
+            assert profile.align(target) == (ls_init.match_distance,ls_init.match_end)
+
+
+def test_substitution_matrix():
+
+    from seq_alignment import local_similarity, query_profile, BLOSUM62
+
+    # Scalar, numpy, backtrace, linear space + striped agree with BLOSUM62 
+    op_costs = {'Delete':-8,'Insert':-8,'Substitute':0,'Exact':0}
+    pairs = [('HEAGAWGHEE','PAWHEAE'),('MKTAYIAKQRQISFVKSHFSRQ','KTAYIAKQRQ'),('WCW','AAWAZ')]
+    for str1, str2 in pairs:
+        results = []
+        for engine in ('python','numpy'):
+            ls_init = local_similarity(str1,str2,False,op_costs,engine=engine,substitution_matrix=BLOSUM62)
+            ls_init.run()
+            results.append((ls_init.match_distance,ls_init.match_end))
+        for linear_space in (False,True):
+            ls_init = local_similarity(str1,str2,True,op_costs,linear_space=linear_space,substitution_matrix=BLOSUM62)
+            ls_init.run()
+            results.append((ls_init.match_distance,ls_init.match_end))
+        results.append(query_profile(str1,op_costs,substitution_matrix=BLOSUM62).align(str2))
+        assert len(set(results))==1
+
+    # W-W scores 11 in BLOSUM62
+    ls_init = local_similarity('AWA','CWC',False,op_costs,substitution_matrix=BLOSUM62)
+    ls_init.run()
+    assert ls_init.match_distance==11
+
+
+def test_affine_gaps():
+
+    from seq_alignment import local_similarity
+
+    # Score-only + backtrace agree on score and end, with the gap kept in one piece
+    op_costs = {'Delete':-1,'Insert':-1,'Substitute':-3,'Exact':2,'Open':-3}
+    results = []
+    for backtrace in [False,True]:
+        ls_init = local_similarity('xxacgtacgtggacgtacgtxx','yyacgtacgtacgtacgtyy',backtrace,op_costs)
+        ls_init.run()
+        results.append((ls_init.match_distance,ls_init.match_end))
+    assert results[0] == results[1] == (32 - 3 - 2, (20,18))
+    assert ''.join(ls_init.match_alignment_table[2]) == 'S'*8 + 'DD' + 'S'*8
+    assert ls_init.engine == 'numpy'
+
+    # Only the numpy kernels run affine gaps
+    try:
+        local_similarity('ab','ab',False,op_costs,engine='python')
+        assert False
+    except ValueError:
+        pass
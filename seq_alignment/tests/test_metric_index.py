@@ -0,0 +1,55 @@
+def test_bk_tree(tmp_path):
+
+    import random
+    from seq_alignment import bk_tree, global_similarity
+
+    rng = random.Random(2)
+    words = [''.join(rng.choice('abcd') for _ in range(rng.randint(0,8))) for _ in range(200)]
+    op_costs = {'Delete':-2,'Insert':-2,'Substitute':-3,'Exact':0}
+
+    def distances(query, costs):
+        found = []
+        for ix, word in enumerate(words):
+            sim_init = global_similarity(query,word,False,costs)
+            sim_init.run()
+            found.append((-sim_init.match_distance,ix,word))
+        return sorted(found)
+
+    # Same items as comparing the query to every word
+    for costs in [None,op_costs]:
+        tree = bk_tree(words[:100],costs)
+        for word in words[100:]:
+            tree.add(word)
+        for query in ['abcd','','dddaa']:
+            expected = distances(query,costs or {'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':0})
+            assert tree.within(query,2) == [(word,d) for d, ix, word in expected if d <= 2]
+            assert tree.nearest(query,5) == [(word,d) for d, ix, word in expected[:5]]
+            assert tree.stats['evaluations'] + tree.stats['avoided'] <= len(words)
+
+    # Pruning skips most distance evaluations on small radii
+    tree.within('abcd',0)
+    assert tree.stats['avoided'] > 0
+
+    # Duplicates of a compared item aren't avoided
+    duplicates = bk_tree(['ab','ab','ab','abcd'])
+    duplicates.within('ba',0)
+    assert duplicates.stats == {'evaluations':2,'avoided':0}
+    duplicates.within('zzzzzzz',1)
+    assert duplicates.stats == {'evaluations':1,'avoided':1}
+
+    # Saved tree gives the same matches without any distances run
+    tree.save(str(tmp_path/'tree.json'))
+    loaded = bk_tree.load(str(tmp_path/'tree.json'))
+    assert loaded.distance_evaluations == 0
+    assert loaded.nearest('abcd',5) == tree.nearest('abcd',5)
+
+    try:
+        tree.nearest('abcd',0)
+        assert False
+    except ValueError:
+        pass
+    try:
+        bk_tree(words,{'Delete':-1,'Insert':-2,'Substitute':-1,'Exact':0})
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,57 @@
+import numpy as np
+
+def covers(a, b):
+    return a==b or a=='n'
+
+
+def test_all_vs_all():
+
+    import random
+    from seq_alignment import all_vs_all, global_similarity, local_similarity
+
+    rng = random.Random(5)
+    sequences = [''.join(rng.choice('acgt') for _ in range(rng.randint(0,30))) for _ in range(9)]
+    op_costs = {'Delete':-2,'Insert':-2,'Substitute':-1,'Exact':1}
+
+    # Same scores as running each pair, in or out of a process pool
+    for mode, similarity in [('global',global_similarity),('local',local_similarity)]:
+        expected = np.empty((9,9))
+        for i, str1 in enumerate(sequences):
+            for j, str2 in enumerate(sequences):
+                sim_init = similarity(str1,str2,False,op_costs)
+                sim_init.run()
+                expected[i,j] = sim_init.match_distance
+
+        for workers in [1,3]:
+            scores = all_vs_all(sequences,mode,op_costs,workers=workers)
+            assert np.array_equal(scores,expected)
+
+    # Asymmetric tests + costs score every pair instead of mirroring
+    sequences = ['nnac','acgt','ggnt','']
+    skewed = {'Delete':-2,'Insert':-1,'Substitute':-1,'Exact':1}
+    for costs, options in [(op_costs,{'test':covers}),(skewed,{})]:
+        expected = np.empty((4,4))
+        for i, str1 in enumerate(sequences):
+            for j, str2 in enumerate(sequences):
+                sim_init = global_similarity(str1,str2,False,costs,**options)
+                sim_init.run()
+                expected[i,j] = sim_init.match_distance
+        assert not np.array_equal(expected,expected.T)
+        for workers in [1,3]:
+            assert np.array_equal(all_vs_all(sequences,'global',costs,workers=workers,**options),expected)
+
+
+def test_upper_triangle_tiles():
+
+    from seq_alignment.pairwise.main import upper_triangle_tiles
+
+    # Every pair of the upper triangle lands in exactly one tile
+    lengths = [5,100,3,40,0,7]
+    tiles = upper_triangle_tiles(lengths,4)
+    pairs = [(i,j) for rows, cols in tiles for i, j in zip(rows,cols)]
+    assert sorted(pairs) == [(i,j) for i in range(6) for j in range(i,6)]
+    assert len(tiles) <= 4
+
+    tiles = upper_triangle_tiles(lengths,4,upper=False)
+    pairs = [(i,j) for rows, cols in tiles for i, j in zip(rows,cols)]
+    assert sorted(pairs) == [(i,j) for i in range(6) for j in range(6)]
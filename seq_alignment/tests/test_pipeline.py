@@ -0,0 +1,89 @@
+import numpy as np
+
+def write_pairs(path, n_pairs):
+
+    import csv
+    import random
+
+    rng = random.Random(2)
+    pairs = [(''.join(rng.choice('acgt') for _ in range(rng.randint(0,20)))
+             ,''.join(rng.choice('acgt') for _ in range(rng.randint(0,20)))) for _ in range(n_pairs)]
+    with open(path,'w',newline='') as ofile:
+        csv.writer(ofile).writerows(pairs)
+    return pairs
+
+
+def test_run_pipeline(tmp_path):
+
+    import csv
+    from seq_alignment import run_pipeline, batch_pairs
+
+    pairs = write_pairs(str(tmp_path/'pairs.csv'),53)
+    expected, ends = batch_pairs(pairs,'local')
+
+    # Same scores streamed to csv + npy, in or out of a process pool
+    for workers in [1,2]:
+        output = str(tmp_path/'scores_{}.csv'.format(workers))
+        assert run_pipeline(str(tmp_path/'pairs.csv'),output,'local',chunk_size=10,workers=workers) == 53
+        with open(output) as ifile:
+            rows = list(csv.reader(ifile))
+        assert rows[0] == ['pair','match_distance','end_row','end_col']
+        assert [int(row[1]) for row in rows[1:]] == expected.tolist()
+        assert [[int(row[2]),int(row[3])] for row in rows[1:]] == ends.tolist()
+
+    output = str(tmp_path/'scores')
+    run_pipeline(str(tmp_path/'pairs.csv'),output,chunk_size=10,workers=2,max_in_flight=1)
+    scores = np.concatenate([np.load(str(tmp_path/'scores'/'chunk_{:06d}.npy'.format(ii))) for ii in range(6)])
+    assert scores.tolist() == batch_pairs(pairs).tolist()
+
+
+def test_run_pipeline_resume(tmp_path):
+
+    import os
+    import json
+    import pytest
+    from seq_alignment import run_pipeline, batch_pairs
+
+    pairs = write_pairs(str(tmp_path/'pairs.csv'),35)
+    output = str(tmp_path/'scores.csv')
+    run_pipeline(str(tmp_path/'pairs.csv'),output,chunk_size=10,workers=1)
+    with open(output,newline='') as ifile:
+        complete = ifile.read()
+
+    # Pretend the run stopped after 2 chunks, halfway through the 3rd
+    with open(output+'.progress') as ifile:
+        progress = json.load(ifile)
+    with open(output,'w',newline='') as ofile:
+        lines = complete.splitlines(True)
+        ofile.write(''.join(lines[:21]))
+        offset = ofile.tell()
+        ofile.write(''.join(lines[21:25]))
+    with open(output+'.progress','w') as ofile:
+        json.dump(dict(progress,chunks_done=2,offset=offset),ofile)
+
+    assert run_pipeline(str(tmp_path/'pairs.csv'),output,chunk_size=10,workers=1,resume=True) == 15
+    with open(output,newline='') as ifile:
+        assert ifile.read() == complete
+
+    # npy chunks resume where they stopped, with the same chunk_size only
+    folder = str(tmp_path/'scores')
+    run_pipeline(str(tmp_path/'pairs.csv'),folder,chunk_size=10,workers=1)
+    os.remove(os.path.join(folder,'chunk_000003.npy'))
+    assert run_pipeline(str(tmp_path/'pairs.csv'),folder,chunk_size=10,workers=1,resume=True) == 5
+    with pytest.raises(ValueError):
+        run_pipeline(str(tmp_path/'pairs.csv'),folder,chunk_size=7,workers=1,resume=True)
+
+
+def test_command_line(tmp_path):
+
+    from seq_alignment.__main__ import main
+    from seq_alignment import batch_pairs, BLOSUM62
+
+    pairs = [('HEAGAWGHEE','PAWHEAE'),('MKTAYIAKQR','MKTAHIAKQ')]
+    with open(str(tmp_path/'pairs.csv'),'w') as ofile:
+        ofile.write('HEAGAWGHEE,PAWHEAE\nMKTAYIAKQR,MKTAHIAKQ\n')
+    main([str(tmp_path/'pairs.csv'),str(tmp_path/'scores'),'--workers','1'
+         ,'--op-costs','{"Insert":-8,"Delete":-8,"Substitute":0,"Exact":0}','--substitution-matrix','BLOSUM62'])
+    scores = np.load(str(tmp_path/'scores'/'chunk_000000.npy'))
+    op_costs = {'Insert':-8,'Delete':-8,'Substitute':0,'Exact':0}
+    assert scores.tolist() == batch_pairs(pairs,'global',op_costs,substitution_matrix=BLOSUM62).tolist()
@@ -0,0 +1,36 @@
+def test_seed_index(tmp_path):
+
+    import random
+    from seq_alignment import seed_index, collector
+
+    rng = random.Random(5)
+    targets = [''.join(rng.choice('acgt') for _ in range(rng.randint(0,400))) for _ in range(40)]
+    query = targets[7][100:160]
+    query = query[:20] + 'g' + query[21:40] + query[41:] # one mismatch, one deletion
+    targets[21] = targets[21][:50] + query + targets[21][50:]
+
+    # Planted matches are found with the same score + end as a full scan
+    for seed in [6,'1101011']:
+        index = seed_index(targets,seed)
+        scan = index.scan(query)
+        matches = index.search(query,min_hits=2,band=4)
+        assert [match[0] for match in matches[:2]] == [21,7]
+        assert matches[:2] == scan[:2]
+        assert index.stats['cells'] < sum((len(query)+1)*(len(target)+1) for target in targets)
+
+    # Fewer regions with max_regions, none with min_hits past every region
+    assert len(index.search(query,max_regions=1)) == 1
+    assert index.search(query,min_hits=10**6) == []
+
+    # Saved index gives the same matches
+    index.save(str(tmp_path/'index.npz'))
+    loaded = seed_index.load(str(tmp_path/'index.npz'))
+    instrument = collector()
+    assert loaded.search(query,instrument=instrument) == index.search(query)
+    assert set(instrument.records[0]['phases']) == {'seed','cluster','extend'}
+
+    try:
+        seed_index(targets,'0110')
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,39 @@
+def test_vocabulary():
+
+    from seq_alignment import global_similarity, local_similarity, batch_pairs, vocabulary, result_cache
+
+    calls = []
+    def caseless(a, b):
+        calls.append((a,b))
+        return a.lower()==b.lower()
+
+    pairs = [(['The','cat','sat'],['the','cat','sat','down'])
+            ,(['the','dog'],['The','cat'])
+            ,(['a','cat'],['A','CAT','sat'])]
+    op_costs = {'Delete':-1,'Insert':-1,'Substitute':-1,'Exact':1}
+
+    # Same scores with a shared vocabulary, for every engine
+    words = vocabulary()
+    for str1, str2 in pairs:
+        for similarity, options in [(global_similarity,{'engine':'python'}),(global_similarity,{'engine':'numpy'})
+                                   ,(local_similarity,{'engine':'python'}),(local_similarity,{'engine':'numpy'})]:
+            for backtrace in [False,True]:
+                sim_init = similarity(str1,str2,backtrace,op_costs,test=caseless,**options)
+                sim_init.run()
+                shared = similarity(str1,str2,backtrace,op_costs,test=caseless,vocabulary=words,**options)
+                shared.run()
+                assert shared.match_distance == sim_init.match_distance
+
+    # test only called once per pair of distinct tokens, over every pair
+    calls.clear()
+    words = vocabulary()
+    for str1, str2 in pairs*3:
+        global_similarity(str1,str2,False,op_costs,test=caseless,engine='python',vocabulary=words).run()
+    assert len(calls) == len(set(calls)) == len(words)**2
+    assert batch_pairs(pairs,op_costs=op_costs,test=caseless,vocabulary=words).tolist() == \
+           batch_pairs(pairs,op_costs=op_costs,test=caseless).tolist()
+
+    # Cached scores don't depend on the vocabulary
+    cache = result_cache()
+    assert cache.score('the','cat',op_costs=op_costs,vocabulary=words) == cache.score('the','cat',op_costs=op_costs)
+    assert cache.stats['hits'] == 1